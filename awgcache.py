@@ -0,0 +1,133 @@
+"""
+   AnalogOut shadow registers
+   Write-through cache of the last value applied to each AnalogOut
+   setting so repeated pulses only send the parameters that changed.
+
+   Waveform data is compared by content hash, so uploading the same
+   samples again costs a hash instead of a USB transfer. Samples are
+   passed to the library as a pointer into a contiguous float64 array.
+
+   sent and skipped count the FDwfAnalogOut* calls issued and avoided.
+"""
+
+from ctypes import *
+from dwfconstants import *
+from dwfbuffers import as_pointer
+from collections import Counter
+import hashlib
+import numpy as np
+
+
+def _val(arg):
+    return getattr(arg, "value", arg)
+
+
+def waveform(samples):
+    # float64 contiguous samples for the library, copied only when needed
+    return np.ascontiguousarray(samples, dtype=np.float64)
+
+
+def digest(samples):
+    return hashlib.sha1(memoryview(waveform(samples)).cast("B")).hexdigest()
+
+
+class AnalogOutCache:
+    def __init__(self, dwf, hdwf):
+        self.dwf = dwf
+        self.hdwf = hdwf
+        self.sent = Counter()
+        self.skipped = Counter()
+        self._applied = {}
+        self._dirty = set()
+
+    def _set(self, name, channel, node, value, ctype):
+        value = _val(value)
+        key = (channel, name, node)
+        if key in self._applied and self._applied[key] == value:
+            self.skipped[name] += 1
+            return
+        args = (self.hdwf, c_int(channel)) if node is None else (self.hdwf, c_int(channel), c_int(node))
+        getattr(self.dwf, name)(*args, ctype(value))
+        self.sent[name] += 1
+        self._applied[key] = value
+        self._dirty.add(channel)
+
+    def node_enable(self, channel, node, enable):
+        self._set("FDwfAnalogOutNodeEnableSet", channel, _val(node), int(enable), c_int)
+
+    def node_function(self, channel, node, func):
+        self._set("FDwfAnalogOutNodeFunctionSet", channel, _val(node), func, c_ubyte)
+
+    def node_frequency(self, channel, node, hz):
+        self._set("FDwfAnalogOutNodeFrequencySet", channel, _val(node), hz, c_double)
+
+    def node_amplitude(self, channel, node, volts):
+        self._set("FDwfAnalogOutNodeAmplitudeSet", channel, _val(node), volts, c_double)
+
+    def node_offset(self, channel, node, volts):
+        self._set("FDwfAnalogOutNodeOffsetSet", channel, _val(node), volts, c_double)
+
+    def node_symmetry(self, channel, node, percent):
+        self._set("FDwfAnalogOutNodeSymmetrySet", channel, _val(node), percent, c_double)
+
+    def node_data(self, channel, node, samples):
+        # custom or play waveform of a node, normalized to -1..+1
+        self._upload("FDwfAnalogOutNodeDataSet", channel, _val(node), samples)
+
+    def data(self, channel, samples):
+        # carrier waveform through the older FDwfAnalogOutDataSet
+        self._upload("FDwfAnalogOutDataSet", channel, None, samples)
+
+    def _upload(self, name, channel, node, samples):
+        samples = waveform(samples)
+        key = (channel, name, node)
+        value = (len(samples), digest(samples))
+        if self._applied.get(key) == value:
+            self.skipped[name] += 1
+            return
+        args = (self.hdwf, c_int(channel)) if node is None else (self.hdwf, c_int(channel), c_int(node))
+        getattr(self.dwf, name)(*args, as_pointer(samples, 0, c_double), c_int(len(samples)))
+        self.sent[name] += 1
+        self._applied[key] = value
+        self._dirty.add(channel)
+
+    def idle(self, channel, idle):
+        self._set("FDwfAnalogOutIdleSet", channel, None, idle, c_int)
+
+    def run(self, channel, seconds):
+        self._set("FDwfAnalogOutRunSet", channel, None, seconds, c_double)
+
+    def wait(self, channel, seconds):
+        self._set("FDwfAnalogOutWaitSet", channel, None, seconds, c_double)
+
+    def repeat(self, channel, count):
+        self._set("FDwfAnalogOutRepeatSet", channel, None, count, c_int)
+
+    def trigger_source(self, channel, source):
+        self._set("FDwfAnalogOutTriggerSourceSet", channel, None, source, c_ubyte)
+
+    def repeat_trigger(self, channel, enable):
+        self._set("FDwfAnalogOutRepeatTriggerSet", channel, None, int(enable), c_int)
+
+    def configure(self, channel, start):
+        # applying unchanged settings is skipped, starting always goes to the device
+        if not start and channel not in self._dirty:
+            self.skipped["FDwfAnalogOutConfigure"] += 1
+            return
+        self.dwf.FDwfAnalogOutConfigure(self.hdwf, c_int(channel), c_int(int(start)))
+        self.sent["FDwfAnalogOutConfigure"] += 1
+        self._dirty.discard(channel)
+
+    def reset(self, channel=-1):
+        self.dwf.FDwfAnalogOutReset(self.hdwf, c_int(channel))
+        self.sent["FDwfAnalogOutReset"] += 1
+        self.invalidate(channel)
+
+    def invalidate(self, channel=-1):
+        # forget the shadow state after the device was changed behind the cache
+        for key in [k for k in self._applied if channel == -1 or k[0] == channel]:
+            del self._applied[key]
+        if channel == -1:
+            self._dirty.clear()
+        else:
+            self._dirty.discard(channel)
@@ -0,0 +1,203 @@
+"""
+   Burst capture
+   AnalogIn_Buffers.py queues triggered captures in device side buffers
+   (FDwfAnalogInBuffersSet) and reads them back one at a time. Burst
+   does the same with the host side cost kept per capture to a status
+   poll, one read per channel straight into a preallocated
+   (captures, channels, samples) array and one FDwfAnalogInStatusTime:
+   pointers and ctypes arguments are built once in configure().
+
+   Per capture it records
+       ticks     trigger time, sec * ticksec + tick of FDwfAnalogInStatusTime,
+                 hardware time on newer devices, host time on older ones
+       done      host time the status reported Done
+       transfer  seconds from Done to the end of the last channel read
+       polls     status calls it took
+   as a capture_dtype array. Trigger times stay integer ticks, UTC
+   seconds in a float64 only resolve about 0.24 us. ticksec holds the
+   ticks per second, trigger_times() the seconds from the first capture.
+   summary() reduces it to trigger intervals, the gaps between captures
+   and transfer percentiles, histogram() bins the transfer latencies.
+"""
+
+from ctypes import *
+from dwfconstants import *
+from dwfbuffers import as_pointer
+import numpy as np
+import time
+
+capture_dtype = np.dtype([("ticks", np.int64), ("done", np.float64), ("transfer", np.float64), ("polls", np.int32)])
+
+
+class Burst:
+    def __init__(self, session, captures=1000, samples=8192, hz=100e6, channels=(0,), volts_range=5.0,
+                 dtype=np.float64, trigger_source=trigsrcDetectorAnalogIn, trigger_channel=0, level=0.0,
+                 condition=DwfTriggerSlopeRise, settle=1.0, timeout=10.0):
+        # dtype: float64 volts (StatusData) or int16 raw samples (StatusData16)
+        self.session = session
+        self.captures = captures
+        self.samples = samples
+        self.hz = hz
+        self.channels = tuple(channels)
+        self.volts_range = volts_range
+        self.dtype = np.dtype(dtype)
+        if self.dtype not in (np.dtype(np.float64), np.dtype(np.int16)):
+            raise ValueError("AnalogIn data is float64 (volts) or int16 (raw)")
+        self.trigger_source = trigger_source
+        self.trigger_channel = trigger_channel
+        self.level = level
+        self.condition = condition
+        self.settle = settle
+        self.timeout = timeout
+        self.data = None
+        self.times = None
+        self.ticksec = 1
+        self.count = 0
+
+    def configure(self):
+        dwf, hdwf = self.session.dwf, self.session.hdwf
+        dwf.FDwfAnalogInFrequencySet(hdwf, c_double(self.hz))
+        dwf.FDwfAnalogInBufferSizeSet(hdwf, c_int(self.samples))
+        for channel in self.channels:
+            dwf.FDwfAnalogInChannelEnableSet(hdwf, c_int(channel), c_int(1))
+            dwf.FDwfAnalogInChannelRangeSet(hdwf, c_int(channel), c_double(self.volts_range))
+        dwf.FDwfAnalogInAcquisitionModeSet(hdwf, acqmodeSingle)
+        dwf.FDwfAnalogInBuffersSet(hdwf, c_int(self.captures))
+
+        dwf.FDwfAnalogInTriggerAutoTimeoutSet(hdwf, c_double(0))
+        dwf.FDwfAnalogInTriggerSourceSet(hdwf, self.trigger_source)
+        dwf.FDwfAnalogInTriggerTypeSet(hdwf, trigtypeEdge)
+        dwf.FDwfAnalogInTriggerChannelSet(hdwf, c_int(self.trigger_channel))
+        dwf.FDwfAnalogInTriggerLevelSet(hdwf, c_double(self.level))
+        dwf.FDwfAnalogInTriggerConditionSet(hdwf, self.condition)
+        # with time base/2 the trigger is the first sample
+        dwf.FDwfAnalogInTriggerPositionSet(hdwf, c_double(0.5 * self.samples / self.hz))
+        dwf.FDwfAnalogInConfigure(hdwf, c_int(1), c_int(0))
+
+        cBuffers = c_int()
+        hzRate = c_double()
+        cSamples = c_int()
+        dwf.FDwfAnalogInBuffersGet(hdwf, byref(cBuffers))
+        dwf.FDwfAnalogInFrequencyGet(hdwf, byref(hzRate))
+        dwf.FDwfAnalogInBufferSizeGet(hdwf, byref(cSamples))
+        self.buffers = cBuffers.value
+        self.hz = hzRate.value
+        self.samples = cSamples.value
+
+        self.data = np.zeros((self.captures, len(self.channels), self.samples), dtype=self.dtype)
+        self.times = np.zeros(self.captures, dtype=capture_dtype)
+        ctype = c_short if self.dtype == np.int16 else c_double
+        self._reads = [[as_pointer(row, 0, ctype) for row in capture] for capture in self.data]
+        # offsets need time to stabilize after open or a range change
+        self._settled = time.perf_counter() + self.settle
+        return self
+
+    def run(self, callback=None):
+        # capture the burst, callback(index, data) after each capture
+        if self.data is None:
+            self.configure()
+        delay = self._settled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        dwf, hdwf = self.session.dwf, self.session.hdwf
+        status = dwf.FDwfAnalogInStatus
+        read = dwf.FDwfAnalogInStatusData16 if self.dtype == np.int16 else dwf.FDwfAnalogInStatusData
+        raw = self.dtype == np.int16
+        statusTime = dwf.FDwfAnalogInStatusTime
+        clock = time.perf_counter
+        fRead = c_int(1)
+        sts = c_byte()
+        done = DwfStateDone.value
+        channels = [c_int(channel) for channel in self.channels]
+        zero = c_int(0)
+        cSamples = c_int(self.samples)
+        sec = c_uint()
+        tick = c_uint()
+        ticksec = c_uint()
+        sec_ref, tick_ref, ticksec_ref = byref(sec), byref(tick), byref(ticksec)
+        sts_ref = byref(sts)
+        times = self.times
+
+        self.count = 0
+        dwf.FDwfAnalogInConfigure(hdwf, c_int(0), c_int(1))
+        for i in range(self.captures):
+            polls = 0
+            deadline = clock() + self.timeout
+            # a new acquisition is started automatically after done
+            while True:
+                if status(hdwf, fRead, sts_ref) != 1:
+                    raise RuntimeError("FDwfAnalogInStatus failed")
+                polls += 1
+                if sts.value == done:
+                    break
+                if polls & 0xff == 0 and clock() > deadline:
+                    raise RuntimeError("No trigger within %g s, %d of %d captures" % (self.timeout, i, self.captures))
+            tDone = clock()
+            for channel, pointer in zip(channels, self._reads[i]):
+                if raw:
+                    read(hdwf, channel, pointer, zero, cSamples)
+                else:
+                    read(hdwf, channel, pointer, cSamples)
+            # hardware trigger time for newer devices, software time for older ones
+            statusTime(hdwf, sec_ref, tick_ref, ticksec_ref)
+            times[i] = (sec.value * ticksec.value + tick.value, tDone, clock() - tDone, polls)
+            self.count = i + 1
+            if callback is not None:
+                callback(i, self.data[i])
+        dwf.FDwfAnalogInConfigure(hdwf, c_int(0), c_int(0))
+        self.ticksec = max(ticksec.value, 1)
+        return self.data
+
+    def trigger_times(self):
+        # trigger times in seconds from the first capture
+        ticks = self.times["ticks"][:self.count]
+        return (ticks - ticks[:1]) / self.ticksec
+
+    def histogram(self, bins=50):
+        # (counts, edges in microseconds) of the transfer latencies
+        return np.histogram(self.times["transfer"][:self.count] * 1e6, bins=bins)
+
+    def summary(self):
+        times = self.times[:self.count]
+        result = dict(captures=self.count, buffers=self.buffers, samples=self.samples, hz=self.hz)
+        if len(times) == 0:
+            return result
+        elapsed = times["done"][-1] - times["done"][0] + times["transfer"][-1]
+        result["per_capture_us"] = elapsed / len(times) * 1e6
+        result["polls_per_capture"] = float(times["polls"].mean())
+        p50, p90, p99 = np.percentile(times["transfer"] * 1e6, (50, 90, 99))
+        result["transfer_us"] = dict(p50=p50, p90=p90, p99=p99, max=times["transfer"].max() * 1e6)
+        if len(times) > 1:
+            # trigger to trigger, and the dead time between the end of one capture and the next
+            # trigger, in integer ticks until the capture length is taken off
+            dt = np.diff(times["ticks"])
+            gap = dt - self.samples / self.hz * self.ticksec
+            result["trigger_dt_us"] = dict(min=dt.min() * 1e6 / self.ticksec, max=dt.max() * 1e6 / self.ticksec)
+            result["gap_us"] = dict(min=gap.min() * 1e6 / self.ticksec, max=gap.max() * 1e6 / self.ticksec)
+        return result
+
+
+if __name__ == "__main__":
+    from dwfsession import DwfSession
+
+    with DwfSession() as session:
+        dwf, hdwf = session.dwf, session.hdwf
+        print("Generating signal...")
+        dwf.FDwfAnalogOutNodeEnableSet(hdwf, c_int(0), AnalogOutNodeCarrier, c_int(1))
+        dwf.FDwfAnalogOutNodeFunctionSet(hdwf, c_int(0), AnalogOutNodeCarrier, funcSquare)
+        dwf.FDwfAnalogOutNodeFrequencySet(hdwf, c_int(0), AnalogOutNodeCarrier, c_double(10e6))
+        dwf.FDwfAnalogOutNodeAmplitudeSet(hdwf, c_int(0), AnalogOutNodeCarrier, c_double(1.0))
+        dwf.FDwfAnalogOutConfigure(hdwf, c_int(0), c_int(1))
+
+        burst = Burst(session, captures=1000, samples=8192, hz=100e6).configure()
+        print("Device Buffers: %d" % burst.buffers)
+        burst.run()
+        result = burst.summary()
+        print("Per capture: %.3f us, %.1f status calls" % (result["per_capture_us"], result["polls_per_capture"]))
+        print("Transfer p50/p99/max: %(p50).1f/%(p99).1f/%(max).1f us" % result["transfer_us"])
+        print("Hardware dT0 min/max: %(min).3f/%(max).3f us" % result["trigger_dt_us"])
+        print("Capture gap min/max: %(min).3f/%(max).3f us" % result["gap_us"])
+        counts, edges = burst.histogram(10)
+        for count, edge in zip(counts, edges):
+            print("%8.1f us %s" % (edge, "#" * int(60 * count / max(counts.max(), 1))))
+        dwf.FDwfAnalogOutConfigure(hdwf, c_int(0), c_int(0))
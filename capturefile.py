@@ -0,0 +1,177 @@
+"""
+   Binary capture file
+   Raw int16 or double sample chunks behind a small JSON header, written
+   as the capture runs and read back with np.memmap. CSV and WAV are
+   produced only on request.
+
+   Layout:
+       b"DWFCAP1\0", header length (uint32), JSON header
+       chunks: b"CHNK", samples per channel (uint32), lost (uint32),
+               corrupted (uint32), stream position (uint64),
+               then the samples of each channel one after the other
+
+   The JSON header holds hz, dtype, channels, range, offset,
+   trigger_position and any extra metadata given to CaptureWriter.
+"""
+
+import json
+import numpy as np
+import os
+import struct
+import time
+import wave
+
+MAGIC = b"DWFCAP1\0"
+CHUNK = b"CHNK"
+_chunk = struct.Struct("<4sIIIQ")
+
+
+class CaptureWriter:
+    def __init__(self, path, hz, channels=(0,), dtype=np.float64, volts_range=None, volts_offset=None,
+                 trigger_position=0, **metadata):
+        # per channel range and offset turn raw int16 samples into volts
+        self.dtype = np.dtype(dtype)
+        self.channels = tuple(channels)
+        self.position = 0
+        header = dict(metadata, version=1, hz=hz, dtype=self.dtype.str, channels=list(self.channels),
+                      range=list(volts_range) if volts_range is not None else None,
+                      offset=list(volts_offset) if volts_offset is not None else None,
+                      trigger_position=trigger_position, created=time.time())
+        encoded = json.dumps(header).encode()
+        self.file = open(path, "wb")
+        self.file.write(MAGIC + struct.pack("<I", len(encoded)) + encoded)
+
+    def append(self, data, lost=0, corrupted=0):
+        # data is (channels, n), or (n,) for a single channel
+        data = np.asarray(data, dtype=self.dtype)
+        if data.ndim == 1:
+            data = data[np.newaxis]
+        if data.shape[0] != len(self.channels):
+            raise ValueError("Expected %d channels, got %d" % (len(self.channels), data.shape[0]))
+        count = data.shape[1]
+        self.file.write(_chunk.pack(CHUNK, count, lost, corrupted, self.position))
+        np.ascontiguousarray(data).tofile(self.file)
+        self.position += lost + count
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+class CaptureReader:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError("%s is not a capture file" % path)
+            length, = struct.unpack("<I", f.read(4))
+            self.header = json.loads(f.read(length))
+            self.hz = self.header["hz"]
+            self.dtype = np.dtype(self.header["dtype"])
+            self.channels = tuple(self.header["channels"])
+            # (file offset of data, stream position, samples, lost, corrupted)
+            self.chunks = []
+            rowbytes = len(self.channels) * self.dtype.itemsize
+            size = os.fstat(f.fileno()).st_size
+            while True:
+                raw = f.read(_chunk.size)
+                if len(raw) < _chunk.size:
+                    break
+                marker, count, lost, corrupted, position = _chunk.unpack(raw)
+                if marker != CHUNK:
+                    raise ValueError("Bad chunk marker at %d" % (f.tell() - _chunk.size))
+                offset = f.tell()
+                if offset + count * rowbytes > size:
+                    # chunk still being written by the recorder
+                    break
+                self.chunks.append((offset, position, count, lost, corrupted))
+                f.seek(offset + count * rowbytes)
+
+    def __len__(self):
+        # samples stored per channel, lost samples are not stored
+        return sum(chunk[2] for chunk in self.chunks)
+
+    @property
+    def markers(self):
+        # (stream position, lost, corrupted) of every chunk that reported either
+        return [(position, lost, corrupted) for _, position, _, lost, corrupted in self.chunks if lost or corrupted]
+
+    def memmap(self, i):
+        offset, _, count, _, _ = self.chunks[i]
+        return np.memmap(self.path, dtype=self.dtype, mode="r", offset=offset, shape=(len(self.channels), count))
+
+    def read(self, start=0, stop=None):
+        # stored samples [start, stop) of every channel, lost gaps are skipped
+        stop = len(self) if stop is None else min(stop, len(self))
+        parts = []
+        first = 0
+        for i, chunk in enumerate(self.chunks):
+            last = first + chunk[2]
+            if last > start and first < stop:
+                parts.append(self.memmap(i)[:, max(start - first, 0):min(stop, last) - first])
+            first = last
+        if not parts:
+            return np.zeros((len(self.channels), 0), dtype=self.dtype)
+        return np.concatenate(parts, axis=1)
+
+    def volts(self, start=0, stop=None):
+        data = self.read(start, stop)
+        if self.dtype != np.int16:
+            return data
+        span = np.asarray(self.header["range"] or [5.0] * len(self.channels))[:, np.newaxis]
+        offset = np.asarray(self.header["offset"] or [0.0] * len(self.channels))[:, np.newaxis]
+        return data * (span / 65536) + offset
+
+    def to_csv(self, path, block=1 << 20):
+        with open(path, "w") as f:
+            for start in range(0, len(self), block):
+                np.savetxt(f, self.volts(start, start + block).T, fmt="%.9g", delimiter=",")
+
+    def to_wav(self, path, block=1 << 20):
+        # 16 bit PCM, full scale is the channel range or the largest magnitude
+        with wave.open(path, "wb") as w:
+            w.setnchannels(len(self.channels))
+            w.setsampwidth(2)
+            w.setframerate(int(round(self.hz)))
+            if self.dtype == np.int16:
+                scale = None
+            else:
+                peak = max((np.abs(self.memmap(i)).max() for i in range(len(self.chunks))), default=1.0)
+                scale = 32767 / (peak or 1.0)
+            for start in range(0, len(self), block):
+                data = self.read(start, start + block)
+                if scale is not None:
+                    data = np.round(data * scale)
+                w.writeframes(np.ascontiguousarray(data.T).astype("<i2").tobytes())
+
+
+def write_recorder(recorder, path, **metadata):
+    # stream an AnalogRecorder into a capture file, samples lost on the device
+    # or overwritten in the ring become lost markers on the following chunk
+    gaps = 0
+    stored = 0
+    overwritten = recorder.ring.overwritten
+    with CaptureWriter(path, recorder.hz, recorder.channels, recorder.dtype,
+                       volts_range=[recorder.volts_range] * len(recorder.channels), **metadata) as writer:
+        for chunk in recorder:
+            # recorder gaps are positioned in recorded samples
+            lost = recorder.ring.overwritten - overwritten
+            overwritten = recorder.ring.overwritten
+            stored += lost
+            end = stored + chunk.shape[1]
+            while gaps < len(recorder.gaps) and recorder.gaps[gaps][0] < end:
+                lost += recorder.gaps[gaps][1]
+                gaps += 1
+            writer.append(chunk, lost=lost)
+            writer.flush()
+            stored = end
+    return path
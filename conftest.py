@@ -0,0 +1,42 @@
+"""
+   pytest setup
+   Tests run against dwfsim on a ManualClock, the simulated device only
+   moves on when a status or data call adds its latency, so throughput
+   and loss counts do not depend on the speed of the host.
+   test.py and test_pulse_width.py drive real hardware and are skipped.
+"""
+
+from dwfsim import SimDwf, ManualClock
+from dwfsession import DwfSession
+import importlib.util
+import os
+import pytest
+
+collect_ignore = ["test.py", "test_pulse_width.py", "sample", "test"]
+
+
+@pytest.fixture
+def clock():
+    return ManualClock()
+
+
+@pytest.fixture
+def sim(clock):
+    # 100 us per status or data call
+    return SimDwf(latency=1e-4, clock=clock)
+
+
+@pytest.fixture
+def session(sim):
+    with DwfSession(dwf=sim) as session:
+        yield session
+
+
+@pytest.fixture(scope="session")
+def script():
+    # the helpers of test.py, the name is taken by test/ and the stdlib test package
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test.py")
+    spec = importlib.util.spec_from_file_location("pulse_script", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
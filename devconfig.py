@@ -0,0 +1,186 @@
+"""
+   Device configuration selection
+   Device_Enumeration.py lists the buffer sizes of every device
+   configuration (FDwfEnumConfigInfo). open_for() uses them to open a
+   device in the configuration that suits a workload: the one whose
+   buffers hold the most of the requested scope, AWG, logic and pattern
+   depths, among those with enough channels.
+
+   Enumerating configurations takes a dozen calls per configuration, so
+   the results are cached per serial number, in memory and optionally in
+   a JSON file. The file is dropped when the library version changes.
+
+   Selection.fits tells per requested instrument whether the depth fits
+   the device buffer or has to be streamed over USB in record mode.
+"""
+
+from ctypes import *
+from dwfconstants import *
+from dwfsession import DwfSession, load_library
+from collections import namedtuple
+import json
+import os
+import threading
+
+# field, FDwfEnumConfigInfo info
+CONFIG_INFO = (("analog_in_channels", DECIAnalogInChannelCount), ("analog_out_channels", DECIAnalogOutChannelCount),
+               ("analog_io_channels", DECIAnalogIOChannelCount), ("digital_in_channels", DECIDigitalInChannelCount),
+               ("digital_out_channels", DECIDigitalOutChannelCount), ("digital_io_channels", DECIDigitalIOChannelCount),
+               ("analog_in_buffer", DECIAnalogInBufferSize), ("analog_out_buffer", DECIAnalogOutBufferSize),
+               ("digital_in_buffer", DECIDigitalInBufferSize), ("digital_out_buffer", DECIDigitalOutBufferSize))
+
+INSTRUMENTS = ("analog_in", "analog_out", "digital_in", "digital_out")
+
+# depths in samples per channel, 0 when the instrument is not used
+Workload = namedtuple("Workload", "analog_in analog_out digital_in digital_out analog_in_channels "
+                      "analog_out_channels digital_in_channels digital_out_channels",
+                      defaults=(0, 0, 0, 0, 0, 0, 0, 0))
+
+# config index, its info dict, {instrument: depth fits the buffer}
+Selection = namedtuple("Selection", "config info fits")
+
+
+def read_configs(dwf, index):
+    # info dicts of every configuration of the enumerated device index
+    cConfig = c_int()
+    cInfo = c_int()
+    others = create_string_buffer(128)
+    dwf.FDwfEnumConfig(c_int(index), byref(cConfig))
+    configs = []
+    for iCfg in range(cConfig.value):
+        info = {}
+        for name, code in CONFIG_INFO:
+            dwf.FDwfEnumConfigInfo(c_int(iCfg), code, byref(cInfo))
+            info[name] = cInfo.value
+        dwf.FDwfEnumConfigInfo(c_int(iCfg), c_int(-2), others)
+        info["text"] = others.value.decode()
+        configs.append(info)
+    return configs
+
+
+def _library_version(dwf):
+    version = create_string_buffer(32)
+    dwf.FDwfGetVersion(version)
+    return version.value.decode()
+
+
+class ConfigCache:
+    def __init__(self, path=None):
+        # path: JSON file that keeps the configurations between runs
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._devices = {}
+        self._version = None
+        self._lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    stored = json.load(f)
+                self._version = stored["version"]
+                self._devices = stored["devices"]
+            except (ValueError, KeyError):
+                self._devices = {}
+
+    def _save(self):
+        if self.path is None:
+            return
+        temp = self.path + ".tmp"
+        with open(temp, "w") as f:
+            json.dump(dict(version=self._version, devices=self._devices), f, indent=1)
+        os.replace(temp, self.path)
+
+    def get(self, dwf, serial, index):
+        # configurations of the device, enumerated on the first request for serial
+        with self._lock:
+            version = _library_version(dwf)
+            if version != self._version:
+                self._devices = {}
+                self._version = version
+            if serial in self._devices:
+                self.hits += 1
+                return self._devices[serial]
+            self.misses += 1
+            configs = read_configs(dwf, index)
+            self._devices[serial] = configs
+            self._save()
+            return configs
+
+    def clear(self):
+        with self._lock:
+            self._devices = {}
+            self._save()
+
+
+configs = ConfigCache()
+
+
+def fits(info, workload):
+    # {instrument: requested depth fits the buffer} for the instruments in use
+    return {name: getattr(workload, name) <= info[name + "_buffer"] for name in INSTRUMENTS if getattr(workload, name)}
+
+
+def select_config(infos, workload):
+    # Selection of the configuration with enough channels that holds the most of the
+    # requested depths, then the most fitting instruments, then the largest buffers
+    best = None
+    for config, info in enumerate(infos):
+        if any(getattr(workload, name + "_channels") > info[name + "_channels"] for name in INSTRUMENTS):
+            continue
+        used = [name for name in INSTRUMENTS if getattr(workload, name)]
+        coverage = sum(min(info[name + "_buffer"], getattr(workload, name)) / getattr(workload, name) for name in used)
+        fitting = fits(info, workload)
+        score = (coverage, sum(fitting.values()), sum(info[name + "_buffer"] for name in used))
+        if best is None or score > best[0]:
+            best = (score, Selection(config, info, fitting))
+    if best is None:
+        raise RuntimeError("No configuration has the channels for %s" % (workload,))
+    return best[1]
+
+
+def _enumerated(dwf):
+    # (index, serial) of the devices that are not opened
+    cDevice = c_int()
+    fIsUsed = c_int()
+    serialnum = create_string_buffer(32)
+    dwf.FDwfEnum(enumfilterAll, byref(cDevice))
+    for iDev in range(cDevice.value):
+        dwf.FDwfEnumDeviceIsOpened(c_int(iDev), byref(fIsUsed))
+        if fIsUsed.value:
+            continue
+        dwf.FDwfEnumSN(c_int(iDev), serialnum)
+        yield iDev, serialnum.value.decode()
+
+
+def choose(workload, serial=None, dwf=None, cache=None):
+    # (serial, Selection) for the given device, or the first free one
+    dwf = dwf if dwf is not None else load_library()
+    cache = cache or configs
+    for index, sn in _enumerated(dwf):
+        if serial is None or sn == serial or sn.split(":")[-1] == serial:
+            return sn, select_config(cache.get(dwf, sn, index), workload)
+    raise RuntimeError("Device %s not found" % (serial or ""))
+
+
+def open_for(workload, serial=None, dwf=None, cache=None, **session_args):
+    # (open DwfSession, Selection) with the device in the selected configuration
+    dwf = dwf if dwf is not None else load_library()
+    sn, selection = choose(workload, serial, dwf, cache)
+    session = DwfSession(serial=sn, config=selection.config, dwf=dwf, **session_args).open()
+    return session, selection
+
+
+if __name__ == "__main__":
+    import sys
+
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 16384
+    workload = Workload(analog_in=depth, analog_in_channels=2)
+    cache = ConfigCache("devconfig.json")
+    session, selection = open_for(workload, cache=cache)
+    with session:
+        cBufferMax = c_int()
+        session.dwf.FDwfAnalogInBufferSizeInfo(session.hdwf, None, byref(cBufferMax))
+        print("%s opened in configuration %d %s" % (session.serial, selection.config, selection.info["text"]))
+        print("AnalogIn buffer: %d samples" % cBufferMax.value)
+        for name, fit in selection.fits.items():
+            print("%s: %s" % (name, "fits the device buffer" if fit else "record mode, streamed over USB"))
@@ -0,0 +1,78 @@
+"""
+   Acquisition buffers
+   Preallocated NumPy arrays whose memory is handed straight to
+   FDwfAnalogInStatusData* / FDwfDigitalInStatusData*, so captures land
+   in the array without a ctypes copy or per-sample Python iteration.
+
+   Reads return views into the preallocated array; copy them if they
+   must outlive the next read into the same region.
+"""
+
+from ctypes import *
+import numpy as np
+
+
+def as_pointer(array, offset=0, ctype=c_void_p):
+    # pointer to array[offset] for passing to the library, no copy
+    address = array.ctypes.data + offset * array.itemsize
+    if ctype is c_void_p:
+        return c_void_p(address)
+    return cast(c_void_p(address), POINTER(ctype))
+
+
+class AnalogInBuffer:
+    # samples per channel, one row per channel in channels
+    def __init__(self, nSamples, channels=(0,), dtype=np.float64):
+        self.dtype = np.dtype(dtype)
+        if self.dtype not in (np.dtype(np.float64), np.dtype(np.int16)):
+            raise ValueError("AnalogIn data is float64 (volts) or int16 (raw)")
+        self.channels = tuple(channels)
+        self.data = np.zeros((len(self.channels), nSamples), dtype=self.dtype)
+
+    def __len__(self):
+        return self.data.shape[1]
+
+    def row(self, channel):
+        return self.data[self.channels.index(channel)]
+
+    def status_data(self, dwf, hdwf, count=None, offset=0, index=None):
+        # read count samples of every channel into [offset, offset+count)
+        # index selects the device buffer position (StatusData2/16),
+        # None reads the latest samples with FDwfAnalogInStatusData
+        if count is None:
+            count = len(self) - offset
+        if offset + count > len(self):
+            raise ValueError("Read of %d samples at %d overflows %d sample buffer" % (count, offset, len(self)))
+        for i, channel in enumerate(self.channels):
+            row = self.data[i]
+            if self.dtype == np.int16:
+                dwf.FDwfAnalogInStatusData16(hdwf, c_int(channel), as_pointer(row, offset, c_short), c_int(index or 0), c_int(count))
+            elif index is None:
+                dwf.FDwfAnalogInStatusData(hdwf, c_int(channel), as_pointer(row, offset, c_double), c_int(count))
+            else:
+                dwf.FDwfAnalogInStatusData2(hdwf, c_int(channel), as_pointer(row, offset, c_double), c_int(index), c_int(count))
+        return self.data[:, offset:offset + count]
+
+
+class DigitalInBuffer:
+    # sample width follows the FDwfDigitalInSampleFormatSet format: 8, 16 or 32 bits
+    def __init__(self, nSamples, bits=16):
+        dtypes = {8: np.uint8, 16: np.uint16, 32: np.uint32}
+        if bits not in dtypes:
+            raise ValueError("DigitalIn sample format is 8, 16 or 32 bits")
+        self.data = np.zeros(nSamples, dtype=dtypes[bits])
+
+    def __len__(self):
+        return len(self.data)
+
+    def status_data(self, dwf, hdwf, count=None, offset=0, index=None):
+        if count is None:
+            count = len(self) - offset
+        if offset + count > len(self):
+            raise ValueError("Read of %d samples at %d overflows %d sample buffer" % (count, offset, len(self)))
+        nBytes = count * self.data.itemsize
+        if index is None:
+            dwf.FDwfDigitalInStatusData(hdwf, as_pointer(self.data, offset), c_int(nBytes))
+        else:
+            dwf.FDwfDigitalInStatusData2(hdwf, as_pointer(self.data, offset), c_int(index), c_int(nBytes))
+        return self.data[offset:offset + count]
@@ -0,0 +1,145 @@
+"""
+   DWF device session
+   Keeps the loaded library and an open device handle together so one
+   open device can be reused for any number of SET/RESET/READ cycles.
+
+   Set DWF_SIMULATE=1 in the environment to run against dwfsim instead
+   of the installed library. DWF_SIMULATE_LATENCY (seconds per status or
+   data call) and DWF_SIMULATE_BANDWIDTH (bytes per second of record
+   data) set up the simulated USB link.
+"""
+
+from ctypes import *
+from dwfconstants import *
+from awgcache import AnalogOutCache
+import os
+import sys
+
+_library = None
+
+
+def load_library(simulated=None):
+    # the library is loaded once per process and shared by all sessions
+    global _library
+    if simulated is None:
+        simulated = os.environ.get("DWF_SIMULATE", "") not in ("", "0")
+    if simulated:
+        import dwfsim
+        bandwidth = os.environ.get("DWF_SIMULATE_BANDWIDTH")
+        return dwfsim.SimDwf(latency=float(os.environ.get("DWF_SIMULATE_LATENCY", 0)),
+                             bandwidth=float(bandwidth) if bandwidth else None)
+    if _library is None:
+        if sys.platform.startswith("win"):
+            _library = cdll.dwf
+        elif sys.platform.startswith("darwin"):
+            _library = cdll.LoadLibrary("/Library/Frameworks/dwf.framework/dwf")
+        else:
+            _library = cdll.LoadLibrary("libdwf.so")
+    return _library
+
+
+def last_error(dwf):
+    szerr = create_string_buffer(512)
+    dwf.FDwfGetLastErrorMsg(szerr)
+    return szerr.value.decode()
+
+
+def find_device(dwf, serial):
+    # index of the enumerated device with the given serial number, or -1
+    cDevice = c_int()
+    serialnum = create_string_buffer(16)
+    dwf.FDwfEnum(enumfilterAll, byref(cDevice))
+    for iDev in range(cDevice.value):
+        dwf.FDwfEnumSN(c_int(iDev), serialnum)
+        sn = serialnum.value.decode()
+        if sn == serial or sn.split(":")[-1] == serial:
+            return iDev
+    return -1
+
+
+def first_free_device(dwf):
+    # index of the first enumerated device that is not opened, the one
+    # FDwfDeviceOpen(-1) picks, or -1
+    cDevice = c_int()
+    fIsUsed = c_int()
+    dwf.FDwfEnum(enumfilterAll, byref(cDevice))
+    for iDev in range(cDevice.value):
+        dwf.FDwfEnumDeviceIsOpened(c_int(iDev), byref(fIsUsed))
+        if not fIsUsed.value:
+            return iDev
+    return -1
+
+
+class DwfSession:
+    def __init__(self, serial=None, index=-1, config=None, dwf=None, on_close=0, auto_configure=0):
+        self.dwf = dwf if dwf is not None else load_library()
+        self.serial = serial
+        self.index = index
+        self.config = config
+        self.on_close = on_close
+        self.auto_configure = auto_configure
+        self.hdwf = c_int(hdwfNone.value)
+        self._analog_out = None
+
+    @property
+    def is_open(self):
+        return self.hdwf.value != hdwfNone.value
+
+    def open(self):
+        if self.is_open:
+            return self
+
+        index = self.index
+        if self.serial is not None:
+            index = find_device(self.dwf, self.serial)
+            if index < 0:
+                raise RuntimeError("Device %s not found" % self.serial)
+        elif index < 0:
+            # resolve the first free device so its serial can be recorded below
+            index = first_free_device(self.dwf)
+            if index < 0:
+                raise RuntimeError("No free device found")
+
+        self.dwf.FDwfParamSet(DwfParamOnClose, c_int(self.on_close))
+        if self.config is None:
+            self.dwf.FDwfDeviceOpen(c_int(index), byref(self.hdwf))
+        else:
+            self.dwf.FDwfDeviceConfigOpen(c_int(index), c_int(self.config), byref(self.hdwf))
+
+        if not self.is_open:
+            raise RuntimeError("Failed to open device: " + last_error(self.dwf))
+
+        if self.serial is None:
+            # remember what was opened so reopen() finds the same device
+            serialnum = create_string_buffer(16)
+            self.dwf.FDwfEnumSN(c_int(index), serialnum)
+            self.serial = serialnum.value.decode()
+
+        self.dwf.FDwfDeviceAutoConfigureSet(self.hdwf, c_int(self.auto_configure))
+        return self
+
+    @property
+    def analog_out(self):
+        # AnalogOut shadow registers, valid for the current handle only
+        if self._analog_out is None:
+            self._analog_out = AnalogOutCache(self.dwf, self.hdwf)
+        return self._analog_out
+
+    def close(self):
+        if self.is_open:
+            self.dwf.FDwfDeviceClose(self.hdwf)
+            self.hdwf = c_int(hdwfNone.value)
+        self._analog_out = None
+
+    def reopen(self, serial=None):
+        self.close()
+        if serial is not None:
+            self.serial = serial
+        return self.open()
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
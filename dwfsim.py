@@ -0,0 +1,1269 @@
+"""
+   Simulated DWF library
+   Stand-in for cdll.LoadLibrary("libdwf.so") so device handling can be
+   exercised without hardware attached.
+
+   Functions take the same ctypes arguments as the real library. Calls
+   that are not simulated explicitly are accepted, counted and return 1.
+   latency adds a USB round trip, in seconds, to every status and data
+   call.
+
+   AnalogOut channel n is wired to scope channel n and every DigitalOut
+   line to the same DigitalIn line (SimDevice.loopback), so captures
+   show the configured waveforms and patterns. Without them the scope
+   sees a test sine and DigitalIn a binary counter.
+
+   Record and the scan modes make samples available at the sample rate,
+   scan screen writes them around the buffer at FDwf*StatusIndexWrite
+   and scan shift returns the latest of them in order. bandwidth
+   limits the link in bytes per second: what it cannot carry stays in
+   the device buffer and is lost once that overflows. SimDevice.inject()
+   queues lost / corrupted events for the next record or play status.
+   DigitalIn record mode can also be read compressed, as value and run
+   length pairs split where a sensible line changes.
+
+   clock is the time source, time.perf_counter by default. With a
+   ManualClock time only moves when advanced, latency included, which
+   makes throughput tests deterministic.
+"""
+
+from ctypes import *
+from collections import Counter
+import numpy as np
+import re
+import time
+
+
+def _val(arg):
+    # plain value of a ctypes scalar, byref() argument or python number
+    arg = getattr(arg, "_obj", arg)
+    return getattr(arg, "value", arg)
+
+
+def _store(ref, value):
+    # write a result through a byref() argument or ctypes instance
+    getattr(ref, "_obj", ref).value = value
+
+
+def _address(arg):
+    # memory address behind a data argument: ctypes array or pointer,
+    # byref(array, offset), c_void_p or a plain integer address
+    if isinstance(arg, int):
+        return arg
+    if isinstance(arg, c_void_p):
+        return arg.value
+    if hasattr(arg, "_obj"):
+        # byref() keeps no public offset, its repr carries the final address
+        return int(re.search(r"\((0x[0-9a-fA-F]+)\)", repr(arg)).group(1), 16)
+    return cast(arg, c_void_p).value
+
+
+def _write(dest, array):
+    array = np.ascontiguousarray(array)
+    memmove(_address(dest), array.ctypes.data, array.nbytes)
+
+
+def _read(src, count, dtype):
+    # copy of count items behind a data argument
+    array = np.empty(count, dtype=dtype)
+    memmove(array.ctypes.data, _address(src), array.nbytes)
+    return array
+
+
+class ManualClock:
+    # time source that only moves when advanced
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def _waveform(awg, t, seed=0):
+    # AnalogOut carrier at times t, in volts
+    func = awg["func"]
+    x = t * awg["hz"] + awg["phase"] / 360.0
+    frac = x % 1.0
+    symmetry = min(max(awg["symmetry"] / 100.0, 1e-9), 1 - 1e-9)
+    if func == 1: # funcSine
+        wave = np.sin(2 * np.pi * x)
+    elif func == 2: # funcSquare
+        wave = np.where(frac < symmetry, 1.0, -1.0)
+    elif func == 3: # funcTriangle
+        wave = np.where(frac < symmetry, -1 + 2 * frac / symmetry, 1 - 2 * (frac - symmetry) / (1 - symmetry))
+    elif func == 4: # funcRampUp
+        wave = 2 * frac - 1
+    elif func == 5: # funcRampDown
+        wave = 1 - 2 * frac
+    elif func == 6: # funcNoise
+        wave = np.random.default_rng(seed).uniform(-1, 1, len(t))
+    elif func == 30 and len(awg["data"]): # funcCustom
+        wave = awg["data"][(frac * len(awg["data"])).astype(int)]
+    else:
+        # funcDC, and play mode which is not looped back
+        wave = np.zeros(len(t))
+    return awg["offset"] + awg["amplitude"] * wave
+
+
+def _pattern(line, steps):
+    # level of a DigitalOut line after steps of its divider
+    kind = line["type"]
+    if kind == 0: # DwfDigitalOutTypePulse
+        period = line["low"] + line["high"]
+        if period == 0:
+            return np.full(len(steps), int(line["init_high"]))
+        phase = (steps + line["init_count"]) % period
+        return (phase < line["high"] if line["init_high"] else phase >= line["low"]).astype(np.int64)
+    if kind == 1 and len(line["bits"]): # DwfDigitalOutTypeCustom
+        return line["bits"][steps % len(line["bits"])].astype(np.int64)
+    if kind == 2: # DwfDigitalOutTypeRandom
+        return ((steps * 2654435761) >> 16) & 1
+    return np.zeros(len(steps), dtype=np.int64)
+
+
+# buffer sizes of the Analog Discovery 2 configurations
+AD2_CONFIGS = (
+    dict(analog_in_buffer=8192, analog_out_buffer=4096, digital_in_buffer=4096, digital_out_buffer=1024, text=""),
+    dict(analog_in_buffer=16384, analog_out_buffer=1024, digital_in_buffer=1024, digital_out_buffer=1024, text="Scope"),
+    dict(analog_in_buffer=2048, analog_out_buffer=16384, digital_in_buffer=1024, digital_out_buffer=1024, text="Wavegen"),
+    dict(analog_in_buffer=512, analog_out_buffer=256, digital_in_buffer=16384, digital_out_buffer=16384, text="Logic"),
+    dict(analog_in_buffer=8192, analog_out_buffer=4096, digital_in_buffer=1024, digital_out_buffer=1024, text="Pattern"),
+)
+
+
+class SimDevice:
+    def __init__(self, serial="SN:210321A00000", name="Analog Discovery 2", devid=3, devver=2):
+        self.serial = serial
+        self.name = name
+        self.devid = devid
+        self.devver = devver
+        self.hdwf = 0
+        # trigger pin -> source, set by FDwfDeviceTriggerSet
+        self.triggers = {}
+        # delay of this device's trigger input, to test skew measurement
+        self.skew = 0.0
+        # UTC seconds FDwf*StatusTime adds to the clock, at today's magnitude
+        # seconds in a float64 resolve only about 0.24 us
+        self.utc = 1790000000
+        # test signal seen on the scope inputs, channel n is shifted by n*90 degrees
+        self.signal_hz = 1e3
+        self.signal_volts = 1.0
+        self.analog_in = dict(hz=100e6, buffer=8192, range={}, offset={}, enabled={0: 1, 1: 1}, start=0,
+                              mode=0, record_length=0.0, record=None, trigsrc=0, auto_timeout=0.0, ready=0.0,
+                              done=False, buffers=1, trigger_time=0.0, scan=None)
+        self.digital_in = dict(divider=1, format=16, buffer=4096, start=0, mode=0, position=0, record=None,
+                               trigsrc=0, trigger=(0, 0, 0, 0), cursor=None, event=None, trigger_time=0.0, scan=None,
+                               sensible=0xFFFFFFFF, compressed=None)
+        # device under test for the impedance analyzer, series RLC
+        self.dut = lambda hz: 100.0 + 2j * np.pi * hz * 1e-3 + 1 / (2j * np.pi * hz * 1e-9)
+        # AnalogOut channels, created on first use
+        self.analog_out = {}
+        self.awg_buffer = 4096
+        # device configurations as FDwfEnumConfigInfo reports them, the first is the default
+        self.configs = [dict(config, analog_in_channels=2, analog_out_channels=2, analog_io_channels=2,
+                             digital_in_channels=16, digital_out_channels=16, digital_io_channels=16)
+                        for config in AD2_CONFIGS]
+        self.config = 0
+        # USB link counters, read through AnalogIO channel 14
+        self.usb = dict(bytes_to=0, bytes_from=0, sec_to=0.0, sec_from=0.0, history=[(time.perf_counter(), 0, 0)])
+        self.impedance = dict(mode=0, reference=1e3, hz=1e3, amplitude=1.0, offset=0.0, periods=16,
+                              compensation=(0.0, 0.0, 0.0, 0.0), ready=0.0)
+        # DigitalOut lines, created on first use, run time and start of all of them
+        self.digital_out = dict(lines={}, run=0.0, t0=None)
+        # AnalogOut and DigitalOut drive the inputs while they run
+        self.loopback = True
+        # (lost, corrupted) events for the next record or play status
+        self.faults = dict(analog_in=[], digital_in=[], analog_out=[])
+
+    def inject(self, instrument="analog_in", lost=0, corrupted=0):
+        # instrument: analog_in, digital_in or analog_out
+        self.faults[instrument].append((lost, corrupted))
+
+    def analog_samples(self, channel, start, count):
+        ai = self.analog_in
+        t = (start + np.arange(count)) / ai["hz"]
+        awg = self.analog_out.get(channel)
+        if self.loopback and awg is not None and awg["enabled"] and awg["t0"] is not None:
+            # the phase is kept relative to sample 0, not to the AnalogOut start
+            return _waveform(awg, t, start)
+        return self.signal_volts * np.sin(2 * np.pi * self.signal_hz * t + channel * np.pi / 2)
+
+    def digital_samples(self, start, count):
+        # binary counter on the DIO lines, running DigitalOut lines replace their bit
+        data = start + np.arange(count, dtype=np.int64)
+        do = self.digital_out
+        if self.loopback and do["t0"] is not None:
+            ticks = data * max(1, self.digital_in["divider"])
+            for index, line in do["lines"].items():
+                if line["enabled"]:
+                    bit = _pattern(line, ticks // max(1, line["divider"]))
+                    data = (data & ~(1 << index)) | (bit << index)
+        return data
+
+
+class SimDwf:
+    def __init__(self, devices=None, latency=0.0, bandwidth=None, clock=None):
+        self.devices = devices if devices is not None else [SimDevice()]
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.clock = clock or time.perf_counter
+        self.calls = Counter()
+        self.params = {}
+        self.handles = {}
+        self.error = ""
+        self._next_handle = 1
+        self._enum_device = self.devices[0] if self.devices else None
+
+    def __getattr__(self, name):
+        if not name.startswith("FDwf"):
+            raise AttributeError(name)
+        def call(*args):
+            self.calls[name] += 1
+            return 1
+        return call
+
+    def _count(self, name):
+        self.calls[name] += 1
+
+    def _transfer(self, hdwf, received=0, sent=16):
+        # every status or data call is one command out and a reply of received bytes
+        usb = self._device(hdwf).usb
+        usb["bytes_to"] += sent
+        usb["bytes_from"] += received
+        usb["sec_to"] = usb["sec_from"] = self.latency
+        if self.latency:
+            if hasattr(self.clock, "advance"):
+                self.clock.advance(self.latency)
+            else:
+                time.sleep(self.latency)
+
+    # version and errors
+
+    def FDwfGetVersion(self, version):
+        self._count("FDwfGetVersion")
+        version.value = b"3.22.2 sim"
+        return 1
+
+    def FDwfGetLastErrorMsg(self, szerr):
+        self._count("FDwfGetLastErrorMsg")
+        szerr.value = self.error.encode()
+        return 1
+
+    def FDwfParamSet(self, param, value):
+        self._count("FDwfParamSet")
+        self.params[_val(param)] = _val(value)
+        return 1
+
+    # enumeration
+
+    def FDwfEnum(self, enumfilter, pcDevice):
+        self._count("FDwfEnum")
+        _store(pcDevice, len(self.devices))
+        return 1
+
+    def FDwfEnumDeviceName(self, idxDevice, szDeviceName):
+        self._count("FDwfEnumDeviceName")
+        szDeviceName.value = self.devices[_val(idxDevice)].name.encode()
+        return 1
+
+    def FDwfEnumSN(self, idxDevice, szSN):
+        self._count("FDwfEnumSN")
+        szSN.value = self.devices[_val(idxDevice)].serial.encode()
+        return 1
+
+    def FDwfEnumDeviceType(self, idxDevice, pDeviceId, pDeviceRevision):
+        self._count("FDwfEnumDeviceType")
+        device = self.devices[_val(idxDevice)]
+        _store(pDeviceId, device.devid)
+        _store(pDeviceRevision, device.devver)
+        return 1
+
+    def FDwfEnumDeviceIsOpened(self, idxDevice, pfIsUsed):
+        self._count("FDwfEnumDeviceIsOpened")
+        _store(pfIsUsed, int(self.devices[_val(idxDevice)].hdwf != 0))
+        return 1
+
+    def FDwfEnumConfig(self, idxDevice, pcConfig):
+        # selects the device FDwfEnumConfigInfo reports on
+        self._count("FDwfEnumConfig")
+        self._enum_device = self.devices[_val(idxDevice)]
+        _store(pcConfig, len(self._enum_device.configs))
+        return 1
+
+    def FDwfEnumConfigInfo(self, idxConfig, info, pInfo):
+        self._count("FDwfEnumConfigInfo")
+        config = self._enum_device.configs[_val(idxConfig)]
+        info = _val(info)
+        if info == -2:
+            pInfo.value = config["text"].encode()
+            return 1
+        names = {1: "analog_in_channels", 2: "analog_out_channels", 3: "analog_io_channels",
+                 4: "digital_in_channels", 5: "digital_out_channels", 6: "digital_io_channels",
+                 7: "analog_in_buffer", 8: "analog_out_buffer", 9: "digital_in_buffer", 10: "digital_out_buffer"}
+        _store(pInfo, config.get(names.get(info), 0))
+        return 1
+
+    # open and close
+
+    def FDwfDeviceOpen(self, idxDevice, phdwf):
+        self._count("FDwfDeviceOpen")
+        return self._open(_val(idxDevice), phdwf, 0)
+
+    def FDwfDeviceConfigOpen(self, idxDevice, idxCfg, phdwf):
+        self._count("FDwfDeviceConfigOpen")
+        return self._open(_val(idxDevice), phdwf, _val(idxCfg))
+
+    def _open(self, idx, phdwf, config):
+        if idx == -1:
+            idx = next((i for i, d in enumerate(self.devices) if d.hdwf == 0), len(self.devices))
+        if idx >= len(self.devices) or self.devices[idx].hdwf != 0:
+            self.error = "Device not found or already opened"
+            _store(phdwf, 0)
+            return 0
+        device = self.devices[idx]
+        if config >= len(device.configs):
+            self.error = "Invalid configuration"
+            _store(phdwf, 0)
+            return 0
+        # the configuration sets the instrument buffers
+        device.config = config
+        buffers = device.configs[config]
+        device.analog_in["buffer"] = buffers["analog_in_buffer"]
+        device.digital_in["buffer"] = buffers["digital_in_buffer"]
+        device.awg_buffer = buffers["analog_out_buffer"]
+        device.hdwf = self._next_handle
+        self._next_handle += 1
+        self.handles[device.hdwf] = device
+        device.usb["history"] = [(self.clock(), device.usb["bytes_to"], device.usb["bytes_from"])]
+        self.error = ""
+        _store(phdwf, device.hdwf)
+        return 1
+
+    def FDwfDeviceClose(self, hdwf):
+        self._count("FDwfDeviceClose")
+        device = self.handles.pop(_val(hdwf), None)
+        if device is None:
+            return 0
+        device.hdwf = 0
+        return 1
+
+    def FDwfDeviceCloseAll(self):
+        self._count("FDwfDeviceCloseAll")
+        for device in self.handles.values():
+            device.hdwf = 0
+        self.handles.clear()
+        return 1
+
+    # instruments
+
+    def FDwfDigitalOutInternalClockInfo(self, hdwf, phzFreq):
+        self._count("FDwfDigitalOutInternalClockInfo")
+        _store(phzFreq, 100e6)
+        return 1
+
+    def _device(self, hdwf):
+        return self.handles[_val(hdwf)]
+
+    # triggers, the external trigger pins of all simulated devices are wired together
+
+    def FDwfDeviceTriggerSet(self, hdwf, idxPin, trigsrc):
+        self._count("FDwfDeviceTriggerSet")
+        self._device(hdwf).triggers[_val(idxPin)] = _val(trigsrc)
+        return 1
+
+    def FDwfDeviceTriggerPC(self, hdwf):
+        self._count("FDwfDeviceTriggerPC")
+        now = self.clock()
+        device = self._device(hdwf)
+        fired = {1} # trigsrcPC
+        external = {11 + pin for pin, source in device.triggers.items() if source == 1}
+        for other in self.handles.values():
+            sources = fired | external if other is device else external
+            if other.analog_in["trigsrc"] in sources and other.analog_in["ready"] is None:
+                self._trigger(other, now + other.skew)
+        return 1
+
+    # record mode, samples become available in real time at the sample rate.
+    # Without a bandwidth limit whatever does not fit the device buffer between
+    # two status reads is lost. With one the link moves at most bandwidth bytes
+    # per second, the rest waits in the device buffer and is lost when it overflows
+
+    def _record_start(self, instrument, hz, total, size):
+        # size: bytes per sample of all channels
+        now = self.clock()
+        instrument["record"] = dict(hz=hz, t0=now, time=now, size=size, credit=0.0, total=total,
+                                    delivered=0, first=0, available=0, lost=0, corrupted=0)
+
+    def _record_status(self, instrument, faults):
+        record = instrument["record"]
+        now = self.clock()
+        produced = int((now - record["t0"]) * record["hz"])
+        if record["total"] is not None:
+            produced = min(produced, record["total"])
+        pending = produced - record["delivered"]
+        if self.bandwidth:
+            link = record["credit"] + (now - record["time"]) * self.bandwidth / record["size"]
+            moved = min(pending, int(link))
+            record["credit"] = link - moved if moved < pending else 0.0
+            lost = max(0, pending - moved - instrument["buffer"])
+            available = min(moved, pending - lost)
+        else:
+            lost = max(0, pending - instrument["buffer"])
+            available = pending - lost
+        corrupted = 0
+        if faults:
+            extra, corrupted = faults.pop(0)
+            extra = min(extra, available)
+            lost += extra
+            available -= extra
+        record["time"] = now
+        record["lost"] = lost
+        record["corrupted"] = corrupted
+        record["first"] = record["delivered"] + lost
+        record["available"] = available
+        record["delivered"] += lost + available
+        if record["total"] is not None and record["delivered"] >= record["total"]:
+            return 2 # DwfStateDone
+        return 3 # DwfStateRunning
+
+    def _record_info(self, instrument, pcdDataAvailable, pcdDataLost, pcdDataCorrupt):
+        record = instrument["record"] or dict(available=0, lost=0, corrupted=0)
+        _store(pcdDataAvailable, record["available"])
+        _store(pcdDataLost, record["lost"])
+        _store(pcdDataCorrupt, record["corrupted"])
+        return 1
+
+    # AnalogIn
+
+    def FDwfAnalogInFrequencySet(self, hdwf, hzFrequency):
+        self._count("FDwfAnalogInFrequencySet")
+        self._device(hdwf).analog_in["hz"] = min(_val(hzFrequency), 100e6)
+        return 1
+
+    def FDwfAnalogInFrequencyGet(self, hdwf, phzFrequency):
+        self._count("FDwfAnalogInFrequencyGet")
+        _store(phzFrequency, self._device(hdwf).analog_in["hz"])
+        return 1
+
+    def FDwfAnalogInBufferSizeInfo(self, hdwf, pnSizeMin, pnSizeMax):
+        self._count("FDwfAnalogInBufferSizeInfo")
+        if pnSizeMin:
+            _store(pnSizeMin, 16)
+        device = self._device(hdwf)
+        _store(pnSizeMax, device.configs[device.config]["analog_in_buffer"])
+        return 1
+
+    def FDwfAnalogInBufferSizeSet(self, hdwf, nSize):
+        self._count("FDwfAnalogInBufferSizeSet")
+        self._device(hdwf).analog_in["buffer"] = _val(nSize)
+        return 1
+
+    def FDwfAnalogInBufferSizeGet(self, hdwf, pnSize):
+        self._count("FDwfAnalogInBufferSizeGet")
+        _store(pnSize, self._device(hdwf).analog_in["buffer"])
+        return 1
+
+    def FDwfAnalogInChannelEnableSet(self, hdwf, idxChannel, fEnable):
+        self._count("FDwfAnalogInChannelEnableSet")
+        self._device(hdwf).analog_in["enabled"][_val(idxChannel)] = int(_val(fEnable))
+        return 1
+
+    def FDwfAnalogInChannelRangeSet(self, hdwf, idxChannel, voltsRange):
+        self._count("FDwfAnalogInChannelRangeSet")
+        self._device(hdwf).analog_in["range"][_val(idxChannel)] = _val(voltsRange)
+        return 1
+
+    def FDwfAnalogInChannelOffsetSet(self, hdwf, idxChannel, voltOffset):
+        self._count("FDwfAnalogInChannelOffsetSet")
+        self._device(hdwf).analog_in["offset"][_val(idxChannel)] = _val(voltOffset)
+        return 1
+
+    def FDwfAnalogInAcquisitionModeSet(self, hdwf, acqmode):
+        self._count("FDwfAnalogInAcquisitionModeSet")
+        self._device(hdwf).analog_in["mode"] = _val(acqmode)
+        return 1
+
+    def FDwfAnalogInRecordLengthSet(self, hdwf, sLength):
+        self._count("FDwfAnalogInRecordLengthSet")
+        self._device(hdwf).analog_in["record_length"] = _val(sLength)
+        return 1
+
+    def FDwfAnalogInTriggerSourceSet(self, hdwf, trigsrc):
+        self._count("FDwfAnalogInTriggerSourceSet")
+        self._device(hdwf).analog_in["trigsrc"] = _val(trigsrc)
+        return 1
+
+    def FDwfAnalogInTriggerAutoTimeoutSet(self, hdwf, secTimeout):
+        self._count("FDwfAnalogInTriggerAutoTimeoutSet")
+        self._device(hdwf).analog_in["auto_timeout"] = _val(secTimeout)
+        return 1
+
+    def FDwfAnalogInConfigure(self, hdwf, fReconfigure, fStart):
+        self._count("FDwfAnalogInConfigure")
+        device = self._device(hdwf)
+        ai = device.analog_in
+        ai["scan"] = None
+        if _val(fStart):
+            ai["start"] += ai["buffer"]
+            if ai["mode"] in (1, 2): # acqmodeScanShift, acqmodeScanScreen
+                self._scan_start(ai, ai["hz"])
+            elif ai["mode"] == 3: # acqmodeRecord
+                length = ai["record_length"]
+                channels = max(1, sum(1 for enabled in ai["enabled"].values() if enabled))
+                self._record_start(ai, ai["hz"], int(length * ai["hz"]) if length > 0 else None, 2 * channels)
+            else:
+                self._arm(device)
+        else:
+            ai["record"] = None
+        return 1
+
+    # scan modes write samples around the buffer at the sample rate, the
+    # write index and the data reads follow the last status
+
+    def _scan_start(self, instrument, hz):
+        now = self.clock()
+        instrument["scan"] = dict(hz=hz, t0=now, first=int(now * hz), written=0)
+
+    def _scan_status(self, instrument):
+        scan = instrument["scan"]
+        scan["written"] = int((self.clock() - scan["t0"]) * scan["hz"])
+        return 3 # DwfStateTriggered
+
+    def _scan_valid(self, instrument):
+        return min(instrument["scan"]["written"], instrument["buffer"])
+
+    def _scan_pieces(self, instrument, index, count):
+        # (first sample, count) pieces read from buffer index on: scan shift
+        # holds the latest samples oldest first, scan screen the latest
+        # sample written at each buffer position
+        scan = instrument["scan"]
+        size = instrument["buffer"]
+        written = scan["written"]
+        if instrument["mode"] == 1:
+            return [(scan["first"] + written - self._scan_valid(instrument) + index, count)]
+        position = written % size
+        # positions before the write index hold this sweep, the rest the previous one
+        sweep = scan["first"] + written - position
+        pieces = []
+        if index < position:
+            n = min(count, position - index)
+            pieces.append((sweep + index, n))
+            index += n
+            count -= n
+        if count > 0:
+            pieces.append((sweep - size + index, count))
+        return pieces
+
+    def _arm(self, device, now=None):
+        # a single acquisition fills the buffer, then waits for the next
+        # rising zero crossing of the test signal, or of AnalogOut 1 when it
+        # drives the input, if a trigger is set.
+        # PC and external triggers wait for FDwfDeviceTriggerPC, the DigitalIn
+        # detector for a DigitalIn event
+        ai = device.analog_in
+        ai["done"] = False
+        if ai["trigsrc"] in (1, 3, 11, 12, 13, 14):
+            ai["ready"] = None
+            return
+        if now is None:
+            now = self.clock()
+        wait = ai["buffer"] / ai["hz"]
+        if ai["trigsrc"]:
+            awg = device.analog_out.get(0)
+            if device.loopback and awg is not None and awg["enabled"] and awg["t0"] is not None and awg["hz"] > 0:
+                period = 1 / awg["hz"]
+            else:
+                period = 1 / device.signal_hz
+            trigger = period - (now + wait) % period
+            if ai["auto_timeout"] > 0:
+                trigger = min(trigger, ai["auto_timeout"])
+            wait += trigger
+        ai["ready"] = now + wait
+        ai["trigger_time"] = ai["ready"]
+
+    def _trigger(self, device, t):
+        # the capture holds the buffer that follows the trigger
+        ai = device.analog_in
+        ai["start"] = int(round(t * ai["hz"])) - ai["buffer"]
+        ai["ready"] = t + ai["buffer"] / ai["hz"]
+        ai["trigger_time"] = t
+
+    def FDwfAnalogInStatus(self, hdwf, fReadData, psts):
+        self._count("FDwfAnalogInStatus")
+        self._transfer(hdwf, 64)
+        device = self._device(hdwf)
+        ai = device.analog_in
+        if ai["record"] is not None:
+            _store(psts, self._record_status(ai, device.faults["analog_in"]))
+        elif ai["scan"] is not None:
+            _store(psts, self._scan_status(ai))
+        elif ai["ready"] is None:
+            _store(psts, 1) # DwfStateArmed
+        elif ai["done"] or self.clock() < ai["ready"]:
+            _store(psts, 2 if ai["done"] else 3) # DwfStateDone, DwfStateRunning
+        else:
+            _store(psts, 2) # DwfStateDone
+            ai["start"] += ai["buffer"]
+            if ai["trigsrc"] in (1, 11, 12, 13, 14):
+                # single shot, stays done until started again
+                ai["done"] = True
+            else:
+                # the next acquisition starts right away, with device side buffers
+                # it follows the last one even when the status is read late
+                self._arm(device, ai["ready"] if ai["buffers"] > 1 else None)
+        return 1
+
+    def FDwfAnalogInBuffersSet(self, hdwf, cBuffers):
+        self._count("FDwfAnalogInBuffersSet")
+        self._device(hdwf).analog_in["buffers"] = max(1, min(_val(cBuffers), 32768))
+        return 1
+
+    def FDwfAnalogInBuffersGet(self, hdwf, pcBuffers):
+        self._count("FDwfAnalogInBuffersGet")
+        _store(pcBuffers, self._device(hdwf).analog_in["buffers"])
+        return 1
+
+    def FDwfAnalogInStatusTime(self, hdwf, psecUtc, ptick, pticksPerSecond):
+        # trigger time of the last capture on a 100 MHz tick counter
+        self._count("FDwfAnalogInStatusTime")
+        t = self._device(hdwf).analog_in["trigger_time"]
+        _store(psecUtc, self._device(hdwf).utc + int(t))
+        _store(ptick, int(round((t - int(t)) * 100e6)))
+        _store(pticksPerSecond, int(100e6))
+        return 1
+
+    def FDwfAnalogInStatusRecord(self, hdwf, pcdDataAvailable, pcdDataLost, pcdDataCorrupt):
+        self._count("FDwfAnalogInStatusRecord")
+        return self._record_info(self._device(hdwf).analog_in, pcdDataAvailable, pcdDataLost, pcdDataCorrupt)
+
+    def FDwfAnalogInStatusSamplesValid(self, hdwf, pcSamplesValid):
+        self._count("FDwfAnalogInStatusSamplesValid")
+        ai = self._device(hdwf).analog_in
+        _store(pcSamplesValid, self._scan_valid(ai) if ai["scan"] is not None else ai["buffer"])
+        return 1
+
+    def FDwfAnalogInStatusIndexWrite(self, hdwf, pidxWrite):
+        self._count("FDwfAnalogInStatusIndexWrite")
+        ai = self._device(hdwf).analog_in
+        _store(pidxWrite, ai["scan"]["written"] % ai["buffer"] if ai["scan"] is not None else 0)
+        return 1
+
+    def FDwfAnalogInStatusData(self, hdwf, idxChannel, rgdVoltData, cdData):
+        self._count("FDwfAnalogInStatusData")
+        return self._analog_data(hdwf, idxChannel, rgdVoltData, None, cdData, np.float64)
+
+    def FDwfAnalogInStatusData2(self, hdwf, idxChannel, rgdVoltData, idxData, cdData):
+        self._count("FDwfAnalogInStatusData2")
+        return self._analog_data(hdwf, idxChannel, rgdVoltData, idxData, cdData, np.float64)
+
+    def FDwfAnalogInStatusData16(self, hdwf, idxChannel, rgu16Data, idxData, cdData):
+        self._count("FDwfAnalogInStatusData16")
+        return self._analog_data(hdwf, idxChannel, rgu16Data, idxData, cdData, np.int16)
+
+    def _analog_data(self, hdwf, idxChannel, dest, idxData, cdData, dtype):
+        self._transfer(hdwf, 2 * _val(cdData))
+        device = self._device(hdwf)
+        ai = device.analog_in
+        channel = _val(idxChannel)
+        count = _val(cdData)
+        if ai["record"] is not None:
+            # record mode returns the samples made available by the last status
+            pieces = [(ai["record"]["first"] + (_val(idxData) if idxData is not None else 0), count)]
+        elif ai["scan"] is not None:
+            valid = self._scan_valid(ai)
+            pieces = self._scan_pieces(ai, valid - count if idxData is None else _val(idxData), count)
+        else:
+            # StatusData returns the last count samples of the buffer
+            pieces = [(ai["start"] + (ai["buffer"] - count if idxData is None else _val(idxData)), count)]
+        volts = np.concatenate([device.analog_samples(channel, first, n) for first, n in pieces])
+        if dtype is np.int16:
+            span = ai["range"].get(channel, 5.0)
+            raw = (volts - ai["offset"].get(channel, 0.0)) / span * 65536
+            _write(dest, np.clip(np.round(raw), -32768, 32767).astype(np.int16))
+        else:
+            _write(dest, volts)
+        return 1
+
+    # AnalogOut, the carrier node only. In play mode the device consumes
+    # samples at the node frequency and reports underruns as lost
+
+    def _awg(self, hdwf, idxChannel):
+        device = self._device(hdwf)
+        channel = _val(idxChannel)
+        if channel not in device.analog_out:
+            device.analog_out[channel] = dict(enabled=1, func=1, hz=1e3, amplitude=1.0, offset=0.0, symmetry=50.0,
+                                              phase=0.0, run=0.0, repeat=0, data=np.zeros(0), t0=None,
+                                              written=0, consumed=0, lost=0)
+        return device.analog_out[channel]
+
+    def FDwfAnalogOutNodeDataInfo(self, hdwf, idxChannel, node, pnSamplesMin, pnSamplesMax):
+        self._count("FDwfAnalogOutNodeDataInfo")
+        if pnSamplesMin:
+            _store(pnSamplesMin, 16)
+        _store(pnSamplesMax, self._device(hdwf).awg_buffer)
+        return 1
+
+    def FDwfAnalogOutNodeEnableSet(self, hdwf, idxChannel, node, fEnable):
+        self._count("FDwfAnalogOutNodeEnableSet")
+        if _val(node) == 0:
+            self._awg(hdwf, idxChannel)["enabled"] = int(_val(fEnable))
+        return 1
+
+    def FDwfAnalogOutNodeFunctionSet(self, hdwf, idxChannel, node, func):
+        self._count("FDwfAnalogOutNodeFunctionSet")
+        self._awg(hdwf, idxChannel)["func"] = _val(func)
+        return 1
+
+    def FDwfAnalogOutNodeFrequencySet(self, hdwf, idxChannel, node, hzFrequency):
+        self._count("FDwfAnalogOutNodeFrequencySet")
+        self._awg(hdwf, idxChannel)["hz"] = _val(hzFrequency)
+        return 1
+
+    def FDwfAnalogOutNodeAmplitudeSet(self, hdwf, idxChannel, node, vAmplitude):
+        self._count("FDwfAnalogOutNodeAmplitudeSet")
+        self._awg(hdwf, idxChannel)["amplitude"] = _val(vAmplitude)
+        return 1
+
+    def FDwfAnalogOutNodeOffsetSet(self, hdwf, idxChannel, node, vOffset):
+        self._count("FDwfAnalogOutNodeOffsetSet")
+        self._awg(hdwf, idxChannel)["offset"] = _val(vOffset)
+        return 1
+
+    def FDwfAnalogOutNodeSymmetrySet(self, hdwf, idxChannel, node, percentageSymmetry):
+        self._count("FDwfAnalogOutNodeSymmetrySet")
+        self._awg(hdwf, idxChannel)["symmetry"] = _val(percentageSymmetry)
+        return 1
+
+    def FDwfAnalogOutNodePhaseSet(self, hdwf, idxChannel, node, degreePhase):
+        self._count("FDwfAnalogOutNodePhaseSet")
+        self._awg(hdwf, idxChannel)["phase"] = _val(degreePhase)
+        return 1
+
+    # the older carrier only functions
+
+    def FDwfAnalogOutEnableSet(self, hdwf, idxChannel, fEnable):
+        return self.FDwfAnalogOutNodeEnableSet(hdwf, idxChannel, 0, fEnable)
+
+    def FDwfAnalogOutFunctionSet(self, hdwf, idxChannel, func):
+        return self.FDwfAnalogOutNodeFunctionSet(hdwf, idxChannel, 0, func)
+
+    def FDwfAnalogOutFrequencySet(self, hdwf, idxChannel, hzFrequency):
+        return self.FDwfAnalogOutNodeFrequencySet(hdwf, idxChannel, 0, hzFrequency)
+
+    def FDwfAnalogOutAmplitudeSet(self, hdwf, idxChannel, vAmplitude):
+        return self.FDwfAnalogOutNodeAmplitudeSet(hdwf, idxChannel, 0, vAmplitude)
+
+    def FDwfAnalogOutOffsetSet(self, hdwf, idxChannel, vOffset):
+        return self.FDwfAnalogOutNodeOffsetSet(hdwf, idxChannel, 0, vOffset)
+
+    def FDwfAnalogOutSymmetrySet(self, hdwf, idxChannel, percentageSymmetry):
+        return self.FDwfAnalogOutNodeSymmetrySet(hdwf, idxChannel, 0, percentageSymmetry)
+
+    def FDwfAnalogOutPhaseSet(self, hdwf, idxChannel, degreePhase):
+        return self.FDwfAnalogOutNodePhaseSet(hdwf, idxChannel, 0, degreePhase)
+
+    def FDwfAnalogOutDataSet(self, hdwf, idxChannel, rgdData, cdData):
+        return self.FDwfAnalogOutNodeDataSet(hdwf, idxChannel, 0, rgdData, cdData)
+
+    def FDwfAnalogOutRunSet(self, hdwf, idxChannel, secRun):
+        self._count("FDwfAnalogOutRunSet")
+        self._awg(hdwf, idxChannel)["run"] = _val(secRun)
+        return 1
+
+    def FDwfAnalogOutRepeatSet(self, hdwf, idxChannel, cRepeat):
+        self._count("FDwfAnalogOutRepeatSet")
+        self._awg(hdwf, idxChannel)["repeat"] = _val(cRepeat)
+        return 1
+
+    def FDwfAnalogOutNodeDataSet(self, hdwf, idxChannel, node, rgdData, cdData):
+        self._count("FDwfAnalogOutNodeDataSet")
+        awg = self._awg(hdwf, idxChannel)
+        count = _val(cdData)
+        awg["data"] = _read(rgdData, count, np.float64)
+        awg["written"] = count
+        self._transfer(hdwf, 0, 8 + 2 * count)
+        return 1
+
+    def FDwfAnalogOutNodePlayData(self, hdwf, idxChannel, node, rgdData, cdData):
+        self._count("FDwfAnalogOutNodePlayData")
+        awg = self._awg(hdwf, idxChannel)
+        awg["written"] += _val(cdData)
+        self._transfer(hdwf, 0, 8 + 2 * _val(cdData))
+        return 1
+
+    def FDwfAnalogOutConfigure(self, hdwf, idxChannel, fStart):
+        self._count("FDwfAnalogOutConfigure")
+        device = self._device(hdwf)
+        channels = list(device.analog_out) if _val(idxChannel) == -1 else [_val(idxChannel)]
+        for channel in channels:
+            awg = self._awg(hdwf, channel)
+            if _val(fStart) == 1:
+                awg.update(t0=self.clock(), consumed=0, lost=0)
+            elif _val(fStart) == 0:
+                awg["t0"] = None
+        return 1
+
+    def _awg_play(self, awg):
+        # advance playback to now, what the buffer could not supply is lost
+        elapsed = self.clock() - awg["t0"]
+        if awg["run"] > 0:
+            elapsed = min(elapsed, awg["run"])
+        consumed = int(elapsed * awg["hz"])
+        if awg["func"] == 31 and consumed > awg["written"]: # funcPlay
+            awg["lost"] += consumed - max(awg["written"], awg["consumed"])
+            awg["written"] = consumed
+        awg["consumed"] = consumed
+
+    def FDwfAnalogOutStatus(self, hdwf, idxChannel, psts):
+        self._count("FDwfAnalogOutStatus")
+        self._transfer(hdwf, 16)
+        awg = self._awg(hdwf, idxChannel)
+        if awg["t0"] is None:
+            _store(psts, 2) # DwfStateDone
+        elif awg["run"] > 0 and self.clock() - awg["t0"] >= awg["run"]:
+            self._awg_play(awg)
+            awg["t0"] = None
+            _store(psts, 2) # DwfStateDone
+        else:
+            _store(psts, 3) # DwfStateRunning
+        return 1
+
+    def FDwfAnalogOutNodePlayStatus(self, hdwf, idxChannel, node, cdDataFree, cdDataLost, cdDataCorrupted):
+        self._count("FDwfAnalogOutNodePlayStatus")
+        device = self._device(hdwf)
+        awg = self._awg(hdwf, idxChannel)
+        if awg["t0"] is not None:
+            self._awg_play(awg)
+        free = device.awg_buffer - (awg["written"] - awg["consumed"])
+        lost, corrupted = device.faults["analog_out"].pop(0) if device.faults["analog_out"] else (0, 0)
+        _store(cdDataFree, max(0, min(free, device.awg_buffer)))
+        _store(cdDataLost, awg["lost"] + lost)
+        _store(cdDataCorrupted, corrupted)
+        awg["lost"] = 0
+        return 1
+
+    # AnalogIO, channel 14 reports the USB link: 1/2 seconds per transfer to/from the
+    # device, 3/4 bytes per second to/from the device, 5/6 bytes to/from the device
+
+    def FDwfAnalogIOChannelNodeStatus(self, hdwf, idxChannel, idxNode, pvalue):
+        self._count("FDwfAnalogIOChannelNodeStatus")
+        if _val(idxChannel) != 14:
+            _store(pvalue, 0.0)
+            return 1
+        usb = self._device(hdwf).usb
+        node = _val(idxNode)
+        if node in (3, 4):
+            # rates over the last half second
+            now = self.clock()
+            history = usb["history"]
+            history.append((now, usb["bytes_to"], usb["bytes_from"]))
+            while len(history) > 2 and now - history[1][0] > 0.5:
+                history.pop(0)
+            t0, to0, from0 = history[0]
+            span = now - t0
+            if node == 3:
+                _store(pvalue, (usb["bytes_to"] - to0) / span if span > 0 else 0.0)
+            else:
+                _store(pvalue, (usb["bytes_from"] - from0) / span if span > 0 else 0.0)
+        else:
+            values = {1: usb["sec_to"], 2: usb["sec_from"], 5: usb["bytes_to"], 6: usb["bytes_from"]}
+            _store(pvalue, float(values.get(node, 0.0)))
+        return 1
+
+    # AnalogImpedance, a capture takes the configured number of signal
+    # periods and restarts whenever the frequency changes
+
+    def FDwfAnalogImpedanceReset(self, hdwf):
+        self._count("FDwfAnalogImpedanceReset")
+        device = self._device(hdwf)
+        device.impedance.update(mode=0, reference=1e3, hz=1e3, amplitude=1.0, offset=0.0, periods=16,
+                                compensation=(0.0, 0.0, 0.0, 0.0))
+        return 1
+
+    def FDwfAnalogImpedanceModeSet(self, hdwf, mode):
+        self._count("FDwfAnalogImpedanceModeSet")
+        self._device(hdwf).impedance["mode"] = _val(mode)
+        return 1
+
+    def FDwfAnalogImpedanceReferenceSet(self, hdwf, ohms):
+        self._count("FDwfAnalogImpedanceReferenceSet")
+        self._device(hdwf).impedance["reference"] = _val(ohms)
+        return 1
+
+    def FDwfAnalogImpedanceFrequencySet(self, hdwf, hz):
+        self._count("FDwfAnalogImpedanceFrequencySet")
+        ia = self._device(hdwf).impedance
+        ia["hz"] = _val(hz)
+        self._impedance_restart(ia)
+        return 1
+
+    def FDwfAnalogImpedanceAmplitudeSet(self, hdwf, volts):
+        self._count("FDwfAnalogImpedanceAmplitudeSet")
+        self._device(hdwf).impedance["amplitude"] = _val(volts)
+        return 1
+
+    def FDwfAnalogImpedanceOffsetSet(self, hdwf, volts):
+        self._count("FDwfAnalogImpedanceOffsetSet")
+        self._device(hdwf).impedance["offset"] = _val(volts)
+        return 1
+
+    def FDwfAnalogImpedancePeriodSet(self, hdwf, cMinPeriods):
+        self._count("FDwfAnalogImpedancePeriodSet")
+        self._device(hdwf).impedance["periods"] = _val(cMinPeriods)
+        return 1
+
+    def FDwfAnalogImpedanceCompReset(self, hdwf):
+        self._count("FDwfAnalogImpedanceCompReset")
+        self._device(hdwf).impedance["compensation"] = (0.0, 0.0, 0.0, 0.0)
+        return 1
+
+    def FDwfAnalogImpedanceCompSet(self, hdwf, openResistance, openReactance, shortResistance, shortReactance):
+        self._count("FDwfAnalogImpedanceCompSet")
+        self._device(hdwf).impedance["compensation"] = (_val(openResistance), _val(openReactance),
+                                                        _val(shortResistance), _val(shortReactance))
+        return 1
+
+    def FDwfAnalogImpedanceCompGet(self, hdwf, popenResistance, popenReactance, pshortResistance, pshortReactance):
+        self._count("FDwfAnalogImpedanceCompGet")
+        for ref, value in zip((popenResistance, popenReactance, pshortResistance, pshortReactance),
+                              self._device(hdwf).impedance["compensation"]):
+            _store(ref, value)
+        return 1
+
+    def FDwfAnalogImpedanceConfigure(self, hdwf, fStart):
+        self._count("FDwfAnalogImpedanceConfigure")
+        ia = self._device(hdwf).impedance
+        if _val(fStart):
+            self._impedance_restart(ia)
+        return 1
+
+    def _impedance_restart(self, ia):
+        ia["ready"] = self.clock() + ia["periods"] / ia["hz"]
+
+    def FDwfAnalogImpedanceStatus(self, hdwf, psts):
+        self._count("FDwfAnalogImpedanceStatus")
+        ia = self._device(hdwf).impedance
+        if psts is None:
+            # drop the last capture, force a new one
+            self._impedance_restart(ia)
+            return 1
+        if self.clock() < ia["ready"]:
+            _store(psts, 3) # DwfStateRunning
+        else:
+            _store(psts, 2) # DwfStateDone
+            self._impedance_restart(ia)
+        return 1
+
+    def FDwfAnalogImpedanceStatusMeasure(self, hdwf, measure, value):
+        self._count("FDwfAnalogImpedanceStatusMeasure")
+        device = self._device(hdwf)
+        z = complex(device.dut(device.impedance["hz"]))
+        w = 2 * np.pi * device.impedance["hz"]
+        y = 1 / z
+        values = {0: abs(z), 1: np.angle(z), 2: z.real, 3: z.imag, 4: abs(y), 5: np.angle(y),
+                  6: y.real, 7: y.imag, 8: -1 / (w * z.imag) if z.imag else 0.0,
+                  9: y.imag / w, 10: z.imag / w, 11: -1 / (w * y.imag) if y.imag else 0.0,
+                  12: abs(z.real / z.imag) if z.imag else 0.0, 13: abs(z.imag / z.real) if z.real else 0.0}
+        _store(value, float(values.get(_val(measure), 0.0)))
+        return 1
+
+    def FDwfAnalogImpedanceStatusWarning(self, hdwf, idxChannel, pWarning):
+        self._count("FDwfAnalogImpedanceStatusWarning")
+        _store(pWarning, 0)
+        return 1
+
+    # DigitalOut, pulse, custom and random lines clocked from 100 MHz
+
+    def _line(self, hdwf, idxChannel):
+        lines = self._device(hdwf).digital_out["lines"]
+        channel = _val(idxChannel)
+        if channel not in lines:
+            lines[channel] = dict(enabled=0, type=0, divider=1, low=0, high=0, init_high=0, init_count=0,
+                                  bits=np.zeros(0, dtype=np.uint8))
+        return lines[channel]
+
+    def FDwfDigitalOutReset(self, hdwf):
+        self._count("FDwfDigitalOutReset")
+        self._device(hdwf).digital_out.update(lines={}, run=0.0, t0=None)
+        return 1
+
+    def FDwfDigitalOutCount(self, hdwf, pcChannel):
+        self._count("FDwfDigitalOutCount")
+        _store(pcChannel, 16)
+        return 1
+
+    def FDwfDigitalOutEnableSet(self, hdwf, idxChannel, fEnable):
+        self._count("FDwfDigitalOutEnableSet")
+        self._line(hdwf, idxChannel)["enabled"] = int(_val(fEnable))
+        return 1
+
+    def FDwfDigitalOutTypeSet(self, hdwf, idxChannel, type):
+        self._count("FDwfDigitalOutTypeSet")
+        self._line(hdwf, idxChannel)["type"] = _val(type)
+        return 1
+
+    def FDwfDigitalOutDividerSet(self, hdwf, idxChannel, v):
+        self._count("FDwfDigitalOutDividerSet")
+        self._line(hdwf, idxChannel)["divider"] = _val(v)
+        return 1
+
+    def FDwfDigitalOutCounterInfo(self, hdwf, idxChannel, pvMin, pvMax):
+        self._count("FDwfDigitalOutCounterInfo")
+        if pvMin:
+            _store(pvMin, 0)
+        _store(pvMax, 32768)
+        return 1
+
+    def FDwfDigitalOutCounterSet(self, hdwf, idxChannel, vLow, vHigh):
+        self._count("FDwfDigitalOutCounterSet")
+        self._line(hdwf, idxChannel).update(low=_val(vLow), high=_val(vHigh))
+        return 1
+
+    def FDwfDigitalOutCounterInitSet(self, hdwf, idxChannel, fHigh, vInit):
+        self._count("FDwfDigitalOutCounterInitSet")
+        self._line(hdwf, idxChannel).update(init_high=int(_val(fHigh)), init_count=_val(vInit))
+        return 1
+
+    def FDwfDigitalOutDataInfo(self, hdwf, idxChannel, pcountOfBitsMax):
+        self._count("FDwfDigitalOutDataInfo")
+        _store(pcountOfBitsMax, 1024)
+        return 1
+
+    def FDwfDigitalOutDataSet(self, hdwf, idxChannel, rgBits, countOfBits):
+        # first bit is the LSB of the first byte
+        self._count("FDwfDigitalOutDataSet")
+        count = _val(countOfBits)
+        data = _read(rgBits, (count + 7) // 8, np.uint8)
+        self._line(hdwf, idxChannel)["bits"] = np.unpackbits(data, bitorder="little")[:count]
+        return 1
+
+    def FDwfDigitalOutRunSet(self, hdwf, secRun):
+        self._count("FDwfDigitalOutRunSet")
+        self._device(hdwf).digital_out["run"] = _val(secRun)
+        return 1
+
+    def FDwfDigitalOutConfigure(self, hdwf, fStart):
+        self._count("FDwfDigitalOutConfigure")
+        do = self._device(hdwf).digital_out
+        do["t0"] = self.clock() if _val(fStart) else None
+        return 1
+
+    def FDwfDigitalOutStatus(self, hdwf, psts):
+        self._count("FDwfDigitalOutStatus")
+        self._transfer(hdwf, 16)
+        do = self._device(hdwf).digital_out
+        if do["t0"] is not None and do["run"] > 0 and self.clock() - do["t0"] >= do["run"]:
+            do["t0"] = None
+        _store(psts, 2 if do["t0"] is None else 3) # DwfStateDone, DwfStateRunning
+        return 1
+
+    # DigitalIn
+
+    def FDwfDigitalInInternalClockInfo(self, hdwf, phzFreq):
+        self._count("FDwfDigitalInInternalClockInfo")
+        _store(phzFreq, 100e6)
+        return 1
+
+    def FDwfDigitalInDividerSet(self, hdwf, div):
+        self._count("FDwfDigitalInDividerSet")
+        self._device(hdwf).digital_in["divider"] = _val(div)
+        return 1
+
+    def FDwfDigitalInSampleFormatSet(self, hdwf, nBits):
+        self._count("FDwfDigitalInSampleFormatSet")
+        self._device(hdwf).digital_in["format"] = _val(nBits)
+        return 1
+
+    def FDwfDigitalInBufferSizeInfo(self, hdwf, pnSizeMax):
+        self._count("FDwfDigitalInBufferSizeInfo")
+        device = self._device(hdwf)
+        _store(pnSizeMax, device.configs[device.config]["digital_in_buffer"])
+        return 1
+
+    def FDwfDigitalInBufferSizeSet(self, hdwf, nSize):
+        self._count("FDwfDigitalInBufferSizeSet")
+        self._device(hdwf).digital_in["buffer"] = _val(nSize)
+        return 1
+
+    def FDwfDigitalInAcquisitionModeSet(self, hdwf, acqmode):
+        self._count("FDwfDigitalInAcquisitionModeSet")
+        self._device(hdwf).digital_in["mode"] = _val(acqmode)
+        return 1
+
+    def FDwfDigitalInTriggerPositionSet(self, hdwf, cSamplesAfterTrigger):
+        # in record mode the samples after trigger set the record length
+        self._count("FDwfDigitalInTriggerPositionSet")
+        di = self._device(hdwf).digital_in
+        di["position"] = _val(cSamplesAfterTrigger)
+        return 1
+
+    def FDwfDigitalInTriggerSourceSet(self, hdwf, trigsrc):
+        self._count("FDwfDigitalInTriggerSourceSet")
+        self._device(hdwf).digital_in["trigsrc"] = _val(trigsrc)
+        return 1
+
+    def FDwfDigitalInTriggerSet(self, hdwf, fsLevelLow, fsLevelHigh, fsEdgeRise, fsEdgeFall):
+        self._count("FDwfDigitalInTriggerSet")
+        self._device(hdwf).digital_in["trigger"] = (_val(fsLevelLow), _val(fsLevelHigh), _val(fsEdgeRise), _val(fsEdgeFall))
+        return 1
+
+    def FDwfDigitalInSampleSensibleSet(self, hdwf, fs):
+        self._count("FDwfDigitalInSampleSensibleSet")
+        self._device(hdwf).digital_in["sensible"] = _val(fs)
+        return 1
+
+    def FDwfDigitalInConfigure(self, hdwf, fReconfigure, fStart):
+        self._count("FDwfDigitalInConfigure")
+        di = self._device(hdwf).digital_in
+        di["scan"] = None
+        if _val(fStart):
+            di["start"] += di["buffer"]
+            if di["mode"] in (1, 2): # acqmodeScanShift, acqmodeScanScreen
+                self._scan_start(di, 100e6 / max(1, di["divider"]))
+            elif di["mode"] == 3: # acqmodeRecord
+                self._record_start(di, 100e6 / max(1, di["divider"]), di["position"] or None, di["format"] // 8)
+            elif di["trigsrc"] == 3: # trigsrcDetectorDigitalIn
+                di["cursor"] = int(self.clock() * 100e6 / max(1, di["divider"]))
+                di["event"] = None
+        else:
+            di["record"] = None
+            di["cursor"] = None
+        return 1
+
+    # the DigitalIn detector, low & high & (rise | fall), is searched in the samples
+    # up to now. At most _scan samples are searched per status, a detector that
+    # falls further behind skips ahead and misses events
+
+    _scan = 1 << 22
+
+    def _digital_event(self, device):
+        di = device.digital_in
+        rate = 100e6 / max(1, di["divider"])
+        low, high, rise, fall = di["trigger"]
+        pre = max(0, di["buffer"] - di["position"])
+        now = int(self.clock() * rate)
+        start = max(di["cursor"] + pre, now - self._scan)
+        if now <= start:
+            return
+        samples = device.digital_samples(start - 1, now - start + 1)
+        prev, samples = samples[:-1], samples[1:]
+        match = ((samples & low) == 0) & ((samples & high) == high)
+        if rise or fall:
+            match &= ((~prev & samples & rise) | (prev & ~samples & fall)) != 0
+        hits = np.flatnonzero(match)
+        if len(hits):
+            di["event"] = start + int(hits[0])
+        else:
+            di["cursor"] = now - pre
+
+    def FDwfDigitalInStatus(self, hdwf, fReadData, psts):
+        self._count("FDwfDigitalInStatus")
+        self._transfer(hdwf, 64)
+        device = self._device(hdwf)
+        di = device.digital_in
+        if di["record"] is not None:
+            _store(psts, self._record_status(di, device.faults["digital_in"]))
+        elif di["scan"] is not None:
+            _store(psts, self._scan_status(di))
+        elif di["cursor"] is not None:
+            rate = 100e6 / max(1, di["divider"])
+            if di["event"] is None:
+                self._digital_event(device)
+                if di["event"] is not None and device.analog_in["trigsrc"] == 3 and device.analog_in["ready"] is None:
+                    self._trigger(device, di["event"] / rate)
+            event = di["event"]
+            if event is None:
+                _store(psts, 1) # DwfStateArmed
+            elif self.clock() < (event + di["position"]) / rate:
+                _store(psts, 3) # DwfStateRunning
+            else:
+                _store(psts, 2) # DwfStateDone
+                # the capture holds the samples around the trigger, the device
+                # rearms now, events before this status are missed
+                di["start"] = event - max(0, di["buffer"] - di["position"])
+                di["trigger_time"] = event / rate
+                di["cursor"] = max(event + di["position"], int(self.clock() * rate))
+                di["event"] = None
+        else:
+            _store(psts, 2) # DwfStateDone
+        return 1
+
+    def FDwfDigitalInStatusTime(self, hdwf, psecUtc, ptick, pticksPerSecond):
+        self._count("FDwfDigitalInStatusTime")
+        t = self._device(hdwf).digital_in["trigger_time"]
+        _store(psecUtc, self._device(hdwf).utc + int(t))
+        _store(ptick, int(round((t - int(t)) * 100e6)))
+        _store(pticksPerSecond, int(100e6))
+        return 1
+
+    def FDwfDigitalInStatusRecord(self, hdwf, pcdDataAvailable, pcdDataLost, pcdDataCorrupt):
+        self._count("FDwfDigitalInStatusRecord")
+        return self._record_info(self._device(hdwf).digital_in, pcdDataAvailable, pcdDataLost, pcdDataCorrupt)
+
+    # compressed record mode, the samples of the last status as pairs of value and
+    # run length - 1, a run ends where a sensible line changes
+
+    def FDwfDigitalInStatusCompress(self, hdwf, pdwAvailable, pdwLost, pdwWarning):
+        self._count("FDwfDigitalInStatusCompress")
+        device = self._device(hdwf)
+        di = device.digital_in
+        record = di["record"]
+        words = np.zeros(0, dtype=np.uint32)
+        if record is not None and record["available"]:
+            samples = device.digital_samples(record["first"], record["available"]).astype(np.uint32)
+            masked = samples & np.uint32(di["sensible"])
+            at = np.concatenate(([0], np.flatnonzero(masked[1:] != masked[:-1]) + 1))
+            words = np.empty(2 * len(at), dtype=np.uint32)
+            words[0::2] = samples[at]
+            words[1::2] = np.diff(np.append(at, len(samples))) - 1
+        di["compressed"] = words
+        _store(pdwAvailable, len(words))
+        _store(pdwLost, record["lost"] if record is not None else 0)
+        _store(pdwWarning, 0)
+        return 1
+
+    def FDwfDigitalInStatusCompressed(self, hdwf, rgData, countOfDataBytes):
+        self._count("FDwfDigitalInStatusCompressed")
+        self._transfer(hdwf, _val(countOfDataBytes))
+        words = self._device(hdwf).digital_in["compressed"]
+        _write(rgData, words[:_val(countOfDataBytes) // 4])
+        return 1
+
+    def FDwfDigitalInStatusSamplesValid(self, hdwf, pcSamplesValid):
+        self._count("FDwfDigitalInStatusSamplesValid")
+        di = self._device(hdwf).digital_in
+        _store(pcSamplesValid, self._scan_valid(di) if di["scan"] is not None else di["buffer"])
+        return 1
+
+    def FDwfDigitalInStatusIndexWrite(self, hdwf, pidxWrite):
+        self._count("FDwfDigitalInStatusIndexWrite")
+        di = self._device(hdwf).digital_in
+        _store(pidxWrite, di["scan"]["written"] % di["buffer"] if di["scan"] is not None else 0)
+        return 1
+
+    def FDwfDigitalInStatusData(self, hdwf, rgData, countOfDataBytes):
+        self._count("FDwfDigitalInStatusData")
+        return self._digital_data(hdwf, rgData, None, countOfDataBytes)
+
+    def FDwfDigitalInStatusData2(self, hdwf, rgData, idxSample, countOfDataBytes):
+        self._count("FDwfDigitalInStatusData2")
+        return self._digital_data(hdwf, rgData, idxSample, countOfDataBytes)
+
+    def _digital_data(self, hdwf, dest, idxSample, countOfDataBytes):
+        self._transfer(hdwf, _val(countOfDataBytes))
+        device = self._device(hdwf)
+        di = device.digital_in
+        dtype = {8: np.uint8, 16: np.uint16, 32: np.uint32}[di["format"]]
+        count = _val(countOfDataBytes) // np.dtype(dtype).itemsize
+        if di["record"] is not None:
+            pieces = [(di["record"]["first"] + (_val(idxSample) if idxSample is not None else 0), count)]
+        elif di["scan"] is not None:
+            valid = self._scan_valid(di)
+            pieces = self._scan_pieces(di, valid - count if idxSample is None else _val(idxSample), count)
+        else:
+            pieces = [(di["start"] + (di["buffer"] - count if idxSample is None else _val(idxSample)), count)]
+        _write(dest, np.concatenate([device.digital_samples(first, n) for first, n in pieces]).astype(dtype))
+        return 1
@@ -0,0 +1,320 @@
+"""
+   Trigger timestamped event capture
+   DigitalIn_TriggerTime.py waits for one DigitalIn trigger at a time and
+   prints its FDwfDigitalInStatusTime. EventCapture keeps DigitalIn armed
+   on a trigger condition for hours and stores, per event, the trigger
+   time and a short window of samples around it, optionally with an
+   AnalogIn snapshot triggered by the same DigitalIn detector.
+
+   The device rearms itself when the status read returns Done, so the
+   time DigitalIn is blind is the time from the device finishing a
+   capture to the host seeing it. The acquisition thread therefore only
+   polls, reads the window into a preallocated slot and takes the
+   timestamp; storing and the callback run on a second thread, fed
+   through a queue of slots.
+
+   Events land in an EventStore, growing columns:
+       ticks     trigger time, sec * ticksec + tick of FDwfDigitalInStatusTime
+                 (hardware time on ADP3X50, software time on older devices)
+       host      host perf_counter when Done was seen
+       dead      upper bound of the blind time before this event: from the
+                 last status that was not Done, or the one that rearmed, to
+                 the one that was Done
+       digital   (events, pre + post) samples, the trigger at pre
+       analog    (events, channels, samples) volts, when enabled
+   Trigger times stay integer ticks, UTC seconds in a float64 only
+   resolve about 0.24 us. EventStore.ticksec holds the ticks per second,
+   seconds() the trigger times from the first event.
+   summary() gives event rate, trigger intervals and dead time statistics.
+"""
+
+from ctypes import *
+from dwfconstants import *
+from dwfbuffers import as_pointer
+import numpy as np
+import queue
+import threading
+import time
+
+
+class EventStore:
+    def __init__(self, window, dtype=np.uint8, analog_shape=None, capacity=1024):
+        # window: digital samples per event, analog_shape: (channels, samples) or None
+        self.window = window
+        self.analog_shape = analog_shape
+        self.count = 0
+        self.ticksec = 1
+        self.columns = dict(ticks=np.zeros(capacity, dtype=np.int64), host=np.zeros(capacity), dead=np.zeros(capacity),
+                            digital=np.zeros((capacity, window), dtype=dtype))
+        if analog_shape is not None:
+            self.columns["analog"] = np.zeros((capacity,) + tuple(analog_shape))
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, name):
+        return self.columns[name][:self.count]
+
+    def seconds(self):
+        # trigger times in seconds from the first event
+        ticks = self["ticks"]
+        return (ticks - ticks[:1]) / self.ticksec
+
+    def append(self, ticks, host, dead, digital, analog=None):
+        if self.count == len(self.columns["ticks"]):
+            # amortized growth, columns double when full
+            for name, column in self.columns.items():
+                grown = np.zeros((2 * len(column),) + column.shape[1:], dtype=column.dtype)
+                grown[:self.count] = column
+                self.columns[name] = grown
+        i = self.count
+        self.columns["ticks"][i] = ticks
+        self.columns["host"][i] = host
+        self.columns["dead"][i] = dead
+        self.columns["digital"][i] = digital
+        if analog is not None:
+            self.columns["analog"][i] = analog
+        self.count += 1
+
+    def save(self, path):
+        np.savez(path, ticksec=self.ticksec, **{name: self[name] for name in self.columns})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            digital = f["digital"]
+            analog = f["analog"] if "analog" in f.files else None
+            store = cls(digital.shape[1], digital.dtype, analog.shape[1:] if analog is not None else None,
+                        capacity=max(1, len(digital)))
+            for name in store.columns:
+                store.columns[name][:len(digital)] = f[name]
+            store.ticksec = int(f["ticksec"])
+        store.count = len(digital)
+        return store
+
+
+class EventCapture:
+    def __init__(self, session, pre=32, post=32, hz=100e6, bits=8, low=0, high=0, rise=1, fall=0,
+                 analog_channels=(), analog_samples=1024, analog_hz=100e6, volts_range=5.0, store=None,
+                 slots=64, poll_interval=0.0, callback=None):
+        # trigger: low & high & (rise | fall) bit masks of the DIO lines, rising DIO 0 by default
+        # slots: captures that can wait for the storing thread
+        self.session = session
+        self.pre = pre
+        self.post = post
+        self.hz = hz
+        self.bits = bits
+        self.trigger = (low, high, rise, fall)
+        self.analog_channels = tuple(analog_channels)
+        self.analog_samples = analog_samples
+        self.analog_hz = analog_hz
+        self.volts_range = volts_range
+        self.poll_interval = poll_interval
+        self.callback = callback
+        dtype = {8: np.uint8, 16: np.uint16, 32: np.uint32}[bits]
+        analog_shape = (len(self.analog_channels), analog_samples) if self.analog_channels else None
+        self.store = store if store is not None else EventStore(pre + post, dtype, analog_shape)
+        # preallocated capture slots, handed between the threads by index
+        self._digital = np.zeros((slots, pre + post), dtype=dtype)
+        self._analog = np.zeros((slots,) + analog_shape) if analog_shape else None
+        self._free = queue.Queue()
+        self._ready = queue.Queue()
+        for i in range(slots):
+            self._free.put(i)
+        self.polls = 0
+        self.error = None
+        self._stop = threading.Event()
+        self._threads = []
+        self._t0 = None
+        self._elapsed = None
+
+    def configure(self):
+        dwf, hdwf = self.session.dwf, self.session.hdwf
+        hzDI = c_double()
+        dwf.FDwfDigitalInInternalClockInfo(hdwf, byref(hzDI))
+        # trigger time resolution is given by the sample rate
+        dwf.FDwfDigitalInDividerSet(hdwf, c_int(max(1, int(round(hzDI.value / self.hz)))))
+        dwf.FDwfDigitalInSampleFormatSet(hdwf, c_int(self.bits))
+        dwf.FDwfDigitalInAcquisitionModeSet(hdwf, acqmodeSingle)
+        dwf.FDwfDigitalInBufferSizeSet(hdwf, c_int(self.pre + self.post))
+        dwf.FDwfDigitalInTriggerSourceSet(hdwf, trigsrcDetectorDigitalIn)
+        dwf.FDwfDigitalInTriggerPositionSet(hdwf, c_int(self.post))
+        dwf.FDwfDigitalInTriggerSet(hdwf, *[c_int(mask) for mask in self.trigger])
+        dwf.FDwfDigitalInConfigure(hdwf, c_int(1), c_int(0))
+
+        if self.analog_channels:
+            dwf.FDwfAnalogInFrequencySet(hdwf, c_double(self.analog_hz))
+            dwf.FDwfAnalogInBufferSizeSet(hdwf, c_int(self.analog_samples))
+            for channel in self.analog_channels:
+                dwf.FDwfAnalogInChannelEnableSet(hdwf, c_int(channel), c_int(1))
+                dwf.FDwfAnalogInChannelRangeSet(hdwf, c_int(channel), c_double(self.volts_range))
+            dwf.FDwfAnalogInAcquisitionModeSet(hdwf, acqmodeSingle)
+            dwf.FDwfAnalogInTriggerSourceSet(hdwf, trigsrcDetectorDigitalIn)
+            dwf.FDwfAnalogInTriggerAutoTimeoutSet(hdwf, c_double(0))
+            # the DigitalIn trigger in the middle of the snapshot
+            dwf.FDwfAnalogInTriggerPositionSet(hdwf, c_double(0))
+            dwf.FDwfAnalogInConfigure(hdwf, c_int(1), c_int(0))
+
+    def start(self):
+        self.configure()
+        dwf, hdwf = self.session.dwf, self.session.hdwf
+        self._stop.clear()
+        self._t0 = time.perf_counter()
+        # AnalogIn is armed first so it does not miss the first DigitalIn trigger
+        if self.analog_channels:
+            dwf.FDwfAnalogInConfigure(hdwf, c_int(0), c_int(1))
+        dwf.FDwfDigitalInConfigure(hdwf, c_int(0), c_int(1))
+        self._threads = [threading.Thread(target=self._acquire, name="EventCapture", daemon=True),
+                         threading.Thread(target=self._process, name="EventStore", daemon=True)]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self._elapsed = time.perf_counter() - self._t0
+        dwf, hdwf = self.session.dwf, self.session.hdwf
+        dwf.FDwfDigitalInConfigure(hdwf, c_int(0), c_int(0))
+        if self.analog_channels:
+            dwf.FDwfAnalogInConfigure(hdwf, c_int(0), c_int(0))
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    def wait(self, events, timeout=None):
+        # until the store holds events, False on timeout
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while len(self.store) < events and self.error is None:
+            if deadline is not None and time.perf_counter() > deadline:
+                return False
+            time.sleep(0.01)
+        return len(self.store) >= events
+
+    def _slot(self):
+        # next free slot, None when stopped while the storing thread is behind
+        while not self._stop.is_set():
+            try:
+                return self._free.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return None
+
+    def _acquire(self):
+        dwf, hdwf = self.session.dwf, self.session.hdwf
+        digitalStatus = dwf.FDwfDigitalInStatus
+        digitalData = dwf.FDwfDigitalInStatusData
+        analogStatus = dwf.FDwfAnalogInStatus
+        analogData = dwf.FDwfAnalogInStatusData
+        statusTime = dwf.FDwfDigitalInStatusTime
+        clock = time.perf_counter
+        fRead = c_int(1)
+        sts = c_byte()
+        sts_ref = byref(sts)
+        done = DwfStateDone.value
+        sec = c_uint()
+        tick = c_uint()
+        ticksec = c_uint()
+        time_refs = (byref(sec), byref(tick), byref(ticksec))
+        nBytes = c_int(self._digital.itemsize * self._digital.shape[1])
+        digital = [as_pointer(row, 0) for row in self._digital]
+        channels = [c_int(channel) for channel in self.analog_channels]
+        cSamples = c_int(self.analog_samples)
+        analog = [[as_pointer(row, 0, c_double) for row in slot] for slot in self._analog] if self._analog is not None else None
+        try:
+            slot = self._slot()
+            last = clock()
+            while slot is not None and not self._stop.is_set():
+                if digitalStatus(hdwf, fRead, sts_ref) != 1:
+                    raise RuntimeError("FDwfDigitalInStatus failed")
+                self.polls += 1
+                now = clock()
+                if sts.value != done:
+                    last = now
+                    if self.poll_interval:
+                        time.sleep(self.poll_interval)
+                    continue
+                # the device rearmed with this status, read its capture and hand it over
+                digitalData(hdwf, digital[slot], nBytes)
+                statusTime(hdwf, *time_refs)
+                if analog is not None:
+                    while analogStatus(hdwf, fRead, sts_ref) == 1 and sts.value != done:
+                        if self._stop.is_set():
+                            return
+                    for channel, pointer in zip(channels, analog[slot]):
+                        analogData(hdwf, channel, pointer, cSamples)
+                self._ready.put((slot, sec.value * ticksec.value + tick.value, ticksec.value, now, now - last))
+                # the next capture may finish while this one is read
+                last = now
+                slot = self._slot()
+        except Exception as e:
+            self.error = e
+        finally:
+            self._ready.put(None)
+
+    def _process(self):
+        try:
+            while True:
+                item = self._ready.get()
+                if item is None:
+                    break
+                slot, ticks, ticksec, host, dead = item
+                self.store.ticksec = max(ticksec, 1)
+                self.store.append(ticks, host, dead, self._digital[slot],
+                                  self._analog[slot] if self._analog is not None else None)
+                self._free.put(slot)
+                if self.callback is not None:
+                    self.callback(len(self.store) - 1, self.store)
+        except Exception as e:
+            self.error = e
+            self._stop.set()
+
+    def summary(self):
+        store = self.store
+        elapsed = self._elapsed or time.perf_counter() - (self._t0 or time.perf_counter())
+        result = dict(events=len(store), elapsed=elapsed, rate=len(store) / elapsed if elapsed else 0.0,
+                      polls=self.polls)
+        if len(store):
+            dead = store["dead"] * 1e6
+            p50, p99 = np.percentile(dead, (50, 99))
+            result["dead_us"] = dict(p50=p50, p99=p99, max=dead.max(), total=dead.sum())
+            # fraction of the run in which an event could have gone unseen
+            result["blind"] = dead.sum() / 1e6 / elapsed if elapsed else 0.0
+        if len(store) > 1:
+            dt = np.diff(store["ticks"]) * 1e6 / store.ticksec
+            result["interval_us"] = dict(min=dt.min(), p50=float(np.median(dt)), max=dt.max())
+        return result
+
+
+if __name__ == "__main__":
+    from dwfsession import DwfSession
+
+    with DwfSession() as session:
+        dwf, hdwf = session.dwf, session.hdwf
+        # 1 kHz pulse on DIO 0
+        dwf.FDwfDigitalOutEnableSet(hdwf, c_int(0), c_int(1))
+        dwf.FDwfDigitalOutDividerSet(hdwf, c_int(0), c_int(100))
+        dwf.FDwfDigitalOutCounterSet(hdwf, c_int(0), c_int(100), c_int(900))
+        dwf.FDwfDigitalOutConfigure(hdwf, c_int(1))
+
+        capture = EventCapture(session, pre=16, post=48, hz=1e6, analog_channels=(0,), analog_samples=256, analog_hz=1e6)
+        with capture:
+            try:
+                while True:
+                    time.sleep(1)
+                    result = capture.summary()
+                    print("%d events, %.1f/s, dead p99 %.1f us" % (result["events"], result["rate"],
+                                                                   result.get("dead_us", {}).get("p99", 0.0)))
+            except KeyboardInterrupt:
+                pass
+        print(capture.summary())
+        capture.store.save("events.npz")
+        dwf.FDwfDigitalOutConfigure(hdwf, c_int(0))
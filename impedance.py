@@ -0,0 +1,192 @@
+"""
+   Impedance analyzer sweep
+   Adaptive replacement for the fixed 151 point loop of
+   AnalogImpedance_Analyzer.py. A coarse log spaced grid is measured
+   first, then the geometric midpoint is added between neighbours whose
+   |Z| or phase differ by more than max_db / max_degrees, until the curve
+   is smooth or max_steps points were measured. Flat parts of the
+   response stay at the coarse density.
+
+   Points already measured are kept for the life of the sweep object and
+   never measured again. Status is polled with poll_interval instead of
+   spinning, so sweeps of several devices on a thread pool run side by
+   side (ctypes releases the GIL in every library call).
+
+   Results are structured arrays sorted by frequency with the fields
+       hz          frequency
+       impedance   |Z| in Ohm
+       phase       impedance phase in radians
+       resistance  series resistance in Ohm
+       reactance   series reactance in Ohm
+       warning     StatusWarning bits, channel 1 in bits 0-1, channel 2 in 2-3
+"""
+
+from ctypes import *
+from dwfconstants import *
+from dwfsession import last_error
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import time
+
+sweep_dtype = np.dtype([("hz", np.float64), ("impedance", np.float64), ("phase", np.float64),
+                        ("resistance", np.float64), ("reactance", np.float64), ("warning", np.uint8)])
+
+
+def log_grid(start, stop, steps):
+    # same exponential steps as AnalogImpedance_Analyzer.py
+    return np.geomspace(start, stop, steps)
+
+
+class ImpedanceSweep:
+    def __init__(self, session, start=1e2, stop=1e6, steps=21, reference=1e3, mode=8, amplitude=1.0,
+                 offset=0.0, periods=None, max_steps=151, max_db=1.0, max_degrees=5.0, min_ratio=1.005,
+                 settle=0.0, start_settle=2.0, compensation=None, poll_interval=0.001, timeout=10.0):
+        # mode 0 = W1-C1-DUT-C2-R-GND, 1 = W1-C1-R-C2-DUT-GND, 8 = AD IA adapter
+        # min_ratio: neighbours closer than this frequency ratio are not split further
+        # settle: seconds to wait after a frequency change before the capture is used
+        # start_settle: seconds for the offsets to stabilize after the analyzer starts
+        # compensation: (open R, open X, short R, short X), None keeps what the device has
+        self.session = session
+        self.start = start
+        self.stop = stop
+        self.steps = steps
+        self.reference = reference
+        self.mode = mode
+        self.amplitude = amplitude
+        self.offset = offset
+        self.periods = periods
+        self.max_steps = max_steps
+        self.max_db = max_db
+        self.max_degrees = max_degrees
+        self.min_ratio = min_ratio
+        self.settle = settle
+        self.start_settle = start_settle
+        self.compensation = compensation
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.points = {}
+        self.captures = 0
+        self._hz = None
+
+    def configure(self):
+        dwf, hdwf = self.session.dwf, self.session.hdwf
+        # frequency changes apply while running
+        dwf.FDwfDeviceAutoConfigureSet(hdwf, c_int(3))
+        if self.compensation is None:
+            # the reset clears the open/short compensation, keep the device's
+            values = [c_double() for i in range(4)]
+            dwf.FDwfAnalogImpedanceCompGet(hdwf, *[byref(v) for v in values])
+            self.compensation = tuple(v.value for v in values)
+        dwf.FDwfAnalogImpedanceReset(hdwf)
+        dwf.FDwfAnalogImpedanceCompSet(hdwf, *[c_double(v) for v in self.compensation])
+        dwf.FDwfAnalogImpedanceModeSet(hdwf, c_int(self.mode))
+        dwf.FDwfAnalogImpedanceReferenceSet(hdwf, c_double(self.reference))
+        dwf.FDwfAnalogImpedanceFrequencySet(hdwf, c_double(self.start))
+        dwf.FDwfAnalogImpedanceAmplitudeSet(hdwf, c_double(self.amplitude))
+        dwf.FDwfAnalogImpedanceOffsetSet(hdwf, c_double(self.offset))
+        if self.periods is not None:
+            dwf.FDwfAnalogImpedancePeriodSet(hdwf, c_int(self.periods))
+        dwf.FDwfAnalogImpedanceConfigure(hdwf, c_int(1))
+        if self.start_settle:
+            time.sleep(self.start_settle)
+        self._hz = self.start
+
+    def _wait(self):
+        dwf, hdwf = self.session.dwf, self.session.hdwf
+        sts = c_byte()
+        deadline = time.perf_counter() + self.timeout
+        while True:
+            if dwf.FDwfAnalogImpedanceStatus(hdwf, byref(sts)) == 0:
+                raise RuntimeError("FDwfAnalogImpedanceStatus failed: " + last_error(dwf))
+            if sts.value == DwfStateDone.value:
+                self.captures += 1
+                return
+            if time.perf_counter() > deadline:
+                raise RuntimeError("Impedance capture timed out")
+            if self.poll_interval:
+                time.sleep(self.poll_interval)
+
+    def measure(self, hz):
+        # one point, from a capture taken entirely at hz
+        if hz in self.points:
+            return self.points[hz]
+        dwf, hdwf = self.session.dwf, self.session.hdwf
+        if hz != self._hz:
+            dwf.FDwfAnalogImpedanceFrequencySet(hdwf, c_double(hz))
+            self._hz = hz
+            if self.settle:
+                time.sleep(self.settle)
+                dwf.FDwfAnalogImpedanceStatus(hdwf, None) # ignore last capture, force a new one
+        self._wait()
+
+        point = np.zeros((), dtype=sweep_dtype)
+        point["hz"] = hz
+        value = c_double()
+        for name, measure in (("impedance", DwfAnalogImpedanceImpedance), ("phase", DwfAnalogImpedanceImpedancePhase),
+                              ("resistance", DwfAnalogImpedanceResistance), ("reactance", DwfAnalogImpedanceReactance)):
+            dwf.FDwfAnalogImpedanceStatusMeasure(hdwf, measure, byref(value))
+            point[name] = value.value
+        warn = c_int()
+        for iCh in range(2):
+            dwf.FDwfAnalogImpedanceStatusWarning(hdwf, c_int(iCh), byref(warn))
+            point["warning"] |= (warn.value & 3) << (2 * iCh)
+        self.points[hz] = point
+        return point
+
+    def result(self):
+        result = np.array([self.points[hz] for hz in sorted(self.points)], dtype=sweep_dtype)
+        return result.reshape(-1)
+
+    def _refine(self, result):
+        # geometric midpoints of the intervals where the response moves too fast
+        hz = result["hz"]
+        db = 20 * np.log10(np.maximum(result["impedance"], 1e-12))
+        degrees = np.degrees(np.unwrap(result["phase"]))
+        fast = (np.abs(np.diff(db)) > self.max_db) | (np.abs(np.diff(degrees)) > self.max_degrees)
+        fast &= hz[1:] / hz[:-1] > self.min_ratio
+        # steepest intervals first when the point budget runs out
+        order = np.argsort(-np.maximum(np.abs(np.diff(db)) / self.max_db, np.abs(np.diff(degrees)) / self.max_degrees))
+        order = order[fast[order]][:max(self.max_steps - len(hz), 0)]
+        return np.sort(np.sqrt(hz[order] * hz[order + 1]))
+
+    def run(self):
+        self.configure()
+        try:
+            for hz in log_grid(self.start, self.stop, self.steps):
+                self.measure(hz)
+            while len(self.points) < self.max_steps:
+                added = self._refine(self.result())
+                if not len(added):
+                    break
+                for hz in added:
+                    self.measure(hz)
+        finally:
+            self.session.dwf.FDwfAnalogImpedanceConfigure(self.session.hdwf, c_int(0))
+        return self.result()
+
+
+def sweep_devices(sessions, **settings):
+    # the same sweep on every open session at once, results by serial number
+    serials = [session.serial for session in sessions]
+    if None in serials or len(set(serials)) != len(serials):
+        raise ValueError("Every session needs its own serial number: %s" % serials)
+    with ThreadPoolExecutor(max_workers=max(len(sessions), 1)) as pool:
+        futures = [pool.submit(ImpedanceSweep(session, **settings).run) for session in sessions]
+        return {session.serial: future.result() for session, future in zip(sessions, futures)}
+
+
+if __name__ == "__main__":
+    from dwfsession import DwfSession
+    import matplotlib.pyplot as plt
+
+    with DwfSession() as session:
+        sweep = ImpedanceSweep(session)
+        start = time.perf_counter()
+        result = sweep.run()
+        print("%d points in %.1f s" % (len(result), time.perf_counter() - start))
+
+    plt.plot(result["hz"], np.abs(result["resistance"]), result["hz"], np.abs(result["reactance"]), ".-")
+    ax = plt.gca()
+    ax.set_xscale('log')
+    ax.set_yscale('log')
+    plt.show()
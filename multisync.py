@@ -0,0 +1,233 @@
+"""
+   Synchronized multi-device acquisition
+   Device_Synchronization.py opens, configures and polls every device one
+   after the other. SyncGroup does the slow parts on a thread pool, one
+   worker per device:
+       open        all devices at once
+       configure   AnalogIn of every device waits for External T1, the
+                   master drives T1 from the PC trigger
+       arm         in a fixed order, followers first and the master last,
+                   each device is started and confirmed Armed
+       trigger     one FDwfDeviceTriggerPC on the master
+       collect     every device is polled for Done and read by its own worker
+
+   T1 of all devices must be wired together, as for the sample.
+
+   A capture is returned as SyncCapture: data is (devices, channels,
+   samples) in volts, devices in the order of serials. The skew dict per
+   device holds host timestamps relative to the trigger call (armed,
+   done) and the sample rate actually set. estimate_skew() measures the
+   remaining offset between devices from a tone all of them see and
+   align() shifts the data by it.
+"""
+
+from ctypes import *
+from dwfconstants import *
+from dwfbuffers import AnalogInBuffer
+from dwfsession import DwfSession, load_library
+from spectrum import windows, spectrum, to_dbv, find_peaks
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import time
+
+SyncCapture = namedtuple("SyncCapture", "serials hz data skew trigger_time")
+
+
+def enumerate_serials(dwf):
+    cDevice = c_int()
+    serialnum = create_string_buffer(32)
+    dwf.FDwfEnum(enumfilterAll, byref(cDevice))
+    serials = []
+    for iDevice in range(cDevice.value):
+        dwf.FDwfEnumSN(c_int(iDevice), serialnum)
+        serials.append(serialnum.value.decode())
+    return serials
+
+
+class SyncGroup:
+    def __init__(self, serials=None, hz=1e6, samples=8192, channels=(0, 1), volts_range=5.0, master=0,
+                 trigger_pin=0, settle=2.0, timeout=10.0, dwf=None):
+        # serials: devices to use, every enumerated device by default; master indexes serials
+        self.dwf = dwf if dwf is not None else load_library()
+        self.serials = list(serials) if serials is not None else enumerate_serials(self.dwf)
+        if not self.serials:
+            raise RuntimeError("No devices found")
+        self.hz = hz
+        self.samples = samples
+        self.channels = tuple(channels)
+        self.volts_range = volts_range
+        self.master = master
+        self.trigger_pin = trigger_pin
+        self.settle = settle
+        self.timeout = timeout
+        self.sessions = []
+        self.buffers = []
+        self.pool = ThreadPoolExecutor(max_workers=len(self.serials))
+        self._settled = 0.0
+
+    def _each(self, function, *args):
+        # function(index, session, *args) on every device at once, results in device order
+        futures = [self.pool.submit(function, i, session, *args) for i, session in enumerate(self.sessions)]
+        return [future.result() for future in futures]
+
+    def open(self):
+        def open_one(serial):
+            return DwfSession(serial=serial, dwf=self.dwf).open()
+        futures = [self.pool.submit(open_one, serial) for serial in self.serials]
+        for future in futures:
+            try:
+                self.sessions.append(future.result())
+            except Exception:
+                for other in futures:
+                    if other.exception() is None:
+                        other.result().close()
+                self.sessions = []
+                raise
+        self.buffers = [AnalogInBuffer(self.samples, self.channels) for _ in self.sessions]
+        return self
+
+    def close(self):
+        for session in self.sessions:
+            session.close()
+        self.sessions = []
+        self.pool.shutdown()
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def _configure(self, i, session):
+        dwf, hdwf = session.dwf, session.hdwf
+        if i == self.master:
+            # the master drives External T1 of every device from the PC trigger
+            dwf.FDwfDeviceTriggerSet(hdwf, c_int(self.trigger_pin), trigsrcPC)
+        for channel in self.channels:
+            dwf.FDwfAnalogInChannelEnableSet(hdwf, c_int(channel), c_int(1))
+            dwf.FDwfAnalogInChannelRangeSet(hdwf, c_int(channel), c_double(self.volts_range))
+        dwf.FDwfAnalogInAcquisitionModeSet(hdwf, acqmodeSingle)
+        dwf.FDwfAnalogInFrequencySet(hdwf, c_double(self.hz))
+        dwf.FDwfAnalogInBufferSizeSet(hdwf, c_int(self.samples))
+        # the whole buffer after the trigger
+        dwf.FDwfAnalogInTriggerPositionSet(hdwf, c_double(0.5 * self.samples / self.hz))
+        dwf.FDwfAnalogInTriggerSourceSet(hdwf, c_ubyte(trigsrcExternal1.value + self.trigger_pin))
+        dwf.FDwfAnalogInTriggerAutoTimeoutSet(hdwf, c_double(0))
+        dwf.FDwfAnalogInConfigure(hdwf, c_int(1), c_int(0))
+        hzActual = c_double()
+        dwf.FDwfAnalogInFrequencyGet(hdwf, byref(hzActual))
+        return hzActual.value
+
+    def configure(self):
+        self.rates = self._each(self._configure)
+        # offsets need time to stabilize after open or a range change
+        self._settled = time.perf_counter() + self.settle
+        return self
+
+    def order(self):
+        # arm order, the master last so nothing triggers before every follower listens
+        return [i for i in range(len(self.sessions)) if i != self.master] + [self.master]
+
+    def _wait_state(self, session, state, fReadData=0):
+        sts = c_byte()
+        deadline = time.perf_counter() + self.timeout
+        while True:
+            if session.dwf.FDwfAnalogInStatus(session.hdwf, c_int(fReadData), byref(sts)) == 0:
+                raise RuntimeError("FDwfAnalogInStatus failed on %s" % session.serial)
+            if sts.value == state.value:
+                return time.perf_counter()
+            if time.perf_counter() > deadline:
+                raise RuntimeError("%s did not reach state %d" % (session.serial, state.value))
+
+    def arm(self):
+        # returns the time each device reported Armed
+        delay = self._settled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        armed = [None] * len(self.sessions)
+        for i in self.order():
+            session = self.sessions[i]
+            session.dwf.FDwfAnalogInConfigure(session.hdwf, c_int(0), c_int(1))
+            armed[i] = self._wait_state(session, DwfStateArmed)
+        return armed
+
+    def trigger(self):
+        master = self.sessions[self.master]
+        t = time.perf_counter()
+        master.dwf.FDwfDeviceTriggerPC(master.hdwf)
+        return t
+
+    def _collect(self, i, session):
+        done = self._wait_state(session, DwfStateDone, 1)
+        self.buffers[i].status_data(session.dwf, session.hdwf)
+        return done, time.perf_counter()
+
+    def collect(self):
+        # (done, read) host times per device
+        return self._each(self._collect)
+
+    def capture(self):
+        # arm, trigger and collect one synchronized capture
+        armed = self.arm()
+        t = self.trigger()
+        times = self.collect()
+        data = np.stack([buffer.data for buffer in self.buffers]).copy()
+        skew = {}
+        for i, session in enumerate(self.sessions):
+            done, read = times[i]
+            skew[session.serial] = dict(index=i, master=i == self.master, hz=self.rates[i],
+                                        armed=armed[i] - t, done=done - t, read=read - t)
+        return SyncCapture([s.serial for s in self.sessions], self.rates[self.master], data, skew, t)
+
+    def run(self, captures=1):
+        # configure once, then yield captures
+        self.configure()
+        for _ in range(captures):
+            yield self.capture()
+
+
+def estimate_skew(capture, channel=0, reference=None, min_db=20.0):
+    # offset in samples of every device against the reference device (master
+    # by default) from the phase of a tone all devices see on channel, for
+    # example AnalogOut of one device wired to every input. Unambiguous
+    # within half a period of the tone. Positive means the device is late.
+    # The tone must stand min_db above the median bin of the reference.
+    data = capture.data[:, channel, :]
+    if reference is None:
+        reference = next(v["index"] for v in capture.skew.values() if v["master"])
+    size = data.shape[1]
+    window, _ = windows.get(size, DwfWindowHann)
+    magnitude, phase = spectrum(data, window)
+    dbv = to_dbv(magnitude[reference])
+    # only DC is skipped, a low tone can sit in the first bins
+    bins, level = find_peaks(dbv, count=1, skip=1)
+    if not len(bins) or level[0] - np.median(dbv) < min_db:
+        raise RuntimeError("No tone %g dB above the noise floor on channel %d" % (min_db, channel))
+    peak = int(round(bins[0]))
+    shift = np.angle(np.exp(1j * (phase[:, peak] - phase[reference, peak])))
+    # the phase advances by 2*pi*bins/size per sample
+    return shift * size / (2 * np.pi * bins[0])
+
+
+def align(capture, offsets):
+    # capture with the data of every device shifted by its offset from
+    # estimate_skew(), rounded to samples and trimmed to the common part
+    offsets = np.round(np.asarray(offsets)).astype(int)
+    # a device late by k samples saw at sample 0 what the others saw at k
+    starts = offsets.max() - offsets
+    size = capture.data.shape[2] - starts.max()
+    data = np.stack([device[:, start:start + size] for device, start in zip(capture.data, starts)])
+    return capture._replace(data=data)
+
+
+if __name__ == "__main__":
+    with SyncGroup(samples=8192, hz=1e6) as group:
+        print("Devices: " + ", ".join(group.serials))
+        for capture in group.run(captures=1):
+            for serial, info in capture.skew.items():
+                print("%s armed %+.3f ms, done %+.3f ms, read %+.3f ms" % (serial, info["armed"] * 1e3, info["done"] * 1e3, info["read"] * 1e3))
+            offsets = estimate_skew(capture)
+            print("Sample offset to master: ", offsets)
+            print("Averages: ", align(capture, offsets).data.mean(axis=2))
@@ -0,0 +1,494 @@
+"""
+   AnalogOut play streaming
+   Plays arbitrarily long sample files in constant memory. Unlike
+   AnalogOut_Play.py the file is not loaded: it is memory-mapped and
+   converted to the normalized -1..+1 range one block at a time, right
+   before the block is sent with FDwfAnalogOutNodePlayData.
+
+   A producer thread keeps the device buffer full: it polls
+   FDwfAnalogOutNodePlayStatus for the free space, converts that many
+   samples into a preallocated block and sends it. lost counts samples
+   the device played while its buffer was empty.
+
+   Sources give len() and block(start, count) -> float64 samples in -1..+1:
+       WavSource   PCM 8/16/32 bit or float WAV files, one channel of them
+       RawSource   headerless sample files
+       ArraySource a NumPy array, optionally looped
+
+   AnalogStreamer plays sources of unknown or endless length, including
+   GeneratorSource, which takes chunks from any iterable. A producer
+   thread fills a ring of host blocks from the source. A feeder thread
+   moves them into the device FIFO as FDwfAnalogOutNodePlayStatus
+   reports free space, so a slow source only empties the host ring
+   before the device underruns. Underruns, lost and corrupted samples
+   are counted, and the device fill level and queued host samples are
+   sampled into a fill_dtype history.
+"""
+
+from ctypes import *
+from dwfconstants import *
+from dwfbuffers import as_pointer
+from collections import deque
+import numpy as np
+import queue
+import struct
+import threading
+import time
+
+fill_dtype = np.dtype([("time", np.float64), ("free", np.int32), ("fill", np.int32), ("queued", np.int64),
+                       ("lost", np.int64), ("corrupted", np.int64)])
+
+
+def _normalize(samples, out):
+    # device range is -1..+1, same scaling as AnalogOut_Play.py
+    kind = samples.dtype
+    if kind == np.uint8:
+        np.subtract(samples, 128, out=out, dtype=np.float64)
+        out /= 128.0
+    elif kind.kind == "i":
+        np.divide(samples, float(1 << (8 * kind.itemsize - 1)), out=out)
+    else:
+        out[:] = samples
+    return out
+
+
+class RawSource:
+    def __init__(self, path, dtype=np.int16, channels=1, channel=0, offset=0, hz=None):
+        # interleaved samples of channels starting at byte offset
+        self.path = path
+        self.hz = hz
+        self.channel = channel
+        self.dtype = np.dtype(dtype)
+        frames = np.memmap(path, dtype=self.dtype, mode="r", offset=offset)
+        frames = frames[:len(frames) // channels * channels]
+        self.samples = frames.reshape(-1, channels)[:, channel]
+
+    def __len__(self):
+        return len(self.samples)
+
+    def block(self, start, count, out=None):
+        data = self.samples[start:start + count]
+        if out is None:
+            out = np.empty(len(data))
+        return _normalize(data, out[:len(data)])
+
+
+class WavSource(RawSource):
+    def __init__(self, path, channel=0):
+        with open(path, "rb") as f:
+            riff, _, wave = struct.unpack("<4sI4s", f.read(12))
+            if riff != b"RIFF" or wave != b"WAVE":
+                raise ValueError("%s is not a WAV file" % path)
+            fmt = None
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    raise ValueError("%s has no data chunk" % path)
+                name, size = struct.unpack("<4sI", header)
+                if name == b"fmt ":
+                    fmt = struct.unpack("<HHIIHH", f.read(16))
+                    f.seek(size - 16 + (size & 1), 1)
+                elif name == b"data":
+                    offset = f.tell()
+                    break
+                else:
+                    f.seek(size + (size & 1), 1)
+        if fmt is None:
+            raise ValueError("%s has no fmt chunk" % path)
+        tag, channels, rate, _, _, bits = fmt
+        dtypes = {32: np.float32, 64: np.float64} if tag == 3 else {8: np.uint8, 16: np.int16, 32: np.int32}
+        if bits not in dtypes:
+            raise ValueError("%s: %d bit %s samples are not supported, only %s bit" % (
+                path, bits, "float" if tag == 3 else "PCM", "/".join(str(b) for b in dtypes)))
+        dtype = dtypes[bits]
+        RawSource.__init__(self, path, dtype, channels, channel, offset, hz=rate)
+        # the data chunk may be followed by other chunks
+        self.samples = self.samples[:size // (bits // 8) // channels]
+
+
+class ArraySource:
+    def __init__(self, samples, hz=None, loop=False):
+        # samples: float in -1..+1 or integer PCM, loop repeats them without end
+        self.samples = np.asarray(samples)
+        self.hz = hz
+        self.loop = loop
+
+    def __len__(self):
+        return len(self.samples)
+
+    def block(self, start, count, out=None):
+        if out is None:
+            out = np.empty(count)
+        if not self.loop:
+            data = self.samples[start:start + count]
+            return _normalize(data, out[:len(data)])
+        # wrap around as many times as needed
+        size = len(self.samples)
+        done = 0
+        while done < count:
+            first = (start + done) % size
+            n = min(count - done, size - first)
+            _normalize(self.samples[first:first + n], out[done:done + n])
+            done += n
+        return out[:count]
+
+
+class GeneratorSource:
+    def __init__(self, chunks, hz=None):
+        # chunks: iterable of sample arrays of any length, read in order
+        self.chunks = iter(chunks)
+        self.hz = hz
+        self.loop = True
+        self._pending = np.zeros(0)
+
+    def read(self, out):
+        # fills out, returns the number of samples, short only at the end
+        done = 0
+        while done < len(out):
+            if not len(self._pending):
+                chunk = next(self.chunks, None)
+                if chunk is None:
+                    break
+                self._pending = np.asarray(chunk)
+                continue
+            n = min(len(out) - done, len(self._pending))
+            _normalize(self._pending[:n], out[done:done + n])
+            self._pending = self._pending[n:]
+            done += n
+        return done
+
+
+def configure_play(session, channel, hz, amplitude, offset, seconds):
+    # carrier in play mode for seconds, 0 runs until stopped, returns the
+    # device buffer size in samples
+    dwf, hdwf = session.dwf, session.hdwf
+    ch = c_int(channel)
+    dwf.FDwfAnalogOutNodeEnableSet(hdwf, ch, AnalogOutNodeCarrier, c_int(1))
+    dwf.FDwfAnalogOutNodeFunctionSet(hdwf, ch, AnalogOutNodeCarrier, funcPlay)
+    dwf.FDwfAnalogOutRepeatSet(hdwf, ch, c_int(1))
+    dwf.FDwfAnalogOutRunSet(hdwf, ch, c_double(seconds))
+    dwf.FDwfAnalogOutNodeFrequencySet(hdwf, ch, AnalogOutNodeCarrier, c_double(hz))
+    dwf.FDwfAnalogOutNodeAmplitudeSet(hdwf, ch, AnalogOutNodeCarrier, c_double(amplitude))
+    dwf.FDwfAnalogOutNodeOffsetSet(hdwf, ch, AnalogOutNodeCarrier, c_double(offset))
+    # the settings above bypass the shadow registers
+    session.analog_out.invalidate(channel)
+
+    cBuffer = c_int()
+    dwf.FDwfAnalogOutNodeDataInfo(hdwf, ch, AnalogOutNodeCarrier, None, byref(cBuffer))
+    return cBuffer.value
+
+
+class AnalogPlayer:
+    def __init__(self, session, source, channel=0, hz=None, amplitude=1.0, offset=0.0, poll_interval=0.001,
+                 min_block=None):
+        # hz defaults to the source rate, e.g. the WAV sample rate
+        # min_block: smallest write, a quarter of the device buffer by default
+        self.session = session
+        self.source = source
+        self.channel = channel
+        self.hz = hz or source.hz
+        if not self.hz:
+            raise ValueError("Sample rate is required for this source")
+        self.amplitude = amplitude
+        self.offset = offset
+        self.poll_interval = poll_interval
+        self.min_block = min_block
+        self.position = 0
+        self.lost = 0
+        self.corrupted = 0
+        self.min_free = None
+        self.error = None
+        self.done = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._block = None
+
+    def configure(self):
+        dwf, hdwf = self.session.dwf, self.session.hdwf
+        ch = c_int(self.channel)
+        self.buffer = configure_play(self.session, self.channel, self.hz, self.amplitude, self.offset,
+                                     len(self.source) / self.hz)
+        if self.min_block is None:
+            self.min_block = max(1, self.buffer // 4)
+        self._block = np.zeros(self.buffer)
+        # prime the device buffer with the start of the source
+        count = min(self.buffer, len(self.source))
+        self.source.block(0, count, self._block)
+        dwf.FDwfAnalogOutNodeDataSet(hdwf, ch, AnalogOutNodeCarrier, as_pointer(self._block, 0, c_double), c_int(count))
+        self.position = count
+
+    def start(self):
+        self.configure()
+        self.session.dwf.FDwfAnalogOutConfigure(self.session.hdwf, c_int(self.channel), c_int(1))
+        self._thread = threading.Thread(target=self._produce, name="AnalogPlayer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.session.dwf.FDwfAnalogOutConfigure(self.session.hdwf, c_int(self.channel), c_int(0))
+        if self.error is not None:
+            raise self.error
+
+    def wait(self, timeout=None):
+        # until the whole source was played
+        return self.done.wait(timeout)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    def _produce(self):
+        dwf, hdwf = self.session.dwf, self.session.hdwf
+        ch = c_int(self.channel)
+        sts = c_ubyte()
+        dataFree = c_int()
+        dataLost = c_int()
+        dataCorrupted = c_int()
+        try:
+            while not self._stop.is_set():
+                if dwf.FDwfAnalogOutStatus(hdwf, ch, byref(sts)) != 1:
+                    raise RuntimeError("FDwfAnalogOutStatus failed")
+                if sts.value != DwfStateRunning.value:
+                    break
+                if self.position >= len(self.source):
+                    time.sleep(self.poll_interval)
+                    continue
+                dwf.FDwfAnalogOutNodePlayStatus(hdwf, ch, AnalogOutNodeCarrier, byref(dataFree), byref(dataLost), byref(dataCorrupted))
+                self.lost += dataLost.value
+                self.corrupted += dataCorrupted.value
+                free = dataFree.value
+                self.min_free = free if self.min_free is None else min(self.min_free, free)
+                remaining = len(self.source) - self.position
+                count = min(free, remaining, self.buffer)
+                if count < min(self.min_block, remaining):
+                    time.sleep(self.poll_interval)
+                    continue
+                self.source.block(self.position, count, self._block)
+                if dwf.FDwfAnalogOutNodePlayData(hdwf, ch, AnalogOutNodeCarrier, as_pointer(self._block, 0, c_double), c_int(count)) != 1:
+                    raise RuntimeError("FDwfAnalogOutNodePlayData failed")
+                self.position += count
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done.set()
+
+
+class AnalogStreamer:
+    def __init__(self, session, source, channel=0, hz=None, amplitude=1.0, offset=0.0, block=None, blocks=8,
+                 poll_interval=0.001, min_block=None, history=10000):
+        # block: samples per host block, half the device buffer by default, blocks: ring size
+        # min_block: smallest write to the device, a quarter of its buffer by default
+        self.session = session
+        self.source = source
+        self.channel = channel
+        self.hz = hz or source.hz
+        if not self.hz:
+            raise ValueError("Sample rate is required for this source")
+        self.amplitude = amplitude
+        self.offset = offset
+        self.block = block
+        self.blocks = blocks
+        self.poll_interval = poll_interval
+        self.min_block = min_block
+        self.rows = deque(maxlen=history)
+        self.produced = 0
+        self.written = 0
+        # underruns: times the device ran dry, starved: polls that found room
+        # on the device but nothing from the source
+        self.underruns = 0
+        self.lost = 0
+        self.corrupted = 0
+        self.starved = 0
+        self.min_free = None
+        self.error = None
+        self.done = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._position = 0
+        self._finished = False
+        self._t0 = None
+
+    def _read(self, out):
+        # next samples of the source into out, fewer only at its end
+        if hasattr(self.source, "read"):
+            return self.source.read(out)
+        count = len(out) if getattr(self.source, "loop", False) else min(len(out), len(self.source) - self._position)
+        if count <= 0:
+            return 0
+        self.source.block(self._position, count, out)
+        self._position += count
+        return count
+
+    def configure(self):
+        dwf, hdwf = self.session.dwf, self.session.hdwf
+        ch = c_int(self.channel)
+        # runs until stopped, the length of the source may be unknown
+        self.buffer = configure_play(self.session, self.channel, self.hz, self.amplitude, self.offset, 0)
+        if self.block is None:
+            self.block = max(1, self.buffer // 2)
+        if self.min_block is None:
+            self.min_block = max(1, self.buffer // 4)
+        self._ring = np.zeros((self.blocks, self.block))
+        self._free = queue.Queue()
+        self._ready = queue.Queue()
+        for i in range(self.blocks):
+            self._free.put(i)
+        # prime the device buffer
+        prime = np.zeros(self.buffer)
+        count = self._read(prime)
+        dwf.FDwfAnalogOutNodeDataSet(hdwf, ch, AnalogOutNodeCarrier, as_pointer(prime, 0, c_double), c_int(count))
+        self.produced = self.written = count
+        self._ended = count < self.buffer
+        self._finished = False
+
+    def start(self):
+        self.configure()
+        self._t0 = time.perf_counter()
+        self.session.dwf.FDwfAnalogOutConfigure(self.session.hdwf, c_int(self.channel), c_int(1))
+        self._threads = [threading.Thread(target=self._produce, name="AnalogStreamer source", daemon=True),
+                         threading.Thread(target=self._feed, name="AnalogStreamer feed", daemon=True)]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.session.dwf.FDwfAnalogOutConfigure(self.session.hdwf, c_int(self.channel), c_int(0))
+        if self.error is not None:
+            raise self.error
+
+    def wait(self, timeout=None):
+        # until the source ended and the device played everything
+        return self.done.wait(timeout)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    def _produce(self):
+        try:
+            ended = self._ended
+            while not ended and not self._stop.is_set():
+                try:
+                    index = self._free.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                count = self._read(self._ring[index])
+                if count:
+                    self.produced += count
+                    self._ready.put((index, count))
+                ended = count < self.block
+        except Exception as e:
+            self.error = e
+        finally:
+            self._ready.put(None)
+            # set after the end marker, so a queue of at most one item is drained
+            self._finished = True
+
+    def _feed(self):
+        dwf, hdwf = self.session.dwf, self.session.hdwf
+        ch = c_int(self.channel)
+        sts = c_ubyte()
+        dataFree = c_int()
+        dataLost = c_int()
+        dataCorrupted = c_int()
+        current = None
+        # the source may have ended while priming the device
+        ended = self._ended
+        underrun = False
+        try:
+            while not self._stop.is_set():
+                if dwf.FDwfAnalogOutStatus(hdwf, ch, byref(sts)) != 1:
+                    raise RuntimeError("FDwfAnalogOutStatus failed")
+                if sts.value != DwfStateRunning.value:
+                    break
+                dwf.FDwfAnalogOutNodePlayStatus(hdwf, ch, AnalogOutNodeCarrier, byref(dataFree), byref(dataLost), byref(dataCorrupted))
+                free = dataFree.value
+                drained = self._finished and current is None and self._ready.qsize() <= 1
+                if not ended and not drained:
+                    # past the end of the source the device runs dry on purpose,
+                    # an underrun spanning several status reads counts once
+                    if dataLost.value and not underrun:
+                        self.underruns += 1
+                    underrun = dataLost.value > 0
+                    self.lost += dataLost.value
+                    self.corrupted += dataCorrupted.value
+                    self.min_free = free if self.min_free is None else min(self.min_free, free)
+                self.rows.append((time.perf_counter() - self._t0, free, self.buffer - free,
+                                  self.produced - self.written, self.lost, self.corrupted))
+                if ended and current is None:
+                    if free >= self.buffer:
+                        break
+                    time.sleep(self.poll_interval)
+                    continue
+                if free < self.min_block:
+                    time.sleep(self.poll_interval)
+                    continue
+                while free > 0:
+                    if current is None:
+                        try:
+                            item = self._ready.get_nowait()
+                        except queue.Empty:
+                            # the device has room but the source fell behind
+                            self.starved += 1
+                            time.sleep(self.poll_interval)
+                            break
+                        if item is None:
+                            ended = True
+                            break
+                        current, count = item
+                        offset = 0
+                    n = min(free, count - offset)
+                    if dwf.FDwfAnalogOutNodePlayData(hdwf, ch, AnalogOutNodeCarrier, as_pointer(self._ring[current], offset, c_double), c_int(n)) != 1:
+                        raise RuntimeError("FDwfAnalogOutNodePlayData failed")
+                    offset += n
+                    free -= n
+                    self.written += n
+                    if offset == count:
+                        self._free.put(current)
+                        current = None
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done.set()
+
+    def series(self):
+        return np.array(list(self.rows), dtype=fill_dtype)
+
+    def metrics(self):
+        rows = self.series()
+        result = dict(written=self.written, seconds=self.written / self.hz, underruns=self.underruns, lost=self.lost,
+                      corrupted=self.corrupted, starved=self.starved, min_free=self.min_free)
+        if len(rows):
+            result["fill_mean"] = float(rows["fill"].mean())
+            result["fill_min"] = int(rows["fill"].min())
+            result["queued_min"] = int(rows["queued"].min())
+        return result
+
+
+if __name__ == "__main__":
+    import sys
+    from dwfsession import DwfSession
+
+    source = WavSource(sys.argv[1] if len(sys.argv) > 1 else "audio.wav")
+    print("Rate: %d Hz, %d samples, %.1f s" % (source.hz, len(source), len(source) / source.hz))
+    with DwfSession() as session:
+        with AnalogPlayer(session, source) as player:
+            while not player.wait(1.0):
+                print("%.1f s sent, lost %d" % (player.position / player.hz, player.lost), end="\r")
+        print()
+        print("Lost: %d" % player.lost)
+        print("Corrupted: %d" % player.corrupted)
@@ -0,0 +1,170 @@
+"""
+   Pulse train compiler
+   Turns a SET/RESET/READ sequence of AnalogOut pulses and DIO switch
+   events into one custom waveform per AWG channel and one DigitalOut
+   pattern, so the whole train runs on the device from a single trigger
+   instead of one host round trip per step.
+
+   Steps run one after the other in list order:
+       Pulse(channel, width, amplitude, offset, before, after)
+           the channel rests at offset, spends width at offset+amplitude,
+           before and after are gaps around the pulse
+       DioSwitch(mask, value, after)
+           drives the masked DIO pins to value, then waits after
+
+   A loaded train leaves its channels waiting for the PC trigger and the
+   DIO pins driven by DigitalOut; release() hands them back.
+"""
+
+from ctypes import *
+from dwfconstants import *
+from collections import namedtuple
+import numpy as np
+
+Pulse = namedtuple("Pulse", "channel width amplitude offset before after", defaults=(0.0, 0.0, 0.0))
+DioSwitch = namedtuple("DioSwitch", "mask value after", defaults=(0.0,))
+
+
+class PulseTrain:
+    def __init__(self, hz, duration, analog, digital):
+        self.hz = hz
+        self.duration = duration
+        # channel -> (normalized samples, amplitude, offset)
+        self.analog = analog
+        # pin -> bit pattern
+        self.digital = digital
+
+    def __len__(self):
+        return int(round(self.duration * self.hz))
+
+    def load(self, session, cycles=1):
+        # upload and arm every instrument, the train waits for fire()
+        dwf, hdwf = session.dwf, session.hdwf
+        awg = session.analog_out
+        n = len(self)
+
+        for channel, (samples, amplitude, offset) in self.analog.items():
+            ch = c_int(channel)
+            cMin, cMax = c_int(), c_int()
+            dwf.FDwfAnalogOutNodeDataInfo(hdwf, ch, AnalogOutNodeCarrier, byref(cMin), byref(cMax))
+            if cMax.value and n > cMax.value:
+                raise ValueError("AnalogOut %d holds %d samples, train needs %d" % (channel, cMax.value, n))
+            # through the shadow registers, reloading the same train sends nothing but the trigger setup
+            awg.node_enable(channel, AnalogOutNodeCarrier, 1)
+            awg.node_function(channel, AnalogOutNodeCarrier, funcCustom)
+            awg.node_data(channel, AnalogOutNodeCarrier, samples)
+            awg.node_frequency(channel, AnalogOutNodeCarrier, self.hz / n)
+            awg.node_amplitude(channel, AnalogOutNodeCarrier, amplitude)
+            awg.node_offset(channel, AnalogOutNodeCarrier, offset)
+            awg.idle(channel, DwfAnalogOutIdleInitial)
+            awg.run(channel, self.duration)
+            awg.wait(channel, 0)
+            awg.repeat(channel, cycles)
+            awg.trigger_source(channel, trigsrcPC)
+            awg.repeat_trigger(channel, 0)
+
+        if self.digital:
+            hzSys = c_double()
+            dwf.FDwfDigitalOutInternalClockInfo(hdwf, byref(hzSys))
+            divider = max(1, int(round(hzSys.value / self.hz)))
+            for pin, bits in self.digital.items():
+                cMax = c_int()
+                dwf.FDwfDigitalOutDataInfo(hdwf, c_int(pin), byref(cMax))
+                if cMax.value and n > cMax.value:
+                    raise ValueError("DigitalOut %d holds %d bits, train needs %d" % (pin, cMax.value, n))
+                rgbData = np.packbits(bits, bitorder="little")
+                dwf.FDwfDigitalOutEnableSet(hdwf, c_int(pin), c_int(1))
+                dwf.FDwfDigitalOutTypeSet(hdwf, c_int(pin), DwfDigitalOutTypeCustom)
+                dwf.FDwfDigitalOutIdleSet(hdwf, c_int(pin), DwfDigitalOutIdleInit)
+                dwf.FDwfDigitalOutDividerSet(hdwf, c_int(pin), c_int(divider))
+                dwf.FDwfDigitalOutDataSet(hdwf, c_int(pin), rgbData.ctypes.data_as(POINTER(c_ubyte)), c_int(n))
+            dwf.FDwfDigitalOutTriggerSourceSet(hdwf, trigsrcPC)
+            dwf.FDwfDigitalOutRunSet(hdwf, c_double(self.duration))
+            dwf.FDwfDigitalOutWaitSet(hdwf, c_double(0))
+            dwf.FDwfDigitalOutRepeatSet(hdwf, c_int(cycles))
+            dwf.FDwfDigitalOutRepeatTriggerSet(hdwf, c_int(0))
+
+        for channel in self.analog:
+            awg.configure(channel, 1)
+        if self.digital:
+            dwf.FDwfDigitalOutConfigure(hdwf, c_int(1))
+
+    def fire(self, session):
+        session.dwf.FDwfDeviceTriggerPC(session.hdwf)
+
+    def play(self, session, cycles=1):
+        # cycles = 0 repeats the train until the instruments are reset
+        self.load(session, cycles)
+        self.fire(session)
+
+    def release(self, session):
+        # stop the train, AnalogOut runs without trigger again and DigitalOut
+        # lets go of the DIO pins
+        dwf, hdwf = session.dwf, session.hdwf
+        awg = session.analog_out
+        for channel in self.analog:
+            awg.configure(channel, 0)
+            awg.trigger_source(channel, trigsrcNone)
+        if self.digital:
+            dwf.FDwfDigitalOutConfigure(hdwf, c_int(0))
+            dwf.FDwfDigitalOutTriggerSourceSet(hdwf, trigsrcNone)
+            for pin in self.digital:
+                dwf.FDwfDigitalOutEnableSet(hdwf, c_int(pin), c_int(0))
+            dwf.FDwfDigitalOutConfigure(hdwf, c_int(0))
+
+
+def compile_sequence(steps, hz=10e6):
+    # timeline, in samples, of every analog level change and DIO event
+    t = 0
+    pulses = []
+    switches = []
+    for step in steps:
+        if isinstance(step, Pulse):
+            start = t + int(round(step.before * hz))
+            width = int(round(step.width * hz))
+            if width < 1:
+                raise ValueError("Pulse width %g s is shorter than one sample at %g Hz" % (step.width, hz))
+            pulses.append((start, start + width, step))
+            t = start + width + int(round(step.after * hz))
+        elif isinstance(step, DioSwitch):
+            switches.append((t, step.mask, step.value))
+            t += int(round(step.after * hz))
+        else:
+            raise TypeError("Unknown step %r" % (step,))
+    n = max(t, 1)
+
+    analog = {}
+    for channel in sorted(set(p.channel for _, _, p in pulses)):
+        volts = np.empty(n)
+        rest = None
+        position = 0
+        for start, stop, p in pulses:
+            if p.channel != channel:
+                continue
+            if rest is None:
+                rest = p.offset
+            volts[position:start] = rest
+            volts[start:stop] = p.offset + p.amplitude
+            rest = p.offset
+            position = stop
+        volts[position:] = rest
+        high, low = volts.max(), volts.min()
+        offset = (high + low) / 2
+        amplitude = (high - low) / 2
+        samples = (volts - offset) / amplitude if amplitude else np.zeros(n)
+        analog[channel] = (np.ascontiguousarray(samples), amplitude, offset)
+
+    digital = {}
+    mask = 0
+    for _, m, _ in switches:
+        mask |= m
+    for pin in range(32):
+        if not (mask >> pin) & 1:
+            continue
+        bits = np.zeros(n, dtype=np.uint8)
+        for start, m, value in switches:
+            if (m >> pin) & 1:
+                bits[start:] = (value >> pin) & 1
+        digital[pin] = bits
+
+    return PulseTrain(hz, n / hz, analog, digital)
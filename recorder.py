@@ -0,0 +1,196 @@
+"""
+   AnalogIn record mode streaming
+   AnalogRecorder runs the FDwfAnalogInStatus / StatusRecord / StatusData
+   loop on its own thread and writes straight into a preallocated ring
+   buffer, so plotting or file writes on other threads do not stall the
+   transfer. ctypes releases the GIL during every library call.
+
+   Consume the stream by iterating the recorder, or pass a callback that
+   is run on a separate consumer thread for every chunk.
+"""
+
+from ctypes import *
+from dwfconstants import *
+from dwfbuffers import as_pointer
+import numpy as np
+import threading
+import time
+
+
+class RingBuffer:
+    # single producer, single consumer. Positions only grow and each is
+    # written by one side only, so neither side takes a lock. The producer
+    # never waits: when the consumer falls a full ring behind, the oldest
+    # samples are overwritten and counted in overwritten. reserved runs
+    # ahead of write_position while a write is in flight.
+    def __init__(self, capacity, channels=1, dtype=np.float64):
+        self.data = np.zeros((channels, capacity), dtype=dtype)
+        self.capacity = capacity
+        self.write_position = 0
+        self.reserved = 0
+        self.read_position = 0
+        self.overwritten = 0
+
+    def writable(self, count):
+        # reserve the next count samples, contiguous (offset, index, n) regions
+        # to write sample index to index+n of them at offset. Of more than a
+        # ring only the last capacity samples are kept
+        skip = max(0, count - self.capacity)
+        self.reserved = self.write_position + count
+        offset = (self.write_position + skip) % self.capacity
+        kept = count - skip
+        first = min(kept, self.capacity - offset)
+        if first == kept:
+            return [(offset, skip, kept)]
+        return [(offset, skip, first), (0, skip + first, kept - first)]
+
+    def commit(self, count):
+        self.write_position += count
+
+    def fill(self):
+        return min(self.write_position - self.read_position, self.capacity)
+
+    def read(self, max_count=None):
+        # copy of the unread samples, (channels, n)
+        end = self.write_position
+        start = max(self.read_position, end - self.capacity)
+        if max_count is not None:
+            end = min(end, start + max_count)
+        index = np.arange(start, end) % self.capacity
+        chunk = self.data[:, index]
+        # anything the producer overwrote, or is overwriting, while we copied is
+        # discarded. Past end it is counted by the next read, not this one
+        oldest = min(self.reserved - self.capacity, end)
+        if oldest > start:
+            chunk = chunk[:, oldest - start:]
+            start = oldest
+        self.overwritten += start - self.read_position
+        self.read_position = end
+        return chunk
+
+
+class AnalogRecorder:
+    def __init__(self, session, hz, channels=(0,), volts_range=5.0, seconds=-1, capacity=None,
+                 dtype=np.float64, callback=None, poll_interval=0.0):
+        # seconds -1 records until stop(), capacity defaults to two seconds of samples
+        self.session = session
+        self.hz = hz
+        self.channels = tuple(channels)
+        self.volts_range = volts_range
+        self.seconds = seconds
+        self.dtype = np.dtype(dtype)
+        self.callback = callback
+        self.poll_interval = poll_interval
+        self.ring = RingBuffer(capacity or max(int(2 * hz), 1 << 16), len(self.channels), self.dtype)
+        self.samples = 0
+        self.lost = 0
+        self.corrupted = 0
+        self.gaps = []
+        self.status_calls = 0
+        self.max_fill = 0
+        self.error = None
+        self.done = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._t0 = None
+        self._t1 = None
+
+    def configure(self):
+        dwf, hdwf = self.session.dwf, self.session.hdwf
+        for channel in self.channels:
+            dwf.FDwfAnalogInChannelEnableSet(hdwf, c_int(channel), c_int(1))
+            dwf.FDwfAnalogInChannelRangeSet(hdwf, c_int(channel), c_double(self.volts_range))
+        dwf.FDwfAnalogInAcquisitionModeSet(hdwf, acqmodeRecord)
+        dwf.FDwfAnalogInFrequencySet(hdwf, c_double(self.hz))
+        dwf.FDwfAnalogInRecordLengthSet(hdwf, c_double(self.seconds))
+        dwf.FDwfAnalogInConfigure(hdwf, c_int(1), c_int(0))
+
+    def start(self):
+        self.configure()
+        self._threads = [threading.Thread(target=self._produce, name="AnalogRecorder", daemon=True)]
+        if self.callback is not None:
+            self._threads.append(threading.Thread(target=self._consume, name="AnalogRecorderCallback", daemon=True))
+        self.session.dwf.FDwfAnalogInConfigure(self.session.hdwf, c_int(0), c_int(1))
+        self._t0 = time.perf_counter()
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        # the producer is joined first, the callback thread then drains the ring
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self.session.dwf.FDwfAnalogInConfigure(self.session.hdwf, c_int(0), c_int(0))
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    def _produce(self):
+        dwf, hdwf = self.session.dwf, self.session.hdwf
+        sts = c_byte()
+        cAvailable = c_int()
+        cLost = c_int()
+        cCorrupted = c_int()
+        ctype = c_short if self.dtype == np.int16 else c_double
+        try:
+            while not self._stop.is_set():
+                dwf.FDwfAnalogInStatus(hdwf, c_int(1), byref(sts))
+                dwf.FDwfAnalogInStatusRecord(hdwf, byref(cAvailable), byref(cLost), byref(cCorrupted))
+                self.status_calls += 1
+                if cLost.value:
+                    self.gaps.append((self.ring.write_position, cLost.value))
+                    self.lost += cLost.value
+                self.corrupted += cCorrupted.value
+
+                count = cAvailable.value
+                if count:
+                    for offset, index, n in self.ring.writable(count):
+                        for i, channel in enumerate(self.channels):
+                            row = self.ring.data[i]
+                            if ctype is c_short:
+                                dwf.FDwfAnalogInStatusData16(hdwf, c_int(channel), as_pointer(row, offset, c_short), c_int(index), c_int(n))
+                            else:
+                                dwf.FDwfAnalogInStatusData2(hdwf, c_int(channel), as_pointer(row, offset, c_double), c_int(index), c_int(n))
+                    self.ring.commit(count)
+                    self.samples += count
+                    self.max_fill = max(self.max_fill, self.ring.fill())
+                if sts.value == DwfStateDone.value:
+                    break
+                if not count and self.poll_interval:
+                    time.sleep(self.poll_interval)
+        except Exception as e:
+            self.error = e
+        finally:
+            self._t1 = time.perf_counter()
+            self.done.set()
+
+    def _consume(self):
+        for chunk in self:
+            self.callback(chunk)
+
+    def __iter__(self):
+        # chunks of (channels, n) samples until the recording ends and is drained.
+        # Waits for done rather than stop(), the producer may commit one more chunk
+        while True:
+            finished = self.done.is_set()
+            if self.ring.write_position > self.ring.read_position:
+                yield self.ring.read()
+            elif finished:
+                return
+            else:
+                self.done.wait(0.001)
+
+    def metrics(self):
+        end = self._t1 or time.perf_counter()
+        elapsed = end - self._t0 if self._t0 else 0.0
+        return dict(samples=self.samples, lost=self.lost, corrupted=self.corrupted,
+                    overwritten=self.ring.overwritten, gaps=len(self.gaps),
+                    status_calls=self.status_calls, max_fill=self.max_fill,
+                    elapsed=elapsed, rate=self.samples / elapsed if elapsed else 0.0)
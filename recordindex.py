@@ -0,0 +1,134 @@
+"""
+   Indexed reader for raw DigitalIn record files
+   Memory-maps the record.bin written by DigitalDiscovery_RecordToFile.py
+   (8 bit samples) or DigitalDiscovery_RecordToFile16.py (16 bit) and
+   keeps a sparse transition index beside it in record.bin.idx.npz.
+
+   The index stores, per block of samples, which DIO lines change inside
+   the block. Edge queries binary-search the blocks of the line and scan
+   only those, so "first edge on DIN3 after t" touches one block instead
+   of reading the file up to t.
+
+   Sample indexes are used throughout, edge index i means sample i
+   differs from sample i-1. With hz given, seconds() and index() convert.
+"""
+
+import numpy as np
+import os
+
+
+class RecordFile:
+    def __init__(self, path, bits=8, hz=None, block=1 << 16, sidecar=None):
+        dtypes = {8: np.uint8, 16: np.uint16, 32: np.uint32}
+        if bits not in dtypes:
+            raise ValueError("Sample format is 8, 16 or 32 bits")
+        self.path = path
+        self.bits = bits
+        self.hz = hz
+        self.samples = np.memmap(path, dtype=dtypes[bits], mode="r")
+        self.sidecar = sidecar or path + ".idx.npz"
+        if not self._load(block):
+            self._build(block)
+            self._save()
+        self._lines = {}
+
+    def __len__(self):
+        return len(self.samples)
+
+    def _load(self, block):
+        if not os.path.exists(self.sidecar):
+            return False
+        index = np.load(self.sidecar)
+        stat = os.stat(self.path)
+        if index["size"] != stat.st_size or index["mtime"] != stat.st_mtime_ns or index["block"] != block:
+            return False
+        self.block = int(index["block"])
+        self.masks = index["masks"]
+        return True
+
+    def _build(self, block, step=256):
+        # OR of sample-to-sample changes per block, read step blocks at a time
+        self.block = block
+        nBlocks = (len(self.samples) + block - 1) // block
+        self.masks = np.zeros(nBlocks, dtype=np.uint32)
+        previous = None
+        for first in range(0, nBlocks, step):
+            data = np.asarray(self.samples[first * block:(first + step) * block])
+            changes = np.empty(len(data), dtype=data.dtype)
+            changes[1:] = data[1:] ^ data[:-1]
+            changes[0] = 0 if previous is None else data[0] ^ previous
+            starts = np.arange(0, len(data), block)
+            self.masks[first:first + len(starts)] = np.bitwise_or.reduceat(changes, starts)
+            previous = data[-1]
+
+    def _save(self):
+        stat = os.stat(self.path)
+        with open(self.sidecar, "wb") as f:
+            np.savez(f, block=self.block, masks=self.masks, size=stat.st_size, mtime=stat.st_mtime_ns)
+
+    def _blocks(self, line):
+        # blocks where the line changes, sorted
+        if line not in self._lines:
+            self._lines[line] = np.flatnonzero(self.masks & np.uint32(1 << line))
+        return self._lines[line]
+
+    def seconds(self, index):
+        return index / self.hz
+
+    def index(self, seconds):
+        return int(round(seconds * self.hz))
+
+    def window(self, start, stop):
+        # samples [start, stop) as a view into the file
+        return self.samples[max(start, 0):stop]
+
+    def level(self, line, index):
+        return int(self.samples[index] >> line) & 1
+
+    def _edges_in(self, line, blocks, start, stop):
+        found = []
+        for b in blocks:
+            first = max(b * self.block, start, 1)
+            last = min((b + 1) * self.block, stop)
+            data = self.samples[first - 1:last]
+            bit = (data >> line) & 1
+            found.append(np.flatnonzero(bit[1:] != bit[:-1]) + first)
+        return np.concatenate(found) if found else np.zeros(0, dtype=np.int64)
+
+    def edges(self, line, start=0, stop=None, kind="any"):
+        # indexes of the transitions of line in [start, stop)
+        stop = len(self) if stop is None else min(stop, len(self))
+        blocks = self._blocks(line)
+        lo = np.searchsorted(blocks, start // self.block)
+        hi = np.searchsorted(blocks, (stop - 1) // self.block, side="right")
+        found = self._edges_in(line, blocks[lo:hi], start, stop)
+        return self._filter(line, found, kind)
+
+    def next_edge(self, line, after=0, kind="any"):
+        # first transition of line at or after sample index after, or None
+        blocks = self._blocks(line)
+        i = np.searchsorted(blocks, after // self.block)
+        while i < len(blocks):
+            found = self._filter(line, self._edges_in(line, blocks[i:i + 1], after, len(self)), kind)
+            if len(found):
+                return int(found[0])
+            i += 1
+        return None
+
+    def _filter(self, line, found, kind):
+        if kind == "any" or not len(found):
+            return found
+        rising = ((self.samples[found] >> line) & 1).astype(bool)
+        if kind == "rising":
+            return found[rising]
+        if kind == "falling":
+            return found[~rising]
+        raise ValueError("kind is any, rising or falling")
+
+
+if __name__ == "__main__":
+    import sys
+    record = RecordFile(sys.argv[1] if len(sys.argv) > 1 else "record.bin")
+    print("Samples: %d, blocks: %d" % (len(record), len(record.masks)))
+    for line in range(record.bits):
+        print("DIO %2d: %d blocks with edges, first edge at %s" % (line, len(record._blocks(line)), record.next_edge(line)))
@@ -203,6 +203,6 @@ if test !=0 :
             break
     print(f"digital to analog delay {a-d}")
             
-    plt.plot(numpy.fromiter(bAnalog, count=test, dtype = numpy.float))
-    plt.plot(numpy.fromiter(bDigital, count=test, dtype = numpy.float)) # each sample DIO 15:0 value 0-255, mask with &1 for DIO-0
+    plt.plot(numpy.fromiter(bAnalog, count=test, dtype = numpy.float64))
+    plt.plot(numpy.fromiter(bDigital, count=test, dtype = numpy.float64)) # each sample DIO 15:0 value 0-255, mask with &1 for DIO-0
     plt.show()
@@ -80,7 +80,7 @@ dwf.FDwfDeviceCloseAll()
 dc = sum(rgdSamples)/len(rgdSamples)
 print("DC: "+str(dc)+"V")
 
-plt.plot(numpy.fromiter(rgdSamples, dtype = numpy.float))
+plt.plot(numpy.fromiter(rgdSamples, dtype = numpy.float64))
 plt.show()
 
 
@@ -88,28 +88,27 @@ while True:
         break
 print("Acquisition done")
 
-rgdSamples1 = (c_double*nSamples)()
+rgdSamples1 = numpy.zeros(nSamples) # device writes straight into the array
 
-dwf.FDwfAnalogInStatusData(hdwf, 0, rgdSamples1, nSamples) # get channel 1 data
+dwf.FDwfAnalogInStatusData(hdwf, 0, rgdSamples1.ctypes.data_as(POINTER(c_double)), nSamples) # get channel 1 data
 dwf.FDwfDeviceCloseAll()
 
 plt.title("raw data")
-plt.plot(numpy.fromiter(rgdSamples1, dtype = numpy.float), color='orange', label='C1')
+plt.plot(rgdSamples1, color='orange', label='C1')
 plt.show()
 
 
 hzTop = hzRate.value/2
-rgdWindow = (c_double*nSamples)()
+rgdWindow = numpy.zeros(nSamples)
 vBeta = c_double(1.0) # used only for Kaiser window
 vNEBW = c_double() # noise equivalent bandwidth
-dwf.FDwfSpectrumWindow(byref(rgdWindow), c_int(nSamples), DwfWindowFlatTop, vBeta, byref(vNEBW))
+dwf.FDwfSpectrumWindow(rgdWindow.ctypes.data_as(POINTER(c_double)), c_int(nSamples), DwfWindowFlatTop, vBeta, byref(vNEBW))
 
-for i in range(nSamples):
-    rgdSamples1[i] = rgdSamples1[i]*rgdWindow[i]
+rgdSamples1 *= rgdWindow
 
 plt.title("window and windowed data")
-plt.plot(numpy.fromiter(rgdSamples1, dtype = numpy.float), color='orange', label='C1')
-plt.plot(numpy.fromiter(rgdWindow, dtype = numpy.float), color='blue', label='W')
+plt.plot(rgdSamples1, color='orange', label='C1')
+plt.plot(rgdWindow, color='blue', label='W')
 plt.show()
 
 
@@ -117,7 +116,7 @@ plt.show()
 nBins = int(nSamples/2+1)
 rgdBins1 = (c_double*nBins)()
 rgdPhase1 = (c_double*nBins)()
-dwf.FDwfSpectrumFFT(byref(rgdSamples1), nSamples, byref(rgdBins1), byref(rgdPhase1), nBins)
+dwf.FDwfSpectrumFFT(rgdSamples1.ctypes.data_as(POINTER(c_double)), nSamples, byref(rgdBins1), byref(rgdPhase1), nBins)
 
 sqrt2 = math.sqrt(2)
 for i in range(nBins): 
@@ -132,8 +131,8 @@ rgMHz = []
 for i in range(nBins): 
     rgMHz.append(hzTop*i/(nBins-1)/1e6)
 
-rgBins1 = numpy.fromiter(rgdBins1, dtype = numpy.float)
-rgPhase1 = numpy.fromiter(rgdPhase1, dtype = numpy.float)
+rgBins1 = numpy.fromiter(rgdBins1, dtype = numpy.float64)
+rgPhase1 = numpy.fromiter(rgdPhase1, dtype = numpy.float64)
 
 plt.title("FFT dBV-deg / MHz")
 plt.xlim([0, hzTop/1e6])
@@ -114,8 +114,8 @@ dwf.FDwfAnalogInStatusData(hdwf, c_int(cReal.value+0), rgdSamples2, c_int(cSampl
 
 dwf.FDwfDeviceCloseAll()
 
-plt.plot(numpy.fromiter(rgdSamples1, dtype = numpy.float), label='C1')
-plt.plot(numpy.fromiter(rgdSamples2, dtype = numpy.float), label='F1')
+plt.plot(numpy.fromiter(rgdSamples1, dtype = numpy.float64), label='C1')
+plt.plot(numpy.fromiter(rgdSamples2, dtype = numpy.float64), label='F1')
 plt.show()
 
 
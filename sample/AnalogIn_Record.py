@@ -27,7 +27,7 @@ hdwf = c_int()
 sts = c_byte()
 hzAcq = c_double(100000)
 nSamples = 200000
-rgdSamples = (c_double*nSamples)()
+rgdSamples = numpy.zeros(nSamples) # device writes straight into the array
 cAvailable = c_int()
 cLost = c_int()
 cCorrupted = c_int()
@@ -96,8 +96,8 @@ while cSamples < nSamples:
     if cSamples+cAvailable.value > nSamples :
         cAvailable = c_int(nSamples-cSamples)
     
-    dwf.FDwfAnalogInStatusData(hdwf, c_int(0), byref(rgdSamples, sizeof(c_double)*cSamples), cAvailable) # get channel 1 data
-    #dwf.FDwfAnalogInStatusData(hdwf, c_int(1), byref(rgdSamples, sizeof(c_double)*cSamples), cAvailable) # get channel 2 data
+    dwf.FDwfAnalogInStatusData(hdwf, c_int(0), rgdSamples[cSamples:].ctypes.data_as(POINTER(c_double)), cAvailable) # get channel 1 data
+    #dwf.FDwfAnalogInStatusData(hdwf, c_int(1), rgdSamples[cSamples:].ctypes.data_as(POINTER(c_double)), cAvailable) # get channel 2 data
     cSamples += cAvailable.value
 
 dwf.FDwfAnalogOutReset(hdwf, c_int(0))
@@ -114,7 +114,7 @@ for v in rgdSamples:
     f.write("%s\n" % v)
 f.close()
   
-plt.plot(numpy.fromiter(rgdSamples, dtype = numpy.float))
+plt.plot(rgdSamples)
 plt.show()
 
 
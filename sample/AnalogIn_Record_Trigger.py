@@ -143,8 +143,8 @@ for v in rgdSamples2:
     f.write("%s\n" % v)
 f.close()
 
-plt.plot(numpy.fromiter(rgdSamples1, dtype = numpy.float), color='orange')
-plt.plot(numpy.fromiter(rgdSamples2, dtype = numpy.float), color='blue')
+plt.plot(numpy.fromiter(rgdSamples1, dtype = numpy.float64), color='orange')
+plt.plot(numpy.fromiter(rgdSamples2, dtype = numpy.float64), color='blue')
 plt.show()
 
 
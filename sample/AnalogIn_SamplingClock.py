@@ -91,7 +91,7 @@ print("Acquisition done")
 dwf.FDwfAnalogInStatusData(hdwf, 0, rgdSamples, cSamples) # get channel 1 data
 dwf.FDwfDeviceCloseAll()
 
-plt.plot(numpy.fromiter(rgdSamples, dtype = numpy.float))
+plt.plot(numpy.fromiter(rgdSamples, dtype = numpy.float64))
 plt.show()
 
 
@@ -88,8 +88,8 @@ dwf.FDwfAnalogInStatusData(hdwf, 1, rgdSamples2, nSamples) # get channel 2 data
 dwf.FDwfDeviceCloseAll()
 
 plt.title("raw data")
-plt.plot(numpy.fromiter(rgdSamples1, dtype = numpy.float), color='orange', label='C1')
-plt.plot(numpy.fromiter(rgdSamples2, dtype = numpy.float), color='blue', label='C2')
+plt.plot(numpy.fromiter(rgdSamples1, dtype = numpy.float64), color='orange', label='C1')
+plt.plot(numpy.fromiter(rgdSamples2, dtype = numpy.float64), color='blue', label='C2')
 plt.show()
 
 
@@ -104,8 +104,8 @@ for i in range(nSamples):
     rgdSamples2[i] = rgdSamples2[i]*rgdWindow[i]
 
 plt.title("windowed data")
-plt.plot(numpy.fromiter(rgdSamples1, dtype = numpy.float), color='orange', label='C1')
-plt.plot(numpy.fromiter(rgdSamples2, dtype = numpy.float), color='blue', label='C2')
+plt.plot(numpy.fromiter(rgdSamples1, dtype = numpy.float64), color='orange', label='C1')
+plt.plot(numpy.fromiter(rgdSamples2, dtype = numpy.float64), color='blue', label='C2')
 plt.show()
 
 
@@ -134,8 +134,8 @@ MHzStep = hzTop*(iLast-iFirst)/(nBins-1)/1e6
 for i in range(nBins): 
     rgMHz.append(MHzFirst + MHzStep*i)
 
-rgBins1 = numpy.fromiter(rgdBins1, dtype = numpy.float)
-rgBins2 = numpy.fromiter(rgdBins2, dtype = numpy.float)
+rgBins1 = numpy.fromiter(rgdBins1, dtype = numpy.float64)
+rgBins2 = numpy.fromiter(rgdBins2, dtype = numpy.float64)
 
 plt.title("FFT dBV / MHz")
 plt.xlim([MHzFirst, MHzLast])
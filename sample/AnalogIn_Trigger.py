@@ -115,7 +115,7 @@ for iTrigger in range(10):
 dwf.FDwfAnalogOutConfigure(hdwf, c_int(0), c_int(0))
 dwf.FDwfDeviceCloseAll()
 
-plt.plot(numpy.fromiter(rgdSamples, dtype = numpy.float))
+plt.plot(numpy.fromiter(rgdSamples, dtype = numpy.float64))
 plt.show()
 
 
@@ -135,9 +135,9 @@ print("last: "+strdatetime(datetime[cCaptures-1]))
 dwf.FDwfAnalogOutConfigure(hdwf, c_int(0), c_int(0))
 dwf.FDwfDeviceCloseAll()
 
-# plt.plot(numpy.fromiter(channel1[0], dtype = numpy.float))
-# plt.plot(numpy.fromiter(channel2[0], dtype = numpy.float))
-# plt.plot(numpy.fromiter(channel1[1], dtype = numpy.float))
-# plt.plot(numpy.fromiter(channel2[1], dtype = numpy.float))
+# plt.plot(numpy.fromiter(channel1[0], dtype = numpy.float64))
+# plt.plot(numpy.fromiter(channel2[0], dtype = numpy.float64))
+# plt.plot(numpy.fromiter(channel1[1], dtype = numpy.float64))
+# plt.plot(numpy.fromiter(channel2[1], dtype = numpy.float64))
 # plt.show()
 
@@ -84,6 +84,6 @@ dwf.FDwfDeviceCloseAll()
 dc = sum(rg)/len(rg)
 print("DC: "+str(dc)+"V")
 
-plt.plot(numpy.fromiter(rg, dtype = numpy.float))
+plt.plot(numpy.fromiter(rg, dtype = numpy.float64))
 plt.show()
 
@@ -46,7 +46,7 @@ hzRate = 100e6
 hzSig = 8e3
 nSamples = int(hzRate * sRun)
 rgPlay = numpy.sin(2 * numpy.pi * hzSig * numpy.linspace(0, sRun, nSamples, endpoint=False))
-rgdPlay = (c_double * nSamples)(*rgPlay)
+rgdPlay = numpy.ascontiguousarray(rgPlay) # library reads the array memory, no per-sample conversion
 iWavegen = 0
 iScope = 0
 
@@ -86,7 +86,7 @@ dwf.FDwfAnalogOutFunctionSet(hdwf, iWavegen, funcPlay)
 dwf.FDwfAnalogOutFrequencySet(hdwf, iWavegen, c_double(hzRate))
 dwf.FDwfAnalogOutRepeatSet(hdwf, iWavegen, 1)
 dwf.FDwfAnalogOutRunSet(hdwf, iWavegen, c_double(sRun))
-dwf.FDwfAnalogOutDataSet(hdwf, iWavegen, rgdPlay, nSamples)
+dwf.FDwfAnalogOutDataSet(hdwf, iWavegen, rgdPlay.ctypes.data_as(POINTER(c_double)), nSamples)
 dwf.FDwfAnalogOutConfigure(hdwf, iWavegen, 1)
 
 
@@ -96,12 +96,12 @@ while True:
     if sts.value == DwfStateDone.value :
         break
 
-rgdCap = (c_double*nSamples)()
-dwf.FDwfAnalogInStatusData(hdwf, iScope, rgdCap, len(rgdCap))
+rgdCap = numpy.zeros(nSamples)
+dwf.FDwfAnalogInStatusData(hdwf, iScope, rgdCap.ctypes.data_as(POINTER(c_double)), len(rgdCap))
 
 dwf.FDwfDeviceCloseAll()
 
-plt.plot(numpy.fromiter(rgdPlay, dtype = numpy.float))
-plt.plot(numpy.fromiter(rgdCap, dtype = numpy.float))
+plt.plot(rgdPlay)
+plt.plot(rgdCap)
 plt.show()
 
@@ -121,7 +121,7 @@ for i in range(cSteps) :
         dwf.FDwfAnalogInChannelCount(rghdwf[iDevice], byref(cChannel))
         for iChannel in range(cChannel.value): 
             dwf.FDwfAnalogInStatusData(rghdwf[iDevice], iChannel, rgdSamples, cSamples)
-            plt.plot(numpy.fromiter(rgdSamples, dtype = numpy.float), label=f'D{iDevice+1}C{iChannel+1}')
+            plt.plot(numpy.fromiter(rgdSamples, dtype = numpy.float64), label=f'D{iDevice+1}C{iChannel+1}')
         
     plt.show()
 
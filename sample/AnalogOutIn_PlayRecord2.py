@@ -147,8 +147,8 @@ print("done")
 dwf.FDwfAnalogOutReset(hdwf, channel)
 dwf.FDwfDeviceClose(hdwf)
 
-plt.plot(numpy.fromiter(record1, dtype = numpy.float))
-plt.plot(numpy.fromiter(record2, dtype = numpy.float))
+plt.plot(numpy.fromiter(record1, dtype = numpy.float64))
+plt.plot(numpy.fromiter(record2, dtype = numpy.float64))
 plt.show()
 
 
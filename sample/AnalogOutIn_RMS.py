@@ -112,14 +112,14 @@ else:
         print("Acquisition done")
 
         dwf.FDwfAnalogInStatusData(hdwf, 0, rgdSamples, cSample)
-        plt.plot(numpy.fromiter(rgdSamples, dtype = numpy.float))
+        plt.plot(numpy.fromiter(rgdSamples, dtype = numpy.float64))
         plt.show()
         rms1 = 0
         for i in range(cSample): rms1 += (rgdSamples[i]) ** 2
         rms1 = (rms1 / cSample) ** 0.5
         print(f"C1: {rms1}V")
         dwf.FDwfAnalogInStatusData(hdwf, 1, rgdSamples, cSample)
-        plt.plot(numpy.fromiter(rgdSamples, dtype = numpy.float))
+        plt.plot(numpy.fromiter(rgdSamples, dtype = numpy.float64))
         plt.show()
         rms2 = 0
         for i in range(cSample): rms2 += (rgdSamples[i]) ** 2
@@ -109,7 +109,7 @@ for iAcq in range(0, 1):
         for iChannel in range(0, cChannel.value):
             dwf.FDwfAnalogInStatusData(hdwf, c_int(iChannel), rgdSamples, c_int(cSamples)) # get channel 1 data
 
-            plt.plot(numpy.fromiter(rgdSamples, dtype = numpy.float))
+            plt.plot(numpy.fromiter(rgdSamples, dtype = numpy.float64))
             
     plt.show()
 
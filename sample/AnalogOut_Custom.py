@@ -11,6 +11,7 @@ from ctypes import *
 from dwfconstants import *
 import time
 import sys
+import numpy
 
 if sys.platform.startswith("win"):
     dwf = cdll.dwf
@@ -22,12 +23,10 @@ else:
 hzFreq = 1e4
 cSamples = 4096
 hdwf = c_int()
-rgdSamples = (c_double*cSamples)()
 channel = c_int(0)
 
 # samples between -1 and +1
-for i in range(0,len(rgdSamples)):
-    rgdSamples[i] = 1.0*i/cSamples;
+rgdSamples = numpy.arange(cSamples) / cSamples
 
 version = create_string_buffer(16)
 dwf.FDwfGetVersion(version)
@@ -50,7 +49,7 @@ dwf.FDwfDeviceAutoConfigureSet(hdwf, c_int(0))
 print("Generating custom waveform...")
 dwf.FDwfAnalogOutNodeEnableSet(hdwf, channel, AnalogOutNodeCarrier, c_int(1))
 dwf.FDwfAnalogOutNodeFunctionSet(hdwf, channel, AnalogOutNodeCarrier, funcCustom) 
-dwf.FDwfAnalogOutNodeDataSet(hdwf, channel, AnalogOutNodeCarrier, rgdSamples, c_int(cSamples))
+dwf.FDwfAnalogOutNodeDataSet(hdwf, channel, AnalogOutNodeCarrier, rgdSamples.ctypes.data_as(POINTER(c_double)), c_int(cSamples))
 dwf.FDwfAnalogOutNodeFrequencySet(hdwf, channel, AnalogOutNodeCarrier, c_double(hzFreq)) 
 dwf.FDwfAnalogOutNodeAmplitudeSet(hdwf, channel, AnalogOutNodeCarrier, c_double(2.0)) 
 
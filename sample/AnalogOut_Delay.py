@@ -90,6 +90,6 @@ dwf.FDwfAnalogInStatusData(hdwf, 1, rgdSamples2, c_int(cSamples)) # get channel
 
 dwf.FDwfDeviceClose(hdwf)
 
-plt.plot(numpy.fromiter(rgdSamples1, dtype = numpy.float), label="C1")
-plt.plot(numpy.fromiter(rgdSamples2, dtype = numpy.float), label="C2")
+plt.plot(numpy.fromiter(rgdSamples1, dtype = numpy.float64), label="C1")
+plt.plot(numpy.fromiter(rgdSamples2, dtype = numpy.float64), label="C2")
 plt.show()
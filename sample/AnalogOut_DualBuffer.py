@@ -101,7 +101,7 @@ dwf.FDwfAnalogInStatusData(hdwf, 0, rgdCapture, cCapture)
 # output will continue to be generate with FDwfParamSet DwfParamOnClose 0
 dwf.FDwfDeviceCloseAll()  
 
-plt.plot(numpy.fromiter(rgdCapture, dtype = numpy.float))
+plt.plot(numpy.fromiter(rgdCapture, dtype = numpy.float64))
 plt.show()
 
 
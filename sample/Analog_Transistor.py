@@ -103,6 +103,6 @@ dwf.FDwfAnalogInStatusData(hdwf, 1, rgc2, len(rgc2)) # get channel 2 data
 
 dwf.FDwfDeviceCloseAll()
 
-plt.plot(numpy.fromiter(rgc2, dtype = numpy.float), numpy.fromiter(rgc1, dtype = numpy.float))
+plt.plot(numpy.fromiter(rgc2, dtype = numpy.float64), numpy.fromiter(rgc1, dtype = numpy.float64))
 plt.show()
 
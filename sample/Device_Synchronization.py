@@ -115,7 +115,7 @@ for iDevice in range(0, cDevice.value):
     for iChannel in range(0, cChannel.value):
         dwf.FDwfAnalogInStatusData(hdwf, iChannel, rgdSamples, c_int(cSamples))
         print("Average on Channel " + str(iChannel+1)+" : "+ str(sum(rgdSamples)/cSamples)+"V")
-        plt.plot(np.fromiter(rgdSamples, dtype = np.float))
+        plt.plot(np.fromiter(rgdSamples, dtype = np.float64))
 
 plt.show()
 # ensure all devices are closed
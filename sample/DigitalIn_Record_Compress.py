@@ -54,7 +54,7 @@ dwf.FDwfDigitalOutConfigure(hdwf, c_int(1))
 
 # set number of sample to acquire
 nSamples = 1000000
-rgwSamples = (c_uint16*nSamples)()
+rgwSamples = numpy.zeros(nSamples, dtype = numpy.uint16) # device writes straight into the array
 cAvailable = c_int()
 cLost = c_int()
 cCorrupted = c_int()
@@ -106,7 +106,7 @@ while True:
         # we are using circular sample buffer, prevent overflow
         if iSample+cAvailable.value > nSamples:
             cSamples = nSamples-iSample
-        dwf.FDwfDigitalInStatusData2(hdwf, byref(rgwSamples, 2*iSample), c_int(iBuffer), c_int(2*cSamples))
+        dwf.FDwfDigitalInStatusData2(hdwf, rgwSamples[iSample:].ctypes.data_as(POINTER(c_uint16)), c_int(iBuffer), c_int(2*cSamples))
         iBuffer += cSamples
         cAvailable.value -= cSamples
         iSample += cSamples
@@ -119,7 +119,7 @@ while True:
 dwf.FDwfDeviceClose(hdwf)
 
 if iSample != 0 :
-    rgwSamples = rgwSamples[iSample:]+rgwSamples[:iSample]
+    rgwSamples = numpy.roll(rgwSamples, -iSample)
 
 print("   done")
 if fLost:
@@ -132,5 +132,5 @@ for v in rgwSamples:
     f.write("%s\n" % v)
 f.close()
 
-plt.plot(numpy.fromiter(rgwSamples, dtype = numpy.uint16))
+plt.plot(rgwSamples)
 plt.show()
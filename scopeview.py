@@ -0,0 +1,381 @@
+"""
+   Scan screen / scan shift display
+   AnalogIn_ShiftScreen.py and DigitalIn_ScanScreen.py read the whole
+   buffer every iteration and redraw every sample. Here the cost of a
+   frame follows what changed:
+       read      FDwf*StatusIndexWrite tells how far the device wrote since
+                 the last poll, only those samples are read, with
+                 StatusData2 straight into a ring of the buffer size
+       decimate  the ring is split into a fixed number of pixel columns,
+                 only the columns the new samples fall in are reduced again
+                 to their min/max (AnalogIn) or and/or (DigitalIn lines)
+       draw      ScopeView blits one envelope line per trace over a cached
+                 background, the axes are only redrawn on resize
+
+   In scan screen mode the ring positions are the device buffer positions
+   and the write index is the sweep cursor. In scan shift mode frame()
+   rolls the columns so the newest is on the right.
+
+   A poll later than a full buffer cannot tell from the write index how
+   many laps it missed, the host clock does: the whole buffer is read
+   again and the skipped samples are counted in lost.
+"""
+
+from ctypes import *
+from dwfconstants import *
+from dwfbuffers import as_pointer
+import numpy as np
+import time
+
+
+class Envelope:
+    # min/max of every pixel column of a ring of samples, reducers are
+    # (np.minimum, np.maximum) for volts and (np.bitwise_and, np.bitwise_or)
+    # for DigitalIn words: all lines high / any line high in the column
+    def __init__(self, size, width, channels=1, dtype=np.float64, reducers=(np.minimum, np.maximum)):
+        width = min(width, size)
+        self.size = size
+        self.width = width
+        self.reducers = reducers
+        # ring positions [edges[c], edges[c+1]) make up column c
+        self.edges = np.arange(width + 1) * size // width
+        self.columns = np.repeat(np.arange(width), np.diff(self.edges))
+        self.data = np.zeros((channels, size), dtype=dtype)
+        self.low = np.zeros((channels, width), dtype=dtype)
+        self.high = np.zeros((channels, width), dtype=dtype)
+
+    def column(self, position):
+        return self.columns[position % self.size]
+
+    def update(self, first, count):
+        # reduce again the columns ring positions [first, first+count) fall in
+        if count >= self.size:
+            first, count = 0, self.size
+        if count <= 0:
+            return
+        end = first + count
+        if end > self.size:
+            self.update(first, self.size - first)
+            self.update(0, end - self.size)
+            return
+        c0 = self.columns[first]
+        c1 = self.columns[end - 1] + 1
+        lo, hi = self.edges[c0], self.edges[c1]
+        starts = self.edges[c0:c1] - lo
+        block = self.data[:, lo:hi]
+        reduceLow, reduceHigh = self.reducers
+        self.low[:, c0:c1] = reduceLow.reduceat(block, starts, axis=1)
+        self.high[:, c0:c1] = reduceHigh.reduceat(block, starts, axis=1)
+
+
+class _ScanReader:
+    # polls a scan mode instrument and keeps an Envelope of its buffer
+    def __init__(self, session, hz, samples, acqmode, width, clock):
+        if acqmode.value not in (acqmodeScanShift.value, acqmodeScanScreen.value):
+            raise ValueError("acqmode is acqmodeScanShift or acqmodeScanScreen")
+        self.session = session
+        self.hz = hz
+        self.samples = samples
+        self.acqmode = acqmode
+        self.width = width
+        # host time source of the lap check, the simulator's clock in tests
+        self.clock = clock
+        self.envelope = None
+        # ring position of the next sample, the last write index read
+        self.index = 0
+        self.total = 0
+        self.lost = 0
+        self.polls = 0
+        self.reads = 0
+
+    @property
+    def shift(self):
+        return self.acqmode.value == acqmodeScanShift.value
+
+    def _prepare(self):
+        # hoisted ctypes arguments for poll()
+        self._sts = c_byte()
+        self._idxWrite = c_int()
+        self._cValid = c_int()
+        self._sts_ref = byref(self._sts)
+        self._idxWrite_ref = byref(self._idxWrite)
+        self._cValid_ref = byref(self._cValid)
+        self._fRead = c_int(1)
+        self._time = self.clock()
+
+    def poll(self):
+        # read the samples written since the last poll, returns their count
+        hdwf = self.session.hdwf
+        if self._status(hdwf, self._fRead, self._sts_ref) != 1:
+            raise RuntimeError("%s failed" % self._status.__name__)
+        now = self.clock()
+        self._indexWrite(hdwf, self._idxWrite_ref)
+        size = self.envelope.size
+        new = (self._idxWrite.value - self.index) % size
+        # a whole lap since the last poll reads as no new samples, the clock tells
+        laps = int(((now - self._time) * self.hz - new) / size + 0.5)
+        self._time = now
+        self.polls += 1
+        if laps > 0:
+            # the whole buffer again, from the write index round to it
+            self.lost += laps * size - (size - new)
+            self.total += laps * size - (size - new)
+            self.index = self._idxWrite.value
+            new = size
+        if new == 0:
+            return 0
+        first = self.index
+        result = new
+        if self.shift:
+            # scan shift returns the valid samples oldest first, the new ones last
+            self._valid(hdwf, self._cValid_ref)
+            source = self._cValid.value - new
+        else:
+            source = first
+        while new > 0:
+            count = min(new, size - first)
+            self._read(source % size, first, count)
+            self.envelope.update(first, count)
+            self.reads += 1
+            self.total += count
+            source += count
+            first = (first + count) % size
+            new -= count
+        self.index = first
+        return result
+
+    def frame(self):
+        # (low, high) columns in display order, the newest right in scan shift mode
+        low, high = self.envelope.low, self.envelope.high
+        if self.shift:
+            column = self.envelope.column(self.index - 1) + 1
+            return np.roll(low, -column, axis=1), np.roll(high, -column, axis=1)
+        return low, high
+
+    def cursor(self):
+        # column of the scan screen write cursor
+        return self.envelope.column(self.index)
+
+    def stop(self):
+        self._configure(self.session.hdwf, c_int(0), c_int(0))
+
+
+class AnalogScan(_ScanReader):
+    def __init__(self, session, hz=1e6, samples=8192, channels=(0,), volts_range=5.0,
+                 acqmode=acqmodeScanShift, width=1000, settle=2.0, clock=time.perf_counter):
+        _ScanReader.__init__(self, session, hz, samples, acqmode, width, clock)
+        self.channels = tuple(channels)
+        self.volts_range = volts_range
+        self.settle = settle
+
+    def configure(self):
+        dwf, hdwf = self.session.dwf, self.session.hdwf
+        for channel in self.channels:
+            dwf.FDwfAnalogInChannelEnableSet(hdwf, c_int(channel), c_int(1))
+            dwf.FDwfAnalogInChannelRangeSet(hdwf, c_int(channel), c_double(self.volts_range))
+        dwf.FDwfAnalogInAcquisitionModeSet(hdwf, self.acqmode)
+        dwf.FDwfAnalogInFrequencySet(hdwf, c_double(self.hz))
+        dwf.FDwfAnalogInBufferSizeSet(hdwf, c_int(self.samples))
+        dwf.FDwfAnalogInConfigure(hdwf, c_int(1), c_int(0))
+        hzAcq = c_double()
+        cSamples = c_int()
+        dwf.FDwfAnalogInFrequencyGet(hdwf, byref(hzAcq))
+        dwf.FDwfAnalogInBufferSizeGet(hdwf, byref(cSamples))
+        self.hz = hzAcq.value
+        self.samples = cSamples.value
+        self.envelope = Envelope(self.samples, self.width, len(self.channels))
+        self._status = dwf.FDwfAnalogInStatus
+        self._indexWrite = dwf.FDwfAnalogInStatusIndexWrite
+        self._valid = dwf.FDwfAnalogInStatusSamplesValid
+        self._data = dwf.FDwfAnalogInStatusData2
+        self._configure = dwf.FDwfAnalogInConfigure
+        self._channels = [c_int(channel) for channel in self.channels]
+        # offsets need time to stabilize after open or a range change
+        time.sleep(self.settle)
+        self.index = self.total = self.lost = 0
+        dwf.FDwfAnalogInConfigure(hdwf, c_int(0), c_int(1))
+        self._prepare()
+        return self
+
+    def _read(self, source, first, count):
+        hdwf = self.session.hdwf
+        for channel, row in zip(self._channels, self.envelope.data):
+            self._data(hdwf, channel, as_pointer(row, first, c_double), c_int(source), c_int(count))
+
+
+class DigitalScan(_ScanReader):
+    def __init__(self, session, hz=1e6, samples=8192, bits=16, acqmode=acqmodeScanScreen, width=1000,
+                 clock=time.perf_counter):
+        _ScanReader.__init__(self, session, hz, samples, acqmode, width, clock)
+        dtypes = {8: np.uint8, 16: np.uint16, 32: np.uint32}
+        if bits not in dtypes:
+            raise ValueError("DigitalIn sample format is 8, 16 or 32 bits")
+        self.bits = bits
+        self.dtype = np.dtype(dtypes[bits])
+
+    def configure(self):
+        dwf, hdwf = self.session.dwf, self.session.hdwf
+        dwf.FDwfDigitalInAcquisitionModeSet(hdwf, self.acqmode)
+        # sample rate = system frequency / divider
+        hzDI = c_double()
+        dwf.FDwfDigitalInInternalClockInfo(hdwf, byref(hzDI))
+        divider = max(1, int(round(hzDI.value / self.hz)))
+        dwf.FDwfDigitalInDividerSet(hdwf, c_int(divider))
+        dwf.FDwfDigitalInSampleFormatSet(hdwf, c_int(self.bits))
+        dwf.FDwfDigitalInBufferSizeSet(hdwf, c_int(self.samples))
+        cSamples = c_int()
+        dwf.FDwfDigitalInBufferSizeGet(hdwf, byref(cSamples))
+        self.hz = hzDI.value / divider
+        self.samples = cSamples.value or self.samples
+        self.envelope = Envelope(self.samples, self.width, 1, self.dtype, (np.bitwise_and, np.bitwise_or))
+        self._status = dwf.FDwfDigitalInStatus
+        self._indexWrite = dwf.FDwfDigitalInStatusIndexWrite
+        self._valid = dwf.FDwfDigitalInStatusSamplesValid
+        self._data = dwf.FDwfDigitalInStatusData2
+        self._configure = dwf.FDwfDigitalInConfigure
+        self.index = self.total = self.lost = 0
+        dwf.FDwfDigitalInConfigure(hdwf, c_int(0), c_int(1))
+        self._prepare()
+        return self
+
+    def _read(self, source, first, count):
+        row = self.envelope.data[0]
+        self._data(self.session.hdwf, as_pointer(row, first), c_int(source), c_int(count * self.dtype.itemsize))
+
+    def lines(self, lines=None):
+        # (low, high) per line in display order, 0/1 each: high 0 the line
+        # stayed low in the column, low 1 it stayed high, else it toggled
+        lines = np.arange(self.bits) if lines is None else np.asarray(lines)
+        low, high = self.frame()
+        shifts = lines.astype(self.dtype)[:, None]
+        return (low[0] >> shifts) & 1, (high[0] >> shifts) & 1
+
+
+class ScopeView:
+    # matplotlib window of a scan reader, traces are zigzag lines through
+    # the (low, high) pairs of each column, blitted over the cached axes
+    def __init__(self, reader, lines=None, ylim=None, title=None):
+        # lines: DigitalIn lines to show, all by default
+        import matplotlib.pyplot as plt
+        self.plt = plt
+        self.reader = reader
+        self.digital = isinstance(reader, DigitalScan)
+        self.line_index = np.arange(reader.bits) if self.digital and lines is None else lines
+        width = reader.envelope.width
+        self.figure, self.ax = plt.subplots()
+        # zigzag x: every column twice
+        x = np.repeat(np.arange(width) * (reader.samples / width / reader.hz), 2)
+        self._pairs = np.zeros((len(self.line_index) if self.digital else len(reader.channels), 2 * width))
+        self.traces = [self.ax.plot(x, row, animated=True, lw=1)[0] for row in self._pairs]
+        self.cursor = None
+        if not reader.shift:
+            self.cursor = self.ax.axvline(0, color="gray", lw=1, animated=True)
+        self.ax.set_xlim(0, reader.samples / reader.hz)
+        if self.digital:
+            self.ax.set_ylim(-0.5, 1.5 * len(self.line_index))
+            self.ax.set_yticks(1.5 * np.arange(len(self.line_index)) + 0.5)
+            self.ax.set_yticklabels(["DIO %d" % line for line in self.line_index])
+        else:
+            span = reader.volts_range / 2
+            self.ax.set_ylim(ylim or (-span, span))
+            self.ax.set_ylabel("V")
+        self.ax.set_xlabel("s")
+        if title:
+            self.ax.set_title(title)
+        self.background = None
+        self.frames = 0
+        self.figure.canvas.mpl_connect("draw_event", self._on_draw)
+
+    def _on_draw(self, event):
+        # full redraws (first show, resize) refresh the cached background
+        self.background = self.figure.canvas.copy_from_bbox(self.figure.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        for trace in self.traces:
+            self.ax.draw_artist(trace)
+        if self.cursor is not None:
+            self.ax.draw_artist(self.cursor)
+
+    def _update_artists(self):
+        reader = self.reader
+        pairs = self._pairs.reshape(len(self._pairs), -1, 2)
+        if self.digital:
+            low, high = reader.lines(self.line_index)
+            offsets = 1.5 * np.arange(len(self.line_index))[:, None]
+            pairs[:, :, 0] = low + offsets
+            pairs[:, :, 1] = high + offsets
+        else:
+            low, high = reader.frame()
+            pairs[:, :, 0] = low
+            pairs[:, :, 1] = high
+        for trace, row in zip(self.traces, self._pairs):
+            trace.set_ydata(row)
+        if self.cursor is not None:
+            x = reader.cursor() * reader.samples / reader.envelope.width / reader.hz
+            self.cursor.set_xdata([x, x])
+
+    def update(self):
+        # poll the reader, blit the traces when samples arrived
+        if not self.reader.poll() or self.background is None:
+            return False
+        self._update_artists()
+        canvas = self.figure.canvas
+        canvas.restore_region(self.background)
+        self._draw_artists()
+        canvas.blit(self.figure.bbox)
+        self.frames += 1
+        return True
+
+    def run(self, seconds=None, fps=30):
+        # until the window is closed or seconds passed, returns stats()
+        self.plt.show(block=False)
+        self.plt.pause(0.1)
+        interval = 1.0 / fps
+        start = time.perf_counter()
+        cpu = time.process_time()
+        while self.plt.fignum_exists(self.figure.number):
+            t = time.perf_counter()
+            if seconds is not None and t - start > seconds:
+                break
+            self.update()
+            self.figure.canvas.flush_events()
+            delay = interval - (time.perf_counter() - t)
+            if delay > 0:
+                time.sleep(delay)
+        return self.stats(time.perf_counter() - start, time.process_time() - cpu)
+
+    def stats(self, elapsed, cpu):
+        reader = self.reader
+        return dict(frames=self.frames, fps=self.frames / max(elapsed, 1e-9), samples=reader.total,
+                    lost=reader.lost, polls=reader.polls, reads=reader.reads, cpu=cpu / max(elapsed, 1e-9))
+
+
+if __name__ == "__main__":
+    from dwfsession import DwfSession
+    import sys
+
+    with DwfSession() as session:
+        dwf, hdwf = session.dwf, session.hdwf
+        if len(sys.argv) > 1 and sys.argv[1] == "digital":
+            # counter on the DIO lines, as in DigitalIn_ScanScreen.py
+            for i in range(16):
+                dwf.FDwfDigitalOutEnableSet(hdwf, c_int(i), c_int(1))
+                dwf.FDwfDigitalOutDividerSet(hdwf, c_int(i), c_int((1 << i) * 1000))
+                dwf.FDwfDigitalOutCounterSet(hdwf, c_int(i), c_int(1), c_int(1))
+            dwf.FDwfDigitalOutConfigure(hdwf, c_int(1))
+            reader = DigitalScan(session, hz=100e3, samples=16384).configure()
+        else:
+            print("Generating sine wave...")
+            dwf.FDwfAnalogOutNodeEnableSet(hdwf, c_int(0), AnalogOutNodeCarrier, c_int(1))
+            dwf.FDwfAnalogOutNodeFunctionSet(hdwf, c_int(0), AnalogOutNodeCarrier, funcSine)
+            dwf.FDwfAnalogOutNodeFrequencySet(hdwf, c_int(0), AnalogOutNodeCarrier, c_double(50))
+            dwf.FDwfAnalogOutNodeAmplitudeSet(hdwf, c_int(0), AnalogOutNodeCarrier, c_double(2))
+            dwf.FDwfAnalogOutConfigure(hdwf, c_int(0), c_int(1))
+            reader = AnalogScan(session, hz=1e6, samples=8192, channels=(0, 1)).configure()
+        view = ScopeView(reader, title="%g Hz, %d samples" % (reader.hz, reader.samples))
+        print("Close the window to stop")
+        result = view.run()
+        reader.stop()
+        print("%(frames)d frames at %(fps).1f fps, %(samples)d samples, %(lost)d lost, %(cpu).1f%% of a core" %
+              dict(result, cpu=result["cpu"] * 100))
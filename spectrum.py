@@ -0,0 +1,205 @@
+"""
+   Spectrum analysis
+   Bulk versions of the per-bin loops in AnalogIn_FFT.py.
+
+   Windows are built once per (size, type, beta) and reused, either by
+   FDwfSpectrumWindow when a library is given or in NumPy. Windows are
+   normalized to a mean of 1, so a windowed sine of amplitude A shows as
+   a bin of magnitude A like in WaveForms.
+
+   spectrum() returns peak magnitude and phase per bin, from NumPy rfft
+   or from FDwfSpectrumFFT, for one capture or a (captures, n) array.
+   Welch averages the power of overlapping windowed segments of a
+   stream fed chunk by chunk, for example AnalogRecorder chunks.
+   find_peaks() refines bin maxima by parabolic interpolation of the
+   dB magnitude.
+"""
+
+from ctypes import *
+from dwfconstants import *
+from dwfbuffers import as_pointer
+from numpy.lib.stride_tricks import sliding_window_view
+import numpy as np
+import threading
+
+# cosine sum coefficients, same order as the DwfWindow constants
+_cosine = {
+    DwfWindowRectangular.value: (1.0,),
+    DwfWindowHamming.value: (0.54, 0.46),
+    DwfWindowHann.value: (0.5, 0.5),
+    DwfWindowBlackmanHarris.value: (0.35875, 0.48829, 0.14128, 0.01168),
+    DwfWindowFlatTop.value: (0.21557895, 0.41663158, 0.277263158, 0.083578947, 0.006947368),
+    DwfWindowBlackman.value: (0.42, 0.5, 0.08),
+    DwfWindowFlatTopM.value: (1.0, 1.93, 1.29, 0.388, 0.028),
+}
+
+
+def make_window(size, kind=DwfWindowFlatTop, beta=1.0):
+    # periodic window of mean 1 and its noise equivalent bandwidth in bins
+    kind = getattr(kind, "value", kind)
+    t = np.arange(size) / size
+    if kind in _cosine:
+        window = np.zeros(size)
+        for k, a in enumerate(_cosine[kind]):
+            window += (-1) ** k * a * np.cos(2 * np.pi * k * t)
+    elif kind == DwfWindowTriangular.value:
+        window = 1 - np.abs(2 * t - 1)
+    elif kind == DwfWindowCosine.value:
+        window = np.sin(np.pi * t)
+    elif kind == DwfWindowKaiser.value:
+        window = np.kaiser(size + 1, beta)[:-1]
+    else:
+        raise ValueError("Unknown window type %d" % kind)
+    window /= window.mean()
+    return window, size * np.sum(window ** 2) / np.sum(window) ** 2
+
+
+class WindowCache:
+    def __init__(self, dwf=None):
+        # with dwf the windows come from FDwfSpectrumWindow
+        self.dwf = dwf
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def get(self, size, kind=DwfWindowFlatTop, beta=1.0):
+        # (read only window, NEBW), built on first use
+        key = (size, getattr(kind, "value", kind), beta)
+        with self._lock:
+            if key not in self._windows:
+                if self.dwf is None:
+                    window, nebw = make_window(size, kind, beta)
+                else:
+                    window = np.zeros(size)
+                    vNEBW = c_double()
+                    self.dwf.FDwfSpectrumWindow(as_pointer(window, 0, c_double), c_int(size), c_int(key[1]),
+                                                c_double(beta), byref(vNEBW))
+                    nebw = vNEBW.value
+                window.setflags(write=False)
+                self._windows[key] = (window, nebw)
+            return self._windows[key]
+
+
+windows = WindowCache()
+
+
+def frequencies(size, hz):
+    return np.fft.rfftfreq(size, 1 / hz)
+
+
+def spectrum(samples, window=None, dwf=None):
+    # (magnitude, phase) of samples (..., n), magnitude in peak volts, phase in radians
+    samples = np.asarray(samples, dtype=np.float64)
+    size = samples.shape[-1]
+    if window is not None:
+        samples = samples * window
+    if dwf is not None:
+        # FDwfSpectrumFFT wants a power of two and returns size/2+1 bins
+        rows = samples.reshape(-1, size)
+        magnitude = np.zeros((len(rows), size // 2 + 1))
+        phase = np.zeros_like(magnitude)
+        for row, mag, ph in zip(rows, magnitude, phase):
+            row = np.ascontiguousarray(row)
+            dwf.FDwfSpectrumFFT(as_pointer(row, 0, c_double), c_int(size), as_pointer(mag, 0, c_double),
+                                as_pointer(ph, 0, c_double), c_int(len(mag)))
+        shape = samples.shape[:-1] + (size // 2 + 1,)
+        return magnitude.reshape(shape), phase.reshape(shape)
+    bins = np.fft.rfft(samples)
+    magnitude = np.abs(bins) * (2.0 / size)
+    magnitude[..., 0] /= 2
+    return magnitude, np.angle(bins)
+
+
+def to_dbv(magnitude, floor=-200.0):
+    # peak volts to dBV (RMS)
+    return np.maximum(20 * np.log10(np.maximum(magnitude, 1e-30) / np.sqrt(2)), floor)
+
+
+def to_degrees(phase, dbv=None, mask=-60.0):
+    # phase in degrees, zeroed where the bin is below mask dBV
+    degrees = np.degrees(phase)
+    if dbv is not None:
+        degrees = np.where(dbv < mask, 0.0, degrees)
+    return degrees
+
+
+def find_peaks(dbv, hz=None, count=1, skip=5):
+    # (frequency, dBV) of the count highest local maxima past the first skip bins,
+    # frequency in bins when hz is None, else in Hz for a capture at hz
+    dbv = np.asarray(dbv)
+    middle = dbv[1:-1]
+    local = np.flatnonzero((middle >= dbv[:-2]) & (middle > dbv[2:])) + 1
+    local = local[local >= skip]
+    top = local[np.argsort(dbv[local])[::-1][:count]]
+    a, b, c = dbv[top - 1], dbv[top], dbv[top + 1]
+    curve = a - 2 * b + c
+    delta = np.where(curve != 0, 0.5 * (a - c) / np.where(curve != 0, curve, 1), 0.0)
+    position = top + delta
+    level = b - 0.25 * (a - c) * delta
+    if hz is not None:
+        position = position * hz / (2 * (len(dbv) - 1))
+    return position, level
+
+
+class Welch:
+    def __init__(self, size, hz, kind=DwfWindowHann, beta=1.0, overlap=0.5, cache=None):
+        self.size = size
+        self.hz = hz
+        self.window, self.nebw = (cache or windows).get(size, kind, beta)
+        self.hop = max(1, int(round(size * (1 - overlap))))
+        self.frequencies = frequencies(size, hz)
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self._power = np.zeros(self.size // 2 + 1)
+        self._pending = np.zeros(0)
+
+    def update(self, samples):
+        # adds every complete segment of the stream, returns how many
+        samples = np.concatenate((self._pending, np.asarray(samples, dtype=np.float64).ravel()))
+        if len(samples) < self.size:
+            self._pending = samples
+            return 0
+        segments = sliding_window_view(samples, self.size)[::self.hop]
+        magnitude, _ = spectrum(segments, self.window)
+        self._power += np.sum(magnitude ** 2, axis=0)
+        self.count += len(segments)
+        self._pending = samples[len(segments) * self.hop:]
+        return len(segments)
+
+    @property
+    def magnitude(self):
+        # averaged peak magnitude per bin
+        return np.sqrt(self._power / max(self.count, 1))
+
+    @property
+    def dbv(self):
+        return to_dbv(self.magnitude)
+
+
+if __name__ == "__main__":
+    import time
+
+    hz = 20e6
+    size = 32768
+    t = np.arange(size * 64) / hz
+    signal = 0.705 * np.sin(2 * np.pi * 500123.0 * t) + np.random.default_rng(0).normal(0, 1e-3, len(t))
+    captures = signal.reshape(-1, size)
+    window, nebw = windows.get(size, DwfWindowFlatTop)
+
+    start = time.perf_counter()
+    for capture in captures:
+        magnitude, phase = spectrum(capture, window)
+        dbv = to_dbv(magnitude)
+        degrees = to_degrees(phase, dbv)
+        peak, level = find_peaks(dbv, hz)
+    elapsed = time.perf_counter() - start
+    print("%d point spectra: %.0f per second" % (size, len(captures) / elapsed))
+    print("peak %.1f Hz %.2f dBV" % (peak[0], level[0]))
+
+    welch = Welch(size, hz, overlap=0.5)
+    start = time.perf_counter()
+    for chunk in np.array_split(signal, 100):
+        welch.update(chunk)
+    elapsed = time.perf_counter() - start
+    print("Welch: %d segments, %.0f per second, noise floor %.1f dBV" % (welch.count, welch.count / elapsed, np.median(welch.dbv)))
@@ -0,0 +1,154 @@
+"""
+   SPI decoder
+   Decodes SPI words from DigitalIn sample arrays with NumPy edge
+   detection instead of walking every sample in Python.
+
+   samples are the packed 8, 16 or 32 bit words returned by
+   FDwfDigitalInStatusData, cs/clk/mosi/miso are DIO bit indexes.
+   Decoded words are returned as a structured array with the fields
+       index   sample index of the last bit of the word
+       frame   number of the CS frame the word belongs to
+       mosi    word shifted in from MOSI, MSB first
+       miso    word shifted in from MISO, MSB first
+
+   SpiDecoder keeps the last sample and the unfinished word between
+   calls, so a record-mode stream can be fed chunk by chunk. Edges from
+   compressed.RunDecoder can be decoded the same way with decode_edges().
+   Run this file to benchmark the decoder on a synthetic capture.
+"""
+
+import numpy as np
+import time
+
+frame_dtype = np.dtype([("index", np.int64), ("frame", np.int64), ("mosi", np.uint32), ("miso", np.uint32)])
+
+
+class SpiDecoder:
+    def __init__(self, cs, clk, mosi, miso, nbits=8, cpol=0, cpha=0, sync=False):
+        # sync: samples were taken by the DigitalIn sync mode on the sampling
+        # clock edge, as in Digital_Spi_Spy.py, so every CS low sample is a bit
+        self.cs = cs
+        self.clk = clk
+        self.mosi = mosi
+        self.miso = miso
+        self.nbits = nbits
+        self.sync = sync
+        # data is sampled on the leading edge for cpha 0, trailing for cpha 1
+        self.rising = int(cpol == cpha)
+        self.weights = (1 << np.arange(nbits - 1, -1, -1)).astype(np.uint64)
+        self.reset()
+
+    def reset(self):
+        self.position = 0
+        self.frame = 0
+        self.leftover = 0
+        self._last = None
+        self._pending = np.zeros((0, 3), dtype=np.int64)
+
+    def decode(self, samples):
+        samples = np.asarray(samples)
+        n = len(samples)
+        if n == 0:
+            return np.zeros(0, dtype=frame_dtype)
+        if self._last is None:
+            # first chunk, assume idle bus before it
+            self._last = (1 << self.cs) | ((1 - self.rising) << self.clk)
+        previous = np.empty(n, dtype=samples.dtype)
+        previous[0] = self._last
+        previous[1:] = samples[:-1]
+
+        cs = (samples >> self.cs) & 1
+        if self.sync:
+            bit = cs == 0
+        else:
+            clk = (samples >> self.clk) & 1
+            clk_prev = (previous >> self.clk) & 1
+            bit = (clk != clk_prev) & (clk == self.rising) & (cs == 0)
+        # a CS deassert closes the frame, segment 0 continues the previous chunk
+        deassert = (cs == 1) & (((previous >> self.cs) & 1) == 0)
+        segment = np.cumsum(deassert)
+
+        at = np.flatnonzero(bit)
+        edges = np.empty((len(at), 3), dtype=np.int64)
+        edges[:, 0] = at + self.position
+        edges[:, 1] = segment[at]
+        edges[:, 2] = (((samples[at] >> self.mosi) & 1) << 1) | ((samples[at] >> self.miso) & 1)
+        edges = np.concatenate((self._pending, edges))
+
+        # position of every bit inside its segment
+        seg = edges[:, 1]
+        starts = np.flatnonzero(np.diff(seg, prepend=-1))
+        counts = np.diff(starts, append=len(seg))
+        first = np.repeat(starts, counts)
+        count = np.repeat(counts, counts)
+        pos = np.arange(len(edges)) - first
+        last_segment = segment[-1]
+        complete = pos < (count // self.nbits) * self.nbits
+
+        open_bits = (seg == last_segment) & ~complete
+        self.leftover += int(np.count_nonzero(~complete & ~open_bits))
+        pending = edges[open_bits]
+        pending[:, 1] = 0
+        self._pending = pending
+
+        words = edges[complete]
+        frames = np.zeros(len(words) // self.nbits, dtype=frame_dtype)
+        if len(frames):
+            bits = words[:, 2].reshape(-1, self.nbits).astype(np.uint64)
+            frames["mosi"] = (bits >> 1) @ self.weights
+            frames["miso"] = (bits & 1) @ self.weights
+            frames["index"] = words[self.nbits - 1::self.nbits, 0]
+            frames["frame"] = words[self.nbits - 1::self.nbits, 1] + self.frame
+
+        self.frame += int(last_segment)
+        self.position += n
+        self._last = samples[-1]
+        return frames
+
+
+    def decode_edges(self, edges):
+        # decode compressed.RunDecoder edges, index becomes the sample time
+        base = self.position
+        frames = self.decode(edges["value"])
+        frames["index"] = edges["time"][frames["index"] - base]
+        return frames
+
+
+def spi_decode(samples, cs, clk, mosi, miso, nbits=8, cpol=0, cpha=0):
+    return SpiDecoder(cs, clk, mosi, miso, nbits, cpol, cpha).decode(samples)
+
+
+def synthetic_capture(mosi_words, miso_words, cs=0, clk=1, mosi=2, miso=3, nbits=8, cpol=0, cpha=0,
+                      frame_words=4, half_period=2, gap=8):
+    # oversampled 8 bit capture of the given words, frame_words words per CS frame
+    idle = np.full(gap, (1 << cs) | (cpol << clk), dtype=np.uint8)
+    # cpha 0 holds the idle level first, cpha 1 starts each bit with the leading edge
+    first = cpol if cpha == 0 else 1 - cpol
+    halves = np.repeat(np.array([first, 1 - first], dtype=np.uint8) << clk, half_period)
+    shift = np.arange(nbits - 1, -1, -1)
+    chunks = [idle]
+    for start in range(0, len(mosi_words), frame_words):
+        tx = np.asarray(mosi_words[start:start + frame_words], dtype=np.uint32)
+        rx = np.asarray(miso_words[start:start + frame_words], dtype=np.uint32)
+        data = ((((tx[:, None] >> shift) & 1) << mosi) | (((rx[:, None] >> shift) & 1) << miso)).ravel()
+        chunks.append((data.astype(np.uint8)[:, None] | halves).ravel())
+        chunks.append(idle)
+    return np.concatenate(chunks)
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    nWords = 400000
+    tx = rng.integers(0, 256, nWords)
+    rx = rng.integers(0, 256, nWords)
+    samples = synthetic_capture(tx, rx)
+    print("Synthetic capture: %d samples, %d words" % (len(samples), nWords))
+
+    for chunk in (len(samples), 1 << 20, 1 << 16):
+        decoder = SpiDecoder(cs=0, clk=1, mosi=2, miso=3)
+        start = time.perf_counter()
+        result = [decoder.decode(samples[i:i + chunk]) for i in range(0, len(samples), chunk)]
+        elapsed = time.perf_counter() - start
+        frames = np.concatenate(result)
+        ok = np.array_equal(frames["mosi"], tx) and np.array_equal(frames["miso"], rx)
+        print("chunk %9d: %8.1f MB/s %s" % (chunk, samples.nbytes / elapsed / 1e6, "ok" if ok else "MISMATCH"))
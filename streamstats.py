@@ -0,0 +1,231 @@
+"""
+   Streaming signal statistics
+   Vectorized replacement for the DC / DC-RMS / AC-RMS loops of
+   AnalogIn_Logger.py. StreamStats takes (channels, n) blocks of any
+   size, from AnalogRecorder chunks or scan shift buffers, and
+       - closes fixed windows of window samples and returns one row per
+         window and channel: mean (DC), rms (DC-RMS), acrms (AC-RMS,
+         standard deviation), min and max
+       - keeps running totals over the whole stream: count, mean,
+         variance (merged per block, Chan et al.), min and max
+       - keeps a histogram sketch over [lo, hi) per channel from which
+         percentiles are read with the resolution of one bin
+
+   Window rows are stats_dtype records. StatsLog appends them to a
+   binary file and rotates it like logging.handlers.RotatingFileHandler.
+   read_log() loads the file and its backups in order.
+"""
+
+import numpy as np
+import os
+
+stats_dtype = np.dtype([("time", np.float64), ("channel", np.uint16), ("count", np.uint32),
+                        ("mean", np.float64), ("rms", np.float64), ("acrms", np.float64),
+                        ("min", np.float64), ("max", np.float64)])
+
+
+class HistogramSketch:
+    # fixed bins per channel, values outside [lo, hi) land in the end bins
+    def __init__(self, channels, lo=-5.0, hi=5.0, bins=4096):
+        self.lo = lo
+        self.hi = hi
+        self.bins = bins
+        self.scale = bins / (hi - lo)
+        self.counts = np.zeros((channels, bins), dtype=np.int64)
+        self._base = (np.arange(channels) * bins)[:, np.newaxis]
+
+    def update(self, block):
+        index = ((block - self.lo) * self.scale).astype(np.int64)
+        np.clip(index, 0, self.bins - 1, out=index)
+        self.counts += np.bincount((index + self._base).ravel(), minlength=self.counts.size).reshape(self.counts.shape)
+
+    def quantile(self, q):
+        # (channels, len(q)) values, interpolated inside the bin
+        q = np.atleast_1d(q)
+        cumulative = np.cumsum(self.counts, axis=1)
+        result = np.empty((len(self.counts), len(q)))
+        for channel, row in enumerate(cumulative):
+            if not row[-1]:
+                result[channel] = np.nan
+                continue
+            rank = q * row[-1]
+            i = np.minimum(np.searchsorted(row, rank, side="left"), self.bins - 1)
+            below = np.where(i > 0, row[i - 1], 0)
+            frac = (rank - below) / np.maximum(self.counts[channel, i], 1)
+            result[channel] = self.lo + (i + frac) / self.scale
+        return result
+
+    def reset(self):
+        self.counts[:] = 0
+
+
+class StreamStats:
+    def __init__(self, channels=(0, 1), hz=1.0, window=None, lo=-5.0, hi=5.0, bins=4096):
+        # window: samples per output row, None returns no rows and keeps the totals only
+        self.channels = tuple(channels)
+        self.hz = hz
+        self.window = window
+        self.sketch = HistogramSketch(len(self.channels), lo, hi, bins)
+        self.position = 0
+        self._pending = np.zeros((len(self.channels), 0))
+        self.reset()
+
+    def reset(self):
+        n = len(self.channels)
+        self.count = 0
+        self.mean = np.zeros(n)
+        self._m2 = np.zeros(n)
+        self._sumsq = np.zeros(n)
+        self.min = np.full(n, np.inf)
+        self.max = np.full(n, -np.inf)
+        self.sketch.reset()
+
+    @property
+    def variance(self):
+        return self._m2 / self.count if self.count else np.full(len(self.channels), np.nan)
+
+    @property
+    def rms(self):
+        return np.sqrt(self._sumsq / self.count) if self.count else np.full(len(self.channels), np.nan)
+
+    @property
+    def acrms(self):
+        return np.sqrt(self.variance)
+
+    def percentile(self, q):
+        # q in percent, like numpy.percentile
+        return self.sketch.quantile(np.asarray(q, dtype=np.float64) / 100)
+
+    def update(self, block):
+        # block is (channels, n), or (n,) for one channel, returns the closed window rows
+        block = np.asarray(block, dtype=np.float64)
+        if block.ndim == 1:
+            block = block[np.newaxis]
+        n = block.shape[1]
+        if n:
+            self._accumulate(block)
+        if self.window is None:
+            self.position += n
+            return np.zeros(0, dtype=stats_dtype)
+        return self._windows(block)
+
+    def _accumulate(self, block):
+        n = block.shape[1]
+        mean = block.mean(axis=1)
+        m2 = ((block - mean[:, np.newaxis]) ** 2).sum(axis=1)
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self._m2 += m2 + delta ** 2 * self.count * n / total
+        self._sumsq += np.einsum("ij,ij->i", block, block)
+        self.count = total
+        np.minimum(self.min, block.min(axis=1), out=self.min)
+        np.maximum(self.max, block.max(axis=1), out=self.max)
+        self.sketch.update(block)
+
+    def _windows(self, block):
+        if self._pending.shape[1]:
+            block = np.concatenate((self._pending, block), axis=1)
+        start = self.position - self._pending.shape[1]
+        nWindows = block.shape[1] // self.window
+        used = nWindows * self.window
+        self._pending = block[:, used:].copy()
+        self.position = start + block.shape[1]
+        rows = np.zeros((nWindows, len(self.channels)), dtype=stats_dtype)
+        if not nWindows:
+            return rows.reshape(-1)
+        windows = block[:, :used].reshape(len(self.channels), nWindows, self.window)
+        mean = windows.mean(axis=2)
+        rows["time"] = ((start + np.arange(nWindows) * self.window) / self.hz)[:, np.newaxis]
+        rows["channel"] = self.channels
+        rows["count"] = self.window
+        rows["mean"] = mean.T
+        rows["rms"] = np.sqrt(np.einsum("cwi,cwi->cw", windows, windows) / self.window).T
+        rows["acrms"] = windows.std(axis=2).T
+        rows["min"] = windows.min(axis=2).T
+        rows["max"] = windows.max(axis=2).T
+        return rows.reshape(-1)
+
+
+def buffer_stats(samples, channels=(0,), time=0.0):
+    # one row per channel for a whole scan shift buffer, as AnalogIn_Logger.py prints
+    samples = np.atleast_2d(np.asarray(samples, dtype=np.float64))
+    stats = StreamStats(channels, window=samples.shape[1])
+    rows = stats.update(samples)
+    rows["time"] = time
+    return rows
+
+
+class StatsLog:
+    def __init__(self, path, max_bytes=16 << 20, backups=4):
+        # when path reaches max_bytes it becomes path.1, path.1 becomes path.2 ...
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.file = open(path, "ab")
+
+    def append(self, rows):
+        if not len(rows):
+            return
+        np.asarray(rows, dtype=stats_dtype).tofile(self.file)
+        if self.file.tell() >= self.max_bytes:
+            self.rotate()
+
+    def rotate(self):
+        self.file.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists("%s.%d" % (self.path, i)):
+                os.replace("%s.%d" % (self.path, i), "%s.%d" % (self.path, i + 1))
+        if self.backups:
+            os.replace(self.path, self.path + ".1")
+        self.file = open(self.path, "wb")
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+def read_log(path, backups=True):
+    # rows of path, preceded by its rotated backups oldest first
+    paths = [path]
+    if backups:
+        i = 1
+        while os.path.exists("%s.%d" % (path, i)):
+            paths.insert(0, "%s.%d" % (path, i))
+            i += 1
+    return np.concatenate([np.fromfile(p, dtype=stats_dtype) for p in paths if os.path.exists(p)])
+
+
+if __name__ == "__main__":
+    from dwfsession import DwfSession
+    from recorder import AnalogRecorder
+    import time
+
+    hz = 1e6
+    rate = 100 # statistics rows per second and channel
+    channels = (0, 1)
+    stats = StreamStats(channels, hz, window=int(hz / rate))
+    with DwfSession() as session, StatsLog("stats.bin") as log:
+        recorder = AnalogRecorder(session, hz, channels, seconds=5)
+        rows = 0
+        with recorder:
+            for chunk in recorder:
+                found = stats.update(chunk)
+                log.append(found)
+                # print the last window once per second
+                if rows // (rate * len(channels)) != (rows + len(found)) // (rate * len(channels)):
+                    for row in found[-len(channels):]:
+                        print(f"{row['time']:.2f}s CH:{row['channel']+1} DC:{row['mean']:.3f}V DCRMS:{row['rms']:.3f}V ACRMS:{row['acrms']:.3f}V")
+                rows += len(found)
+        print("%d rows, %.1f per second and channel" % (rows, rows / len(channels) / recorder.metrics()["elapsed"]))
+        print("median", stats.percentile(50).ravel(), "p99", stats.percentile(99).ravel())
+        print(recorder.metrics())
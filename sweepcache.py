@@ -0,0 +1,141 @@
+"""
+   Sweep result cache
+   Keeps measured impedance and network analyzer sweeps on disk so
+   replotting or exporting a sweep that was already taken does not run
+   it again. Entries are keyed by
+       kind, device serial, FDwfAnalogImpedanceModeSet mode,
+       reference resistor, amplitude and frequency grid
+   where the grid is either the array of frequencies or, for adaptive
+   sweeps, the settings that produce it.
+
+   The open/short compensation in effect (FDwfAnalogImpedanceCompGet, as
+   set by AnalogImpedance_Compensation.py) is stored with every entry.
+   A lookup with different compensation drops the entry.
+
+   Each entry is one uncompressed .npz file. Hits touch the file, and
+   the least recently used entries are removed once there are more than
+   max_entries or they take more than max_bytes.
+"""
+
+from ctypes import *
+import hashlib
+import json
+import numpy as np
+import os
+import threading
+
+
+def sweep_key(kind, serial, mode, reference, amplitude, grid):
+    # grid: frequencies, or a dict of the settings of an adaptive sweep
+    if isinstance(grid, dict):
+        grid = json.dumps(grid, sort_keys=True)
+    else:
+        grid = hashlib.sha1(np.ascontiguousarray(grid, dtype=np.float64).tobytes()).hexdigest()
+    fields = dict(kind=kind, serial=serial, mode=mode, reference=float(reference),
+                  amplitude=float(amplitude), grid=grid)
+    return hashlib.sha1(json.dumps(fields, sort_keys=True).encode()).hexdigest()
+
+
+def read_compensation(session):
+    # (open resistance, open reactance, short resistance, short reactance)
+    values = [c_double() for i in range(4)]
+    session.dwf.FDwfAnalogImpedanceCompGet(session.hdwf, *[byref(v) for v in values])
+    return tuple(v.value for v in values)
+
+
+class SweepCache:
+    def __init__(self, directory="sweepcache", max_entries=256, max_bytes=256 << 20):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def get(self, key, compensation=None):
+        # cached result, or None when missing or measured with other compensation
+        path = self._path(key)
+        try:
+            with np.load(path) as entry:
+                result = entry["result"]
+                stored = entry["compensation"]
+        except (OSError, KeyError, ValueError):
+            self.misses += 1
+            return None
+        if compensation is not None and not np.array_equal(stored, np.asarray(compensation, dtype=np.float64)):
+            self.discard(key)
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return result
+
+    def put(self, key, result, compensation=None):
+        compensation = np.asarray(compensation if compensation is not None else (), dtype=np.float64)
+        path = self._path(key)
+        temp = "%s.%d.%d.tmp" % (path, os.getpid(), threading.get_ident())
+        with open(temp, "wb") as f:
+            np.savez(f, result=result, compensation=compensation)
+        os.replace(temp, path)
+        self.evict()
+
+    def discard(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def entries(self):
+        # (mtime, size, path) of every entry, least recently used first
+        found = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".npz"):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                found.append((stat.st_mtime_ns, stat.st_size, path))
+        return sorted(found)
+
+    def evict(self):
+        with self._lock:
+            found = self.entries()
+            total = sum(size for _, size, _ in found)
+            while found and (len(found) > self.max_entries or total > self.max_bytes):
+                _, size, path = found.pop(0)
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            os.remove(path)
+
+
+def cached_sweep(sweep, cache):
+    # ImpedanceSweep.run() through the cache
+    session = sweep.session
+    grid = dict(start=sweep.start, stop=sweep.stop, steps=sweep.steps, max_steps=sweep.max_steps,
+                max_db=sweep.max_db, max_degrees=sweep.max_degrees, min_ratio=sweep.min_ratio,
+                offset=sweep.offset, periods=sweep.periods)
+    if session.serial is None:
+        raise ValueError("Cached sweeps need the device serial number, open the session first")
+    key = sweep_key("impedance", session.serial, sweep.mode, sweep.reference, sweep.amplitude, grid)
+    # the sweep keeps the device's compensation unless it was given one
+    compensation = sweep.compensation if sweep.compensation is not None else read_compensation(session)
+    result = cache.get(key, compensation)
+    if result is None:
+        result = sweep.run()
+        # as applied by configure()
+        cache.put(key, result, sweep.compensation)
+    return result
@@ -0,0 +1,137 @@
+"""
+   USB link telemetry
+   Device_Speed.py reads the AnalogIO channel 14 link nodes once. The
+   LinkMonitor samples them on a background thread while acquisitions
+   run, next to the samples / lost / corrupted counters of the streams
+   that call FDwfAnalogInStatusRecord or FDwfDigitalInStatusRecord
+   (AnalogRecorder, compressed.CompressedStream or anything with those
+   attributes). Sources are read, never polled, so the monitor does not
+   steal data from them.
+
+   Channel 14 nodes:
+       1 / 2   seconds per transfer to / from the device
+       3 / 4   bytes per second to / from the device
+       5 / 6   bytes transferred to / from the device
+
+   series() returns the history as a link_dtype array, metrics() a dict
+   with the latest values, the peak rate and when samples were first
+   lost, to show the rate at which the link saturated.
+"""
+
+from ctypes import *
+from collections import deque
+import numpy as np
+import threading
+import time
+
+LINK_CHANNEL = 14
+# field, node
+LINK_NODES = (("sec_to", 1), ("sec_from", 2), ("bps_to", 3), ("bps_from", 4), ("bytes_to", 5), ("bytes_from", 6))
+
+link_dtype = np.dtype([("time", np.float64)] + [(name, np.float64) for name, _ in LINK_NODES] +
+                      [("samples", np.int64), ("lost", np.int64), ("corrupted", np.int64)])
+
+
+def read_link(session):
+    # dict of the channel 14 node values
+    value = c_double()
+    result = {}
+    for name, node in LINK_NODES:
+        session.dwf.FDwfAnalogIOChannelNodeStatus(session.hdwf, c_int(LINK_CHANNEL), c_int(node), byref(value))
+        result[name] = value.value
+    return result
+
+
+class LinkMonitor:
+    def __init__(self, session, sources=(), interval=0.1, history=36000, window=None):
+        # sources: objects with samples, lost and corrupted counters
+        # window: averaging time of the rate nodes, node 0 as in Device_Speed.py
+        self.session = session
+        self.sources = list(sources)
+        self.interval = interval
+        self.window = window
+        self.rows = deque(maxlen=history)
+        self.error = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._t0 = None
+
+    def add(self, source):
+        self.sources.append(source)
+
+    def start(self):
+        if self.window is not None:
+            self.session.dwf.FDwfAnalogIOChannelNodeSet(self.session.hdwf, c_int(LINK_CHANNEL), c_int(0), c_double(self.window))
+        self._stop.clear()
+        self._t0 = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="LinkMonitor", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    def sample(self):
+        # one row now, also called by the monitor thread
+        row = read_link(self.session)
+        row["time"] = time.perf_counter() - (self._t0 or 0.0)
+        for name in ("samples", "lost", "corrupted"):
+            row[name] = sum(int(getattr(source, name, 0)) for source in self.sources)
+        row = tuple(row[name] for name in link_dtype.names)
+        self.rows.append(row)
+        return row
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                self.sample()
+                self._stop.wait(self.interval)
+        except Exception as e:
+            self.error = e
+
+    def series(self):
+        return np.array(list(self.rows), dtype=link_dtype)
+
+    def metrics(self):
+        rows = self.series()
+        if not len(rows):
+            return {}
+        last = rows[-1]
+        result = {name: last[name].item() for name in link_dtype.names}
+        result["peak_bps_from"] = float(rows["bps_from"].max())
+        result["peak_bps_to"] = float(rows["bps_to"].max())
+        # intervals in which samples were lost and the rate while it happened
+        losing = np.flatnonzero(np.diff(rows["lost"], prepend=rows["lost"][:1]) > 0)
+        result["loss_intervals"] = len(losing)
+        result["first_loss_time"] = float(rows["time"][losing[0]]) if len(losing) else None
+        result["bps_from_at_first_loss"] = float(rows["bps_from"][losing[0]]) if len(losing) else None
+        return result
+
+
+if __name__ == "__main__":
+    from dwfsession import DwfSession
+    from recorder import AnalogRecorder
+
+    # raise the record rate until samples are lost
+    with DwfSession() as session:
+        for hz in (1e6, 2e6, 5e6, 10e6, 20e6):
+            recorder = AnalogRecorder(session, hz, channels=(0, 1), seconds=2, dtype=np.int16)
+            monitor = LinkMonitor(session, [recorder], interval=0.05)
+            with monitor, recorder:
+                for chunk in recorder:
+                    pass
+            m = monitor.metrics()
+            print("%5.0f MHz: %6.2f MiBps from device, peak %6.2f MiBps, lost %d samples" % (
+                hz / 1e6, m["bps_from"] / 1024 / 1024, m["peak_bps_from"] / 1024 / 1024, m["lost"]))
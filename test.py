@@ -1,43 +1,19 @@
 from ctypes import *
 from dwfconstants import *
-import matplotlib.pyplot as plt
+from dwfsession import DwfSession
+from pulsetrain import Pulse, DioSwitch, compile_sequence
 import numpy as np
 import time
-import sys
 
-def open_device():
-    if sys.platform.startswith("win"):
-        dwf = cdll.dwf
-    elif sys.platform.startswith("linux"):
-        dwf = cdll.LoadLibrary("libdwf.so")
-
-    hdwf = c_int()
-
-    dwf.FDwfParamSet(DwfParamOnClose, c_int(0))
-    #Open the first device
-    dwf.FDwfDeviceOpen(c_int(-1), byref(hdwf))
-
-    if hdwf.value == hdwfNone.value:
-        print("Failed to open device")
-        quit()
-    
-    dwf.FDwfDeviceAutoConfigureSet(hdwf, c_int(0))
-    
-    return dwf, hdwf
-
-
-def close_device(dwf, hdwf):
-    dwf.FDwfDeviceClose(hdwf)
-    print("Device closed")
-
-
-def DigitalIO_Switch(dwf, hdwf, mask, value):
+def DigitalIO_Switch(session, mask, value):
+    dwf, hdwf = session.dwf, session.hdwf
     dwf.FDwfDigitalIOOutputEnableSet(hdwf, c_int(mask))
     dwf.FDwfDigitalIOOutputSet(hdwf, c_int(value))
     dwf.FDwfDigitalIOConfigure(hdwf)
 
 
-def AnalogIO_On(dwf, hdwf, isPositive=False, positive_v=0.0, isNegative=False, negative_v=0.0):
+def AnalogIO_On(session, isPositive=False, positive_v=0.0, isNegative=False, negative_v=0.0):
+    dwf, hdwf = session.dwf, session.hdwf
     if isPositive:    
         # enabel positive supply
         dwf.FDwfAnalogIOChannelNodeSet(hdwf, 0, 0, c_double(1))
@@ -60,79 +36,89 @@ def AnalogIO_On(dwf, hdwf, isPositive=False, positive_v=0.0, isNegative=False, n
     dwf.FDwfAnalogIOEnableSet(hdwf, c_int(1))
 
 
-def AnalogIO_Off(dwf, hdwf):
+def AnalogIO_Off(session):
+    dwf, hdwf = session.dwf, session.hdwf
     # disable all analog IO channels
     dwf.FDwfAnalogIOEnableSet(hdwf, c_int(0))
 
 
-def AnalogOut_pulse(dwf, hdwf, channel, period, width, amplitude, offset=0.0, count=1, wait=0.0, isPlot=False):
-    frequency = 1.0 / period
-    duty = width / period
-
-
-    dwf.FDwfAnalogOutNodeEnableSet(hdwf, c_int(channel), AnalogOutNodeCarrier, c_int(1))
-    dwf.FDwfAnalogOutIdleSet(hdwf, c_int(channel), DwfAnalogOutIdleOffset)
-    dwf.FDwfAnalogOutNodeFunctionSet(hdwf, c_int(channel), AnalogOutNodeCarrier, funcPulse)
-    dwf.FDwfAnalogOutNodeFrequencySet(hdwf, c_int(channel), AnalogOutNodeCarrier, c_double(frequency))
-    dwf.FDwfAnalogOutNodeAmplitudeSet(hdwf, c_int(channel), AnalogOutNodeCarrier, c_double(amplitude))
-    dwf.FDwfAnalogOutNodeOffsetSet(hdwf, c_int(channel), AnalogOutNodeCarrier, c_double(offset))
+def AnalogOut_pulse(session, channel, period, width, amplitude, offset=0.0, count=1, wait=0.0, isPlot=False):
+    AnalogOut_pulse_apply(session, channel, period, width, amplitude, offset, count, wait)
+    # start, only the settings that changed since the last pulse were sent
+    session.analog_out.configure(channel, 1)
 
-    dwf.FDwfAnalogOutRunSet(hdwf, c_int(channel), c_double(period))
-    dwf.FDwfAnalogOutWaitSet(hdwf, c_int(channel), c_double(wait))
-    dwf.FDwfAnalogOutRepeatSet(hdwf, c_int(channel), c_int(count))
 
-    dwf.FDwfAnalogOutConfigure(hdwf, c_int(channel), c_int(1))
+def AnalogOut_pulse_setting(session, channel, period, width, amplitude, offset=0.0):
+    AnalogOut_pulse_apply(session, channel, period, width, amplitude, offset, 1, 0.0)
+    session.analog_out.configure(channel, 0)
 
 
-def AnalogOut_pulse_setting(dwf, hdwf, channel, period, width, amplitude, offset=0.0):
+def AnalogOut_pulse_apply(session, channel, period, width, amplitude, offset, count, wait):
+    awg = session.analog_out
     frequency = 1.0 / period
     duty = width / period
 
-    dwf.FDwfAnalogOutNodeEnableSet(hdwf, c_int(channel), AnalogOutNodeCarrier, c_int(1))
-    dwf.FDwfAnalogOutIdleSet(hdwf, c_int(channel), DwfAnalogOutIdleOffset)
-    dwf.FDwfAnalogOutNodeFunctionSet(hdwf, c_int(channel), AnalogOutNodeCarrier, funcPulse)
-    dwf.FDwfAnalogOutNodeFrequencySet(hdwf, c_int(channel), AnalogOutNodeCarrier, c_double(frequency))
-    dwf.FDwfAnalogOutNodeAmplitudeSet(hdwf, c_int(channel), AnalogOutNodeCarrier, c_double(amplitude))
-    dwf.FDwfAnalogOutNodeOffsetSet(hdwf, c_int(channel), AnalogOutNodeCarrier, c_double(offset))
-    dwf.FDwfAnalogOutRunSet(hdwf, c_int(channel), c_double(period))
-    dwf.FDwfAnalogOutWaitSet(hdwf, c_int(channel), c_double(0.0))
-    dwf.FDwfAnalogOutRepeatSet(hdwf, c_int(channel), c_int(1))
-    
-    dwf.FDwfAnalogOutConfigure(hdwf, c_int(channel), c_int(0))
+    awg.node_enable(channel, AnalogOutNodeCarrier, 1)
+    awg.idle(channel, DwfAnalogOutIdleOffset)
+    awg.node_function(channel, AnalogOutNodeCarrier, funcPulse)
+    awg.node_frequency(channel, AnalogOutNodeCarrier, frequency)
+    awg.node_symmetry(channel, AnalogOutNodeCarrier, duty * 100)
+    awg.node_amplitude(channel, AnalogOutNodeCarrier, amplitude)
+    awg.node_offset(channel, AnalogOutNodeCarrier, offset)
+
+    awg.run(channel, period)
+    awg.wait(channel, wait)
+    awg.repeat(channel, count)
+    # runs on start, also after a pulse train left the channel waiting for the PC trigger
+    awg.trigger_source(channel, trigsrcNone)
+
+
+def SetReset_train(period=1e-6, width=5e-7, set_amplitude=1.0, set_offset=-2.0, reset_amplitude=-0.50, reset_offset=0.0, hz=10e6):
+    # SET and RESET as one on-device train, play it with train.play(session, cycles),
+    # train.release(session) before single pulses again
+    return compile_sequence([
+        # SET, WG1 applies a pulse
+        Pulse(channel=0, width=width, amplitude=set_amplitude, offset=set_offset, after=period - width),
+        # RESET, pin 0 high while WG2 applies a pulse
+        DioSwitch(mask=0x01, value=0x01),
+        Pulse(channel=1, width=width, amplitude=reset_amplitude, offset=reset_offset, after=period - width),
+        DioSwitch(mask=0x01, value=0x00),
+    ], hz)
 
 
 if __name__ == "__main__":
-    # open the devices
-    dwf, hdwf = open_device()
+    # open the device once and reuse it for every cycle
+    with DwfSession() as session:
+        # set the wg1 offset to -2.0V
+        session.analog_out.node_offset(0, AnalogOutNodeCarrier, -2.0)
 
-    # set the wg1 offset to -2.0V
-    dwf.FDwfAnalogOutNodeOffsetSet(hdwf, c_int(0), AnalogOutNodeCarrier, c_double(-2.0))
+        # READ
+        # set pin 1 to high
+        DigitalIO_Switch(session, mask=0x02, value=0x02)
 
-    # READ
-    # set pin 1 to high
-    DigitalIO_Switch(dwf, hdwf, mask=0x02, value=0x02)
+        # SMUA applies the read voltage
 
-    # SMUA applies the read voltage
 
+        # set pin 1 to low
+        DigitalIO_Switch(session, mask=0x02, value=0x00)
 
-    # set pin 1 to low
-    DigitalIO_Switch(dwf, hdwf, mask=0x02, value=0x00)
 
+        # SET
+        # set AnalogIO to positive 5.0V
+        AnalogIO_On(session, isPositive=True, positive_v=5.0)
 
-    # SET
-    # set AnalogIO to positive 5.0V
-    AnalogIO_On(dwf, hdwf, isPositive=True, positive_v=5.0)
+        # WG1 applies a pulse
+        AnalogOut_pulse(session, channel=0, period=1e-6, width=5e-7, amplitude=1.0, offset=-2.0, count=1)
 
-    # WG1 applies a pulse
-    AnalogOut_pulse(dwf, hdwf, channel=0, period=1e-6, width=5e-7, amplitude=1.0, offset=-2.0, count=1)
-    
 
-    # RESET
-    # set pin 0 to high
-    DigitalIO_Switch(dwf, hdwf, mask=0x01, value=0x01)
+        # RESET
+        # set pin 0 to high
+        DigitalIO_Switch(session, mask=0x01, value=0x01)
 
-    # Wg2 applies a pulse
-    AnalogOut_pulse(dwf, hdwf, channel=1, period=1e-6, width=5e-7, amplitude=-0.50, offset=0, count=1)
+        # Wg2 applies a pulse
+        AnalogOut_pulse(session, channel=1, period=1e-6, width=5e-7, amplitude=-0.50, offset=0, count=1)
 
-    # set pin 0 to low
-    DigitalIO_Switch(dwf, hdwf, mask=0x01, value=0x00)
\ No newline at end of file
+        # set pin 0 to low
+        DigitalIO_Switch(session, mask=0x01, value=0x00)
+
+    print("Device closed")
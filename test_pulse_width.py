@@ -1,5 +1,6 @@
 from ctypes import *
 from dwfconstants import *
+from dwfbuffers import AnalogInBuffer
 import matplotlib.pyplot as plt
 import numpy as np
 import time
@@ -64,12 +65,11 @@ while True:
     time.sleep(0.01)
 
 # データ取得
-rgBuffer = (c_double * nSamples)()
-dwf.FDwfAnalogInStatusData(hdwf, c_int(0), rgBuffer, len(rgBuffer))
+rgBuffer = AnalogInBuffer(nSamples, channels=(0,))
+v = rgBuffer.status_data(dwf, hdwf)[0]
 
 # 時間軸生成と表示
 t = np.linspace(0, nSamples / hzAcq.value, nSamples)
-v = np.fromiter(rgBuffer, dtype=np.float64)
 
 plt.plot(t * 1e6, v)  # μs単位で表示
 plt.xlabel("Time [μs]")
@@ -0,0 +1,120 @@
+from dwfconstants import *
+from dwfsim import SimDwf
+from dwfsession import DwfSession
+import numpy as np
+import pytest
+
+# the settings AnalogOut_pulse_apply writes for one channel
+PULSE_SETTERS = 11
+
+
+@pytest.fixture
+def pulse(script):
+    sim = SimDwf()
+    with DwfSession(dwf=sim) as session:
+        def apply(channel=0, amplitude=1.0, offset=-2.0):
+            script.AnalogOut_pulse_apply(session, channel, 1e-6, 5e-7, amplitude, offset, 1, 0.0)
+        yield sim, session, apply
+
+
+def setters(sim):
+    return sum(count for name, count in sim.calls.items()
+               if name.startswith("FDwfAnalogOut") and name.endswith("Set"))
+
+
+def test_second_pass_sends_nothing(pulse):
+    sim, session, apply = pulse
+    cache = session.analog_out
+    apply()
+    session.analog_out.configure(0, 0)
+    assert sum(cache.sent.values()) == PULSE_SETTERS + 1
+    assert setters(sim) == PULSE_SETTERS
+    assert sim.calls["FDwfAnalogOutConfigure"] == 1
+
+    apply()
+    session.analog_out.configure(0, 0)
+    assert sum(cache.sent.values()) == PULSE_SETTERS + 1
+    assert sum(cache.skipped.values()) == PULSE_SETTERS + 1
+    assert setters(sim) == PULSE_SETTERS
+    assert sim.calls["FDwfAnalogOutConfigure"] == 1
+
+
+def test_changed_value_reaches_device(pulse):
+    sim, session, apply = pulse
+    apply()
+    session.analog_out.configure(0, 0)
+    apply(amplitude=0.5)
+    session.analog_out.configure(0, 0)
+    assert sim.calls["FDwfAnalogOutNodeAmplitudeSet"] == 2
+    assert sim.calls["FDwfAnalogOutNodeOffsetSet"] == 1
+    assert setters(sim) == PULSE_SETTERS + 1
+    assert sim.calls["FDwfAnalogOutConfigure"] == 2
+    assert sim.devices[0].analog_out[0]["amplitude"] == 0.5
+
+
+def test_dirty_channel_reaches_device(pulse):
+    sim, session, apply = pulse
+    cache = session.analog_out
+    apply()
+    # written but not yet applied, the next configure must not be skipped
+    apply(channel=1)
+    cache.configure(0, 0)
+    cache.configure(1, 0)
+    assert sim.calls["FDwfAnalogOutConfigure"] == 2
+    cache.configure(1, 0)
+    assert sim.calls["FDwfAnalogOutConfigure"] == 2
+    assert cache.skipped["FDwfAnalogOutConfigure"] == 1
+    # starting always goes to the device
+    cache.configure(1, 1)
+    assert sim.calls["FDwfAnalogOutConfigure"] == 3
+
+
+def test_invalidate_sends_again(pulse):
+    sim, session, apply = pulse
+    apply()
+    session.analog_out.invalidate(0)
+    apply()
+    assert setters(sim) == 2 * PULSE_SETTERS
+
+
+def test_upload_by_content(session, sim):
+    awg = session.analog_out
+    device = sim.devices[0]
+    samples = np.sin(np.linspace(0, 2 * np.pi, 1 << 20, endpoint=False))
+    awg.node_data(0, AnalogOutNodeCarrier, samples)
+    assert np.array_equal(device.analog_out[0]["data"], samples)
+    assert sim.calls["FDwfAnalogOutNodeDataSet"] == 1
+
+    # the same samples in another array are not sent again, rounded ones are
+    rounded = samples.astype(np.float32)
+    awg.node_data(0, AnalogOutNodeCarrier, samples.copy())
+    awg.node_data(0, AnalogOutNodeCarrier, rounded)
+    assert sim.calls["FDwfAnalogOutNodeDataSet"] == 2
+    assert np.array_equal(device.analog_out[0]["data"], rounded)
+    awg.node_data(0, AnalogOutNodeCarrier, rounded.astype(np.float64))
+    assert sim.calls["FDwfAnalogOutNodeDataSet"] == 2
+    assert awg.skipped["FDwfAnalogOutNodeDataSet"] == 2
+
+    changed = samples.copy()
+    changed[12345] = 0.0
+    awg.node_data(0, AnalogOutNodeCarrier, changed)
+    assert device.analog_out[0]["data"][12345] == 0.0
+    # each channel holds its own waveform
+    awg.node_data(1, AnalogOutNodeCarrier, changed)
+    assert sim.calls["FDwfAnalogOutNodeDataSet"] == 4
+
+
+def test_upload_converts_input(session, sim):
+    awg = session.analog_out
+    device = sim.devices[0]
+    samples = np.linspace(-1, 1, 1001)
+    # a strided view is made contiguous, lists and integers become float64
+    awg.data(0, samples[::2])
+    assert np.array_equal(device.analog_out[0]["data"], samples[::2])
+    awg.data(1, [0, 1, -1, 1])
+    assert device.analog_out[1]["data"].tolist() == [0.0, 1.0, -1.0, 1.0]
+    awg.data(1, np.array([0, 1, -1, 1], dtype=np.int8))
+    assert awg.skipped["FDwfAnalogOutDataSet"] == 1
+    # the length is part of the content
+    awg.data(1, [0, 1, -1, 1, 0])
+    assert sim.calls["FDwfAnalogOutNodeDataSet"] == 3
@@ -0,0 +1,28 @@
+from burst import Burst
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.int16])
+def test_burst_captures(session, dtype):
+    burst = Burst(session, captures=20, samples=1024, hz=100e6, dtype=dtype, settle=0).configure()
+    data = burst.run()
+    assert data.shape == (20, 1, 1024)
+    assert data.dtype == dtype
+    assert burst.count == 20
+    # every capture starts at the rising zero crossing of the test signal
+    assert np.all(data[:, 0, 512] > data[:, 0, 0])
+
+
+def test_trigger_times_keep_tick_resolution(session, sim):
+    # UTC seconds as a real device reports them, lost in a float64 of seconds
+    assert sim.devices[0].utc > 1e9
+    burst = Burst(session, captures=20, samples=1024, hz=100e6, settle=0).configure()
+    burst.run()
+    result = burst.summary()
+    # triggers follow the 1 kHz test signal, each capture takes 10.24 us
+    assert result["trigger_dt_us"]["min"] == pytest.approx(1000.0, abs=0.01)
+    assert result["trigger_dt_us"]["max"] == pytest.approx(1000.0, abs=0.01)
+    assert result["gap_us"]["min"] == pytest.approx(989.76, abs=0.01)
+    assert result["gap_us"]["max"] == pytest.approx(989.76, abs=0.01)
+    assert burst.trigger_times()[-1] == pytest.approx(0.019, abs=1e-8)
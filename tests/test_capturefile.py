@@ -0,0 +1,88 @@
+from capturefile import CaptureWriter, CaptureReader, write_recorder
+from recorder import AnalogRecorder
+import numpy as np
+import pytest
+import wave
+
+
+def write_chunks(path, dtype=np.int16, **args):
+    rng = np.random.default_rng(0)
+    chunks = [rng.integers(-30000, 30000, (2, n)).astype(dtype) for n in (1000, 500, 2000)]
+    with CaptureWriter(path, 1e6, channels=(0, 1), dtype=dtype, **args) as writer:
+        writer.append(chunks[0])
+        writer.append(chunks[1], lost=300)
+        writer.append(chunks[2], lost=7, corrupted=2)
+    return chunks
+
+
+def test_round_trip_keeps_gaps(tmp_path):
+    path = str(tmp_path / "capture.dwfcap")
+    chunks = write_chunks(path, volts_range=[5.0, 10.0], volts_offset=[0.0, 1.0], label="dut 3")
+    reader = CaptureReader(path)
+    assert reader.header["label"] == "dut 3"
+    assert reader.channels == (0, 1)
+    assert len(reader) == 3500
+    # a gap of lost samples starts at the stream position of its chunk
+    assert [chunk[1] for chunk in reader.chunks] == [0, 1000, 1800]
+    assert reader.markers == [(1000, 300, 0), (1800, 7, 2)]
+    assert np.array_equal(reader.read(), np.concatenate(chunks, axis=1))
+    assert np.array_equal(reader.read(900, 1600), np.concatenate(chunks, axis=1)[:, 900:1600])
+
+    volts = reader.volts()
+    assert volts[0] == pytest.approx(np.concatenate(chunks, axis=1)[0] * 5.0 / 65536)
+    assert volts[1] == pytest.approx(np.concatenate(chunks, axis=1)[1] * 10.0 / 65536 + 1.0)
+
+
+def test_csv_and_wav(tmp_path):
+    path = str(tmp_path / "capture.dwfcap")
+    chunks = write_chunks(path)
+    reader = CaptureReader(path)
+    data = np.concatenate(chunks, axis=1)
+
+    reader.to_csv(str(tmp_path / "capture.csv"), block=700)
+    csv = np.loadtxt(str(tmp_path / "capture.csv"), delimiter=",")
+    assert csv.shape == (3500, 2)
+    assert np.allclose(csv.T, reader.volts())
+
+    reader.to_wav(str(tmp_path / "capture.wav"), block=700)
+    with wave.open(str(tmp_path / "capture.wav"), "rb") as w:
+        assert w.getnchannels() == 2
+        assert w.getframerate() == 1000000
+        frames = np.frombuffer(w.readframes(w.getnframes()), dtype="<i2").reshape(-1, 2)
+    assert np.array_equal(frames.T, data)
+
+
+def test_float_wav_scales_to_peak(tmp_path):
+    path = str(tmp_path / "capture.dwfcap")
+    with CaptureWriter(path, 48000) as writer:
+        writer.append(np.array([0.0, 0.5, -0.25]))
+        writer.append(np.array([0.1]), lost=10)
+    reader = CaptureReader(path)
+    reader.to_wav(str(tmp_path / "capture.wav"))
+    with wave.open(str(tmp_path / "capture.wav"), "rb") as w:
+        frames = np.frombuffer(w.readframes(w.getnframes()), dtype="<i2")
+    assert frames.tolist() == [0, 32767, -16384, 6553]
+
+
+def test_partial_chunk_is_ignored(tmp_path):
+    path = str(tmp_path / "capture.dwfcap")
+    write_chunks(path)
+    with open(path, "rb+") as f:
+        f.truncate(f.seek(0, 2) - 100)
+    reader = CaptureReader(path)
+    assert len(reader) == 1500
+    assert reader.markers == [(1000, 300, 0)]
+
+
+def test_write_recorder_marks_device_loss(session, sim, tmp_path):
+    sim.devices[0].inject("analog_in", lost=1000)
+    recorder = AnalogRecorder(session, hz=1e6, seconds=0.05)
+    path = str(tmp_path / "record.dwfcap")
+    with recorder:
+        write_recorder(recorder, path, dut="R1")
+    reader = CaptureReader(path)
+    assert recorder.lost > 0
+    assert len(reader) == recorder.samples - recorder.ring.overwritten
+    assert sum(lost for _, lost, _ in reader.markers) == recorder.lost + recorder.ring.overwritten
+    _, position, count, lost, _ = reader.chunks[-1]
+    assert position + lost + count == recorder.samples + recorder.lost
@@ -0,0 +1,64 @@
+from compressed import RunDecoder, CompressedStream, edges_from_samples, expand, iter_samples, line_edges, value_at
+import numpy as np
+
+MASK = 0xF00
+
+
+def stream_edges(session, reads):
+    stream = CompressedStream(session, MASK, hz=1e6, words=4096).start()
+    edges = np.concatenate([stream.read() for _ in range(reads)])
+    stream.stop()
+    return stream, edges
+
+
+def test_compressed_stream_round_trip(session, sim):
+    stream, edges = stream_edges(session, 300)
+    stop = stream.decoder.position
+    samples = sim.devices[0].digital_samples(0, stop).astype(np.uint32)
+    assert stop > 20000
+    assert stream.lost == 0
+    # only the sensible lines start a new edge, DIO 8 toggles every 256 samples
+    assert len(edges) == len(edges_from_samples(samples, MASK))
+    assert np.array_equal(edges, edges_from_samples(samples, MASK))
+    assert np.array_equal(expand(edges, stop) & MASK, samples & MASK)
+    assert np.array_equal(np.concatenate(list(iter_samples(edges, stop, block=1000))), expand(edges, stop))
+    # two words per run instead of one per sample
+    assert sim.calls["FDwfDigitalInStatusCompressed"] <= 300
+    assert 2 * len(edges) < stop / 100
+
+
+def test_run_decoder_chunks():
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 16, 1000).astype(np.uint32)
+    lengths = rng.integers(0, 50, 1000).astype(np.uint32)
+    words = np.empty(2000, dtype=np.uint32)
+    words[0::2] = values
+    words[1::2] = lengths
+    whole = RunDecoder(0x3).decode(words)
+
+    decoder = RunDecoder(0x3)
+    cuts = 2 * np.sort(rng.choice(np.arange(1, 1000), 30, replace=False))
+    chunked = np.concatenate([decoder.decode(part) for part in np.split(words, cuts)])
+    assert np.array_equal(chunked, whole)
+
+    stop = int((lengths.astype(np.int64) + 1).sum())
+    samples = np.repeat(values, lengths.astype(np.int64) + 1)
+    assert decoder.position == stop
+    assert np.array_equal(expand(whole, stop) & 0x3, samples & 0x3)
+    assert np.array_equal(value_at(whole, np.arange(stop)) & 0x3, samples & 0x3)
+
+    times, levels = line_edges(whole, 1)
+    bit = (samples >> 1) & 1
+    assert times.tolist() == [0] + (np.flatnonzero(np.diff(bit)) + 1).tolist()
+    assert levels.tolist() == bit[times].tolist()
+
+
+def test_edges_from_small_samples():
+    samples = np.array([0, 0, 1, 1, 0x81, 0x80, 0xFF], dtype=np.uint8)
+    for dtype in (np.uint8, np.uint16):
+        edges = edges_from_samples(samples.astype(dtype))
+        assert edges["time"].tolist() == [0, 2, 4, 5, 6]
+        assert edges["value"].tolist() == [0, 1, 0x81, 0x80, 0xFF]
+        # DIO 9 does not exist in 8 bit samples, DIO 7 does
+        assert edges_from_samples(samples.astype(dtype), mask=1 << 9)["time"].tolist() == [0]
+        assert edges_from_samples(samples.astype(dtype), mask=1 << 7, start=10)["time"].tolist() == [10, 14]
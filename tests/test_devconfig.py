@@ -0,0 +1,86 @@
+from dwfsim import SimDwf, SimDevice, AD2_CONFIGS
+from devconfig import ConfigCache, Workload, choose, open_for, read_configs, select_config
+import pytest
+
+SERIALS = ["SN:210321A00001", "SN:210321A00002"]
+
+
+@pytest.fixture
+def infos():
+    return read_configs(SimDwf(), 0)
+
+
+def test_read_configs(infos):
+    assert [info["analog_in_buffer"] for info in infos] == [config["analog_in_buffer"] for config in AD2_CONFIGS]
+    assert [info["text"] for info in infos] == [config["text"] for config in AD2_CONFIGS]
+    assert all(info["analog_in_channels"] == 2 for info in infos)
+
+
+@pytest.mark.parametrize("workload,config,fits", [
+    # a deep scope capture takes the Scope configuration, deeper still it is streamed
+    (Workload(analog_in=16384, analog_in_channels=2), 1, {"analog_in": True}),
+    (Workload(analog_in=1 << 20, analog_in_channels=2), 1, {"analog_in": False}),
+    (Workload(analog_out=10000, analog_out_channels=1), 2, {"analog_out": True}),
+    (Workload(digital_in=16384, digital_out=16384), 3, {"digital_in": True, "digital_out": True}),
+    # both fit the default and the Pattern configuration, the first is kept
+    (Workload(analog_in=8192, analog_out=4096), 0, {"analog_in": True, "analog_out": True}),
+])
+def test_select_config(infos, workload, config, fits):
+    selection = select_config(infos, workload)
+    assert selection.config == config
+    assert selection.info is infos[config]
+    assert selection.fits == fits
+
+
+def test_select_config_needs_channels(infos):
+    with pytest.raises(RuntimeError, match="channels"):
+        select_config(infos, Workload(analog_in=1024, analog_in_channels=4))
+
+
+def test_open_for_deep_buffer():
+    sim = SimDwf()
+    session, selection = open_for(Workload(analog_in=16384, analog_in_channels=2), dwf=sim, cache=ConfigCache())
+    with session:
+        assert session.config == selection.config == 1
+        assert sim.calls["FDwfDeviceConfigOpen"] == 1
+        assert sim.devices[0].analog_in["buffer"] == 16384
+
+
+def test_cache_skips_enumeration(tmp_path):
+    sim = SimDwf(devices=[SimDevice(serial) for serial in SERIALS])
+    path = str(tmp_path / "configs.json")
+    cache = ConfigCache(path)
+    workload = Workload(analog_in=16384)
+    assert choose(workload, "210321A00002", sim, cache) == (SERIALS[1], select_config(read_configs(sim, 1), workload))
+    enumerated = sim.calls["FDwfEnumConfig"], sim.calls["FDwfEnumConfigInfo"]
+    # the same serial again, also by its full name, is served from memory
+    choose(workload, "210321A00002", sim, cache)
+    choose(workload, SERIALS[1], sim, cache)
+    assert (sim.calls["FDwfEnumConfig"], sim.calls["FDwfEnumConfigInfo"]) == enumerated
+    assert (cache.hits, cache.misses) == (2, 1)
+    # another device is enumerated once
+    choose(workload, "210321A00001", sim, cache)
+    assert sim.calls["FDwfEnumConfig"] == enumerated[0] + 1
+
+    # a new cache reads the file
+    reloaded = ConfigCache(path)
+    choose(workload, "210321A00002", sim, reloaded)
+    assert sim.calls["FDwfEnumConfig"] == enumerated[0] + 1
+    assert (reloaded.hits, reloaded.misses) == (1, 0)
+
+
+def test_cache_dropped_on_new_version(tmp_path):
+    sim = SimDwf()
+    path = str(tmp_path / "configs.json")
+    ConfigCache(path).get(sim, SERIALS[0], 0)
+    assert sim.calls["FDwfEnumConfig"] == 1
+
+    def FDwfGetVersion(version):
+        version.value = b"3.23.4 sim"
+        return 1
+    sim.FDwfGetVersion = FDwfGetVersion
+    cache = ConfigCache(path)
+    cache.get(sim, SERIALS[0], 0)
+    cache.get(sim, SERIALS[0], 0)
+    assert sim.calls["FDwfEnumConfig"] == 2
+    assert (cache.hits, cache.misses) == (1, 1)
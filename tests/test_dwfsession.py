@@ -0,0 +1,74 @@
+from dwfsim import SimDwf, SimDevice
+from dwfsession import DwfSession
+import pytest
+
+
+def test_session_opens_once():
+    sim = SimDwf()
+    session = DwfSession(dwf=sim)
+    assert not session.is_open
+    session.open()
+    handle = session.hdwf.value
+    session.open()
+    assert session.hdwf.value == handle
+    assert sim.calls["FDwfDeviceOpen"] == 1
+    assert session.serial == sim.devices[0].serial
+    session.close()
+    assert not session.is_open
+    assert not sim.handles
+
+
+def test_session_reused_across_helpers(script):
+    sim = SimDwf()
+    with DwfSession(dwf=sim) as session:
+        handle = session.hdwf.value
+        for cycle in range(100):
+            script.DigitalIO_Switch(session, mask=0x02, value=0x02)
+            script.AnalogIO_On(session, isPositive=True, positive_v=5.0)
+            script.AnalogOut_pulse(session, channel=0, period=1e-6, width=5e-7, amplitude=1.0, offset=-2.0)
+            script.DigitalIO_Switch(session, mask=0x02, value=0x00)
+            script.AnalogIO_Off(session)
+        assert session.hdwf.value == handle
+    assert sim.calls["FDwfDeviceOpen"] == 1
+    assert sim.calls["FDwfDeviceClose"] == 1
+    assert sim.calls["FDwfEnum"] == 1
+    assert sim.calls["FDwfDigitalIOConfigure"] == 200
+
+
+def test_reopen_gets_new_handle():
+    sim = SimDwf(devices=[SimDevice("SN:210321A00001"), SimDevice("SN:210321A00002")])
+    session = DwfSession(serial="210321A00002", dwf=sim).open()
+    handle = session.hdwf.value
+    cache = session.analog_out
+    assert sim.handles[handle] is sim.devices[1]
+
+    session.reopen()
+    assert session.hdwf.value != handle
+    assert handle not in sim.handles
+    assert sim.handles[session.hdwf.value] is sim.devices[1]
+    # shadow registers belong to the old handle
+    assert session.analog_out is not cache
+
+    session.reopen("SN:210321A00001")
+    assert sim.handles[session.hdwf.value] is sim.devices[0]
+    assert len(sim.handles) == 1
+    session.close()
+
+
+def test_context_manager_closes_on_exception():
+    sim = SimDwf()
+    with pytest.raises(ZeroDivisionError):
+        with DwfSession(dwf=sim) as session:
+            assert session.is_open
+            1 / 0
+    assert not session.is_open
+    assert not sim.handles
+    assert sim.calls["FDwfDeviceClose"] == 1
+    assert sim.devices[0].hdwf == 0
+
+
+def test_missing_serial_raises():
+    sim = SimDwf()
+    with pytest.raises(RuntimeError):
+        DwfSession(serial="210321A99999", dwf=sim).open()
+    assert sim.calls["FDwfDeviceOpen"] == 0
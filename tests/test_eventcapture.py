@@ -0,0 +1,70 @@
+from eventcapture import EventStore
+import numpy as np
+import pytest
+
+
+def fill(store, events):
+    rng = np.random.default_rng(0)
+    rows = []
+    for i in range(events):
+        # UTC ticks at 100 MHz, beyond what a float64 of seconds resolves
+        row = (1790000000 * 100000000 + 137 * i, 0.5 + i * 1e-3, 1e-6 * (i % 7),
+               rng.integers(0, 1 << 16, store.window).astype(store.columns["digital"].dtype),
+               rng.normal(size=store.analog_shape) if store.analog_shape is not None else None)
+        store.append(*row)
+        rows.append(row)
+    return rows
+
+
+def check(store, rows):
+    assert len(store) == len(rows)
+    assert store["ticks"].tolist() == [row[0] for row in rows]
+    assert store["host"].tolist() == [row[1] for row in rows]
+    assert store["dead"].tolist() == [row[2] for row in rows]
+    assert np.array_equal(store["digital"], np.array([row[3] for row in rows]).reshape(-1, store.window))
+    if store.analog_shape is not None:
+        assert np.array_equal(store["analog"], np.array([row[4] for row in rows]))
+
+
+@pytest.mark.parametrize("analog_shape", [None, (2, 16)])
+def test_store_grows(analog_shape):
+    store = EventStore(64, np.uint16, analog_shape, capacity=4)
+    rows = fill(store, 37)
+    # 4 doubled four times
+    assert len(store.columns["ticks"]) == 64
+    assert all(len(column) == 64 for column in store.columns.values())
+    assert store.columns["digital"].shape == (64, 64)
+    assert store.columns["digital"].dtype == np.uint16
+    check(store, rows)
+    store.ticksec = 100000000
+    assert store.seconds() == pytest.approx(np.arange(37) * 1.37e-6)
+
+
+@pytest.mark.parametrize("analog_shape", [None, (2, 16)])
+def test_save_load(tmp_path, analog_shape):
+    store = EventStore(32, np.uint8, analog_shape, capacity=8)
+    store.ticksec = 100000000
+    rows = fill(store, 11)
+    path = str(tmp_path / "events.npz")
+    store.save(path)
+
+    loaded = EventStore.load(path)
+    assert loaded.window == 32
+    assert loaded.analog_shape == analog_shape
+    assert loaded.ticksec == 100000000
+    assert loaded.columns["digital"].dtype == np.uint8
+    assert loaded["ticks"].dtype == np.int64
+    check(loaded, rows)
+    assert loaded.seconds().tolist() == store.seconds().tolist()
+    # the loaded store keeps growing
+    rows += fill(loaded, 3)
+    check(loaded, rows)
+
+
+def test_save_load_empty(tmp_path):
+    path = str(tmp_path / "events.npz")
+    EventStore(16).save(path)
+    loaded = EventStore.load(path)
+    assert len(loaded) == 0
+    assert loaded.window == 16
+    assert len(loaded.seconds()) == 0
@@ -0,0 +1,70 @@
+from dwfsim import SimDwf, SimDevice
+from dwfsession import DwfSession
+from impedance import ImpedanceSweep, sweep_devices
+import numpy as np
+import pytest
+
+# the simulated DUT is 100 Ohm, 1 mH and 1 nF in series
+RESONANCE = 1 / (2 * np.pi * np.sqrt(1e-3 * 1e-9))
+FAST = dict(start=1e3, stop=1e6, periods=1, start_settle=0.0, poll_interval=0.0)
+
+
+@pytest.fixture
+def realtime():
+    # captures take periods / hz of real time, the sweep polls against time.perf_counter
+    sim = SimDwf()
+    with DwfSession(dwf=sim) as session:
+        yield sim, session
+
+
+def test_sweep_refines_around_resonance(realtime):
+    sim, session = realtime
+    sweep = ImpedanceSweep(session, **FAST)
+    result = sweep.run()
+    hz = result["hz"]
+    assert np.all(np.diff(hz) > 0)
+    assert 21 < len(result) <= 151
+    # every point measured once
+    assert sweep.captures == len(result)
+
+    z = sim.devices[0].dut(hz)
+    assert result["impedance"] == pytest.approx(np.abs(z))
+    assert result["resistance"] == pytest.approx(np.full(len(hz), 100.0))
+    assert result["reactance"] == pytest.approx(z.imag)
+    # the resonance gets the extra points, the flat capacitive start does not
+    near = np.count_nonzero((hz > RESONANCE / 2) & (hz < RESONANCE * 2))
+    low = np.count_nonzero((hz > 1e3) & (hz < 4e3))
+    assert near > 2 * low
+
+
+def test_point_budget(realtime):
+    sim, session = realtime
+    result = ImpedanceSweep(session, max_steps=30, **FAST).run()
+    assert len(result) == 30
+    assert sim.calls["FDwfAnalogImpedanceFrequencySet"] == 30
+
+
+def test_device_compensation_kept(realtime):
+    sim, session = realtime
+    session.dwf.FDwfAnalogImpedanceCompSet(session.hdwf, 1e6, 0.0, 0.1, 0.0)
+    sweep = ImpedanceSweep(session, steps=3, max_steps=3, **FAST)
+    sweep.run()
+    assert sweep.compensation == (1e6, 0.0, 0.1, 0.0)
+    assert sim.devices[0].impedance["compensation"] == (1e6, 0.0, 0.1, 0.0)
+
+
+def test_sweep_devices():
+    sim = SimDwf(devices=[SimDevice("SN:210321A00001"), SimDevice("SN:210321A00002")])
+    sim.devices[1].dut = lambda hz: 50.0 + 0j * hz
+    sessions = [DwfSession(serial=device.serial, dwf=sim).open() for device in sim.devices]
+    results = sweep_devices(sessions, steps=5, **FAST)
+    assert sorted(results) == ["SN:210321A00001", "SN:210321A00002"]
+    # a flat response needs no refinement
+    assert len(results["SN:210321A00002"]) == 5
+    assert results["SN:210321A00002"]["impedance"] == pytest.approx(np.full(5, 50.0))
+
+    sessions[1].serial = sessions[0].serial
+    with pytest.raises(ValueError):
+        sweep_devices(sessions, **FAST)
+    for session in sessions:
+        session.close()
@@ -0,0 +1,56 @@
+from dwfsim import SimDwf, SimDevice, ManualClock
+from multisync import SyncGroup
+import pytest
+
+SERIALS = ["SN:210321A00001", "SN:210321A00002", "SN:210321A00003"]
+
+
+@pytest.fixture
+def devices():
+    # every device status adds 100 us, a capture of 1024 samples at 1 MHz takes about 10 statuses
+    sim = SimDwf(devices=[SimDevice(serial) for serial in SERIALS], latency=1e-4, clock=ManualClock())
+    events = []
+    configure, trigger = sim.FDwfAnalogInConfigure, sim.FDwfDeviceTriggerPC
+
+    def FDwfAnalogInConfigure(hdwf, fReconfigure, fStart):
+        if fStart.value:
+            events.append(("arm", sim.handles[hdwf.value].serial))
+        return configure(hdwf, fReconfigure, fStart)
+
+    def FDwfDeviceTriggerPC(hdwf):
+        events.append(("trigger", sim.handles[hdwf.value].serial))
+        return trigger(hdwf)
+
+    sim.FDwfAnalogInConfigure = FDwfAnalogInConfigure
+    sim.FDwfDeviceTriggerPC = FDwfDeviceTriggerPC
+    return sim, events
+
+
+@pytest.mark.parametrize("master", [0, 1, 2])
+def test_followers_armed_before_one_trigger(devices, master):
+    sim, events = devices
+    with SyncGroup(hz=1e6, samples=1024, master=master, settle=0, dwf=sim) as group:
+        assert group.serials == SERIALS
+        followers = [serial for i, serial in enumerate(SERIALS) if i != master]
+        capture = next(group.run())
+    # followers in order, the master last, then the PC trigger on the master only
+    assert events == [("arm", serial) for serial in followers] + [("arm", SERIALS[master]),
+                                                                   ("trigger", SERIALS[master])]
+    assert sim.calls["FDwfDeviceTriggerPC"] == 1
+    assert sim.calls["FDwfDeviceTriggerSet"] == 1
+    assert all(device.analog_in["done"] for device in sim.devices)
+    # T1 carried the one trigger to every device at the same time
+    assert len({device.analog_in["trigger_time"] for device in sim.devices}) == 1
+    assert capture.serials == SERIALS
+    assert capture.data.shape == (3, 2, 1024)
+    assert [info["master"] for info in capture.skew.values()] == [i == master for i in range(3)]
+    assert all(info["armed"] < 0 < info["done"] for info in capture.skew.values())
+
+
+def test_each_capture_triggers_once(devices):
+    sim, events = devices
+    with SyncGroup(hz=1e6, samples=1024, settle=0, dwf=sim) as group:
+        captures = list(group.run(captures=3))
+    assert len(captures) == 3
+    assert sim.calls["FDwfDeviceTriggerPC"] == 3
+    assert [event for event, serial in events] == (["arm"] * 3 + ["trigger"]) * 3
@@ -0,0 +1,108 @@
+from dwfconstants import *
+from playstream import AnalogPlayer, AnalogStreamer, ArraySource, GeneratorSource, WavSource
+import numpy as np
+import pytest
+import struct
+import time
+import wave
+
+
+def write_wav(path, frames, width, rate=48000):
+    with wave.open(path, "wb") as w:
+        w.setnchannels(frames.shape[1])
+        w.setsampwidth(width)
+        w.setframerate(rate)
+        w.writeframes(np.ascontiguousarray(frames).tobytes())
+
+
+def test_wav_pcm(tmp_path):
+    path = str(tmp_path / "stereo.wav")
+    frames = np.array([[0, 16384], [-32768, 32767], [100, -100]], dtype="<i2")
+    write_wav(path, frames, 2)
+    source = WavSource(path, channel=1)
+    assert source.hz == 48000
+    assert len(source) == 3
+    assert source.block(0, 3).tolist() == [0.5, 32767 / 32768, -100 / 32768]
+    assert source.block(2, 10).tolist() == [-100 / 32768]
+
+    write_wav(path, np.array([[0], [128], [255]], dtype=np.uint8), 1)
+    assert WavSource(path).block(0, 3).tolist() == [-1.0, 0.0, 127 / 128]
+
+
+def test_wav_unsupported_width(tmp_path):
+    path = str(tmp_path / "24bit.wav")
+    write_wav(path, np.zeros((4, 3), dtype=np.uint8), 3)
+    with pytest.raises(ValueError, match="8/16/32"):
+        WavSource(path)
+    with open(path, "wb") as f:
+        f.write(struct.pack("<4sI4s", b"RIFF", 4, b"AVI "))
+    with pytest.raises(ValueError):
+        WavSource(path)
+
+
+def test_player_plays_source(session, sim):
+    samples = np.sin(np.arange(100000) / 10)
+    with AnalogPlayer(session, ArraySource(samples, hz=1e6), amplitude=2.0, offset=0.5, poll_interval=0) as player:
+        assert player.wait(10)
+    assert player.position == 100000
+    assert player.lost == 0
+    awg = sim.devices[0].analog_out[0]
+    assert awg["func"] == funcPlay.value
+    assert awg["run"] == pytest.approx(0.1)
+    assert (awg["hz"], awg["amplitude"], awg["offset"]) == (1e6, 2.0, 0.5)
+
+
+def test_player_reports_faults_and_resets_cache(session, sim):
+    awg = session.analog_out
+    awg.node_amplitude(0, AnalogOutNodeCarrier, 2.0)
+    sim.devices[0].inject("analog_out", lost=7, corrupted=3)
+    with AnalogPlayer(session, ArraySource(np.zeros(20000), hz=1e6), amplitude=2.0, poll_interval=0) as player:
+        assert player.wait(10)
+    assert (player.lost, player.corrupted) == (7, 3)
+    # the player wrote the amplitude behind the shadow registers
+    awg.node_amplitude(0, AnalogOutNodeCarrier, 2.0)
+    assert awg.sent["FDwfAnalogOutNodeAmplitudeSet"] == 2
+
+    with pytest.raises(ValueError):
+        AnalogPlayer(session, ArraySource(np.zeros(10)))
+
+
+def stream(session, source, **args):
+    streamer = AnalogStreamer(session, source, **args)
+    with streamer:
+        assert streamer.wait(10)
+    return streamer.metrics()
+
+
+def test_array_plays_without_underrun(session):
+    samples = np.sin(np.arange(200000) / 10)
+    result = stream(session, ArraySource(samples), hz=1e6)
+    assert result["written"] == 200000
+    assert result["underruns"] == 0
+    assert result["lost"] == 0
+
+
+def test_source_ending_in_prime_is_not_an_underrun(session):
+    result = stream(session, GeneratorSource([np.zeros(10)]), hz=1e6)
+    assert result["written"] == 10
+    assert result["underruns"] == 0
+    assert result["lost"] == 0
+
+
+def test_slow_source_underruns(session):
+    def slow():
+        for _ in range(10):
+            time.sleep(0.01)
+            yield np.zeros(1000)
+    # a chunk lasts 100 us at 10 MHz, the polls while the source sleeps move
+    # the simulated clock further than that
+    result = stream(session, GeneratorSource(slow()), hz=1e7)
+    assert result["written"] == 10000
+    assert result["underruns"] > 0
+    assert result["lost"] > 0
+
+
+def test_injected_faults_are_reported(session, sim):
+    sim.devices[0].inject("analog_out", lost=0, corrupted=5)
+    result = stream(session, ArraySource(np.zeros(50000)), hz=1e6)
+    assert result["corrupted"] == 5
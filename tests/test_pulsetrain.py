@@ -0,0 +1,82 @@
+from pulsetrain import Pulse, DioSwitch, compile_sequence
+import numpy as np
+import pytest
+
+STEPS = [
+    DioSwitch(mask=0x02, value=0x02, after=1e-6),
+    Pulse(channel=0, width=5e-7, amplitude=1.0, offset=-2.0, after=1e-6),
+    DioSwitch(mask=0x03, value=0x01, after=1e-6),
+    Pulse(channel=1, width=5e-7, amplitude=-0.5, offset=0.0, after=1e-6),
+    DioSwitch(mask=0x01, value=0x00, after=1e-6),
+]
+
+
+def volts(train, channel):
+    samples, amplitude, offset = train.analog[channel]
+    return samples * amplitude + offset
+
+
+def test_compile_timeline():
+    train = compile_sequence(STEPS, hz=10e6)
+    # 10 + 5 + 10 + 10 + 5 + 10 + 10 samples
+    assert len(train) == 60
+    assert train.duration == pytest.approx(6e-6)
+
+    ch0 = volts(train, 0)
+    assert np.allclose(ch0[:10], -2.0)
+    assert np.allclose(ch0[10:15], -1.0)
+    assert np.allclose(ch0[15:], -2.0)
+    ch1 = volts(train, 1)
+    assert np.allclose(ch1[:35], 0.0)
+    assert np.allclose(ch1[35:40], -0.5)
+    assert np.allclose(ch1[40:], 0.0)
+    # normalized for the custom waveform
+    assert np.abs(train.analog[0][0]).max() == pytest.approx(1.0)
+
+    assert sorted(train.digital) == [0, 1]
+    assert train.digital[1].tolist() == [1] * 25 + [0] * 35
+    assert train.digital[0].tolist() == [0] * 25 + [1] * 25 + [0] * 10
+
+
+def test_pulse_shorter_than_a_sample():
+    with pytest.raises(ValueError):
+        compile_sequence([Pulse(0, 1e-8, 1.0)], hz=10e6)
+    with pytest.raises(TypeError):
+        compile_sequence([(0, 1e-6)])
+
+
+def test_load_uploads_once(session, sim):
+    train = compile_sequence(STEPS, hz=10e6)
+    train.play(session, cycles=3)
+    awg = sim.devices[0].analog_out
+    assert np.allclose(awg[0]["data"], train.analog[0][0])
+    assert awg[0]["repeat"] == 3
+    assert awg[1]["amplitude"] == pytest.approx(0.25)
+    assert sim.calls["FDwfAnalogOutNodeDataSet"] == 2
+    assert sim.calls["FDwfDigitalOutDataSet"] == 2
+    assert sim.calls["FDwfDeviceTriggerPC"] == 1
+
+    # the same train again sends no waveform, a single trigger fires it
+    train.play(session, cycles=3)
+    assert sim.calls["FDwfAnalogOutNodeDataSet"] == 2
+    assert sim.calls["FDwfAnalogOutNodeAmplitudeSet"] == 2
+    assert sim.calls["FDwfDeviceTriggerPC"] == 2
+
+
+def test_release_returns_to_single_pulses(session, sim):
+    train = compile_sequence(STEPS, hz=10e6)
+    train.play(session)
+    train.release(session)
+    awg = session.analog_out
+    assert awg.sent["FDwfAnalogOutTriggerSourceSet"] == 4
+    assert sim.calls["FDwfDigitalOutEnableSet"] == 4
+    # a single pulse after the train runs without the PC trigger
+    awg.trigger_source(0, 0)
+    assert awg.skipped["FDwfAnalogOutTriggerSourceSet"] == 1
+
+
+def test_train_longer_than_buffer(session, sim):
+    sim.devices[0].awg_buffer = 16
+    train = compile_sequence(STEPS, hz=10e6)
+    with pytest.raises(ValueError):
+        train.load(session)
@@ -0,0 +1,56 @@
+from quadrature import QuadratureDecoder, encoder_samples
+import numpy as np
+import pytest
+
+
+def steps(count, reverse_at):
+    return np.where(np.arange(count) < reverse_at, 1, -1)
+
+
+@pytest.mark.parametrize("x", [1, 2, 4])
+def test_count_across_chunks(x):
+    rng = np.random.default_rng(x)
+    clean = QuadratureDecoder(x=x)
+    clean.decode(encoder_samples(steps(4000, 3000), 20))
+    # the first state is the reference, four steps are one encoder cycle
+    assert clean.snapshot.count == (2999 - 1000) * x // 4
+    assert clean.snapshot.direction == -1
+    assert clean.glitches == 0
+
+    samples = encoder_samples(steps(4000, 3000), 20, glitches=200, rng=rng)
+    whole = QuadratureDecoder(x=x)
+    whole.decode(samples)
+    assert whole.snapshot == clean.snapshot
+    # a glitch next to a real edge also cuts the state before it short
+    assert whole.glitches >= 200
+
+    chunked = QuadratureDecoder(x=x)
+    for part in np.split(samples, np.sort(rng.choice(np.arange(1, len(samples)), 300, replace=False))):
+        chunked.decode(part)
+    assert chunked.snapshot[:3] == whole.snapshot[:3]
+    assert chunked.snapshot.time == whole.snapshot.time
+    assert chunked.glitches == whole.glitches
+
+
+def test_velocity():
+    # one step every 20 samples at 100 MHz is 1.25 M cycles per second
+    decoder = QuadratureDecoder(cpr=1000)
+    decoder.decode(encoder_samples(np.ones(400, dtype=int), 20))
+    assert decoder.snapshot.velocity == pytest.approx(1.25e6)
+    assert decoder.snapshot.rpm == pytest.approx(75000)
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.uint16])
+def test_small_sample_types(dtype):
+    samples = encoder_samples(steps(1000, 700), 10, pinA=3, pinB=6)
+    for pinA, pinB in ((3, 6), (3, 9)):
+        reference = QuadratureDecoder(pinA, pinB)
+        reference.decode(samples)
+        decoder = QuadratureDecoder(pinA, pinB)
+        for part in np.array_split(samples.astype(dtype), 7):
+            decoder.decode(part)
+        # velocity is measured per chunk, the rest does not depend on chunking
+        assert decoder.snapshot[:4] == reference.snapshot[:4]
+    # B on DIO 9 reads low in 8 bit samples, A alone moves back and forth
+    assert decoder.snapshot.forward > 0
+    assert abs(decoder.snapshot.count) <= 1
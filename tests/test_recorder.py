@@ -0,0 +1,95 @@
+from recorder import RingBuffer, AnalogRecorder
+import numpy as np
+
+
+def test_writable_keeps_last_capacity_samples():
+    ring = RingBuffer(100)
+    regions = ring.writable(250)
+    assert sum(n for _, _, n in regions) == 100
+    assert all(0 <= offset and offset + n <= 100 for offset, _, n in regions)
+    # sample index i of the status lands at position i
+    for offset, index, n in regions:
+        assert offset == index % 100
+    ring.commit(250)
+    assert ring.read().shape == (1, 100)
+    assert ring.overwritten == 150
+
+
+def test_read_discards_samples_under_write():
+    ring = RingBuffer(100)
+    ring.data[0] = np.arange(100)
+    ring.writable(80)
+    ring.commit(80)
+    # a write of 50 is in flight, it wraps over positions 0..29
+    ring.writable(50)
+    chunk = ring.read()
+    assert chunk[0].tolist() == list(range(30, 80))
+    assert ring.overwritten == 30
+
+
+def test_read_counts_overwritten_once():
+    ring = RingBuffer(100)
+    ring.writable(100)
+    ring.commit(100)
+    # a write of 250 is in flight, positions up to 250 are gone
+    ring.writable(250)
+    assert ring.read(max_count=30).shape == (1, 0)
+    assert ring.overwritten == 30
+    ring.commit(250)
+    chunk = ring.read()
+    assert chunk.shape == (1, 100)
+    assert ring.overwritten == 250
+    assert ring.overwritten + 100 == ring.write_position
+
+
+def test_stop_drains_ring(session, sim):
+    chunks = []
+    recorder = AnalogRecorder(session, hz=1e6, callback=chunks.append)
+    read = sim.FDwfAnalogInStatusData2
+
+    def late_read(*args):
+        # stop() lands while a chunk is in transfer, the consumer gets time to quit early
+        if recorder.samples > 50000 and not recorder._stop.is_set():
+            recorder._stop.set()
+            recorder._threads[1].join(0.2)
+        return read(*args)
+
+    sim.FDwfAnalogInStatusData2 = late_read
+    recorder.start()
+    assert recorder.done.wait(10)
+    recorder.stop()
+    received = sum(chunk.shape[1] for chunk in chunks)
+    assert received + recorder.ring.overwritten == recorder.samples
+    assert recorder.ring.read_position == recorder.ring.write_position
+
+
+def test_record_matches_signal(session, sim):
+    recorder = AnalogRecorder(session, hz=1e6, seconds=0.1)
+    with recorder:
+        assert recorder.done.wait(10)
+        data = np.concatenate([chunk for chunk in recorder], axis=1)
+    assert recorder.samples == 100000
+    assert recorder.lost == 0
+    expected = sim.devices[0].analog_samples(0, 0, 100000)
+    assert np.allclose(data[0], expected)
+
+
+def test_status_larger_than_ring(session, sim):
+    # every status reports a full device buffer, eight times the ring
+    sim.latency = 1e-3
+    recorder = AnalogRecorder(session, hz=1e7, seconds=0.05, capacity=1000)
+    with recorder:
+        assert recorder.done.wait(10)
+    assert recorder.samples + recorder.lost == 500000
+    assert recorder.max_fill == 1000
+    assert np.all(np.abs(recorder.ring.data) <= 1.0)
+
+
+def test_bandwidth_limit_loses_samples(session, sim):
+    # 2 MHz of 2 channels is 8 MB/s over a 4 MB/s link
+    sim.bandwidth = 4e6
+    recorder = AnalogRecorder(session, hz=2e6, channels=(0, 1), seconds=0.1)
+    with recorder:
+        assert recorder.done.wait(10)
+    assert recorder.samples + recorder.lost == 200000
+    assert 100000 <= recorder.samples <= 100000 + 8192 + 1000
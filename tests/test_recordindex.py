@@ -0,0 +1,69 @@
+from recordindex import RecordFile
+import numpy as np
+import os
+import pytest
+
+
+def sparse_record(path, bits=8, count=50000, seed=0):
+    # lines change rarely, line n about every 2**(n+4) samples
+    rng = np.random.default_rng(seed)
+    dtype = {8: np.uint8, 16: np.uint16}[bits]
+    flips = np.zeros(count, dtype=np.uint32)
+    for line in range(bits):
+        at = rng.random(count) < 1.0 / (1 << min(line + 4, 14))
+        flips |= at.astype(np.uint32) << line
+    data = np.bitwise_xor.accumulate(flips).astype(dtype)
+    data.tofile(path)
+    return data
+
+
+def brute_next_edge(data, line, after, kind="any"):
+    # every sample of the file, no index
+    bit = (data.astype(np.int64) >> line) & 1
+    edges = np.flatnonzero(bit[1:] != bit[:-1]) + 1
+    if kind != "any":
+        edges = edges[bit[edges] == (kind == "rising")]
+    edges = edges[edges >= after]
+    return int(edges[0]) if len(edges) else None
+
+
+@pytest.mark.parametrize("bits", [8, 16])
+def test_next_edge_matches_scan(tmp_path, bits):
+    path = str(tmp_path / "record.bin")
+    data = sparse_record(path, bits)
+    record = RecordFile(path, bits=bits, block=64)
+    rng = np.random.default_rng(1)
+    for line in range(bits):
+        for after in rng.integers(0, len(data), 20).tolist() + [0, len(data) - 1]:
+            for kind in ("any", "rising", "falling"):
+                assert record.next_edge(line, after, kind) == brute_next_edge(data, line, after, kind)
+
+
+def test_edges_match_scan(tmp_path):
+    path = str(tmp_path / "record.bin")
+    data = sparse_record(path)
+    record = RecordFile(path, block=64)
+    for line in range(8):
+        bit = (data >> line) & 1
+        expected = np.flatnonzero(bit[1:] != bit[:-1]) + 1
+        assert record.edges(line).tolist() == expected.tolist()
+        window = expected[(expected >= 1000) & (expected < 30000)]
+        assert record.edges(line, 1000, 30000).tolist() == window.tolist()
+        rising = expected[bit[expected] == 1]
+        assert record.edges(line, kind="rising").tolist() == rising.tolist()
+
+
+def test_sidecar_reused_until_file_changes(tmp_path):
+    path = str(tmp_path / "record.bin")
+    sparse_record(path)
+    record = RecordFile(path, block=64)
+    assert os.path.exists(path + ".idx.npz")
+    again = RecordFile(path, block=64)
+    assert np.array_equal(again.masks, record.masks)
+
+    data = sparse_record(path, seed=2)
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1000))
+    rebuilt = RecordFile(path, block=64)
+    assert rebuilt.next_edge(3, 100) == brute_next_edge(data, 3, 100)
+    with pytest.raises(ValueError):
+        rebuilt.edges(3, kind="both")
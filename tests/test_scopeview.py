@@ -0,0 +1,90 @@
+from ctypes import *
+from dwfconstants import *
+from dwfbuffers import as_pointer
+from scopeview import Envelope, AnalogScan, DigitalScan
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def sim(sim):
+    # time only moves with clock.advance(), reads in the test do not shift it
+    sim.latency = 0.0
+    return sim
+
+
+def full_buffer(sim, session, samples):
+    data = np.zeros(samples)
+    sim.FDwfAnalogInStatusData(session.hdwf, c_int(0), as_pointer(data, 0, c_double), c_int(samples))
+    return data
+
+
+def device_index(sim, session):
+    idxWrite = c_int()
+    sim.FDwfAnalogInStatusIndexWrite(session.hdwf, byref(idxWrite))
+    return idxWrite.value
+
+
+def screen(reader):
+    # ring in the order FDwfAnalogInStatusData returns it
+    data = reader.envelope.data[0]
+    return np.roll(data, -reader.index) if reader.shift else data
+
+
+def test_envelope_update_matches_full_reduction():
+    envelope = Envelope(1000, 64)
+    rng = np.random.default_rng(1)
+    for first, count in ((0, 100), (950, 120), (500, 1), (0, 5000)):
+        positions = (first + np.arange(min(count, 1000))) % 1000
+        envelope.data[0, positions] = rng.normal(size=len(positions))
+        envelope.update(first, count)
+        edges = envelope.edges[:-1]
+        assert np.array_equal(envelope.low[0], np.minimum.reduceat(envelope.data[0], edges))
+        assert np.array_equal(envelope.high[0], np.maximum.reduceat(envelope.data[0], edges))
+
+
+@pytest.mark.parametrize("acqmode", [acqmodeScanShift, acqmodeScanScreen])
+def test_incremental_reads_match_buffer(session, sim, clock, acqmode):
+    reader = AnalogScan(session, hz=1e6, samples=8192, acqmode=acqmode, settle=0, clock=clock).configure()
+    total = 0
+    for _ in range(30):
+        clock.advance(0.0007)
+        total += reader.poll()
+    # each poll reads what was written since the previous one, not the buffer
+    assert abs(total - 30 * 700) <= 1
+    assert reader.reads <= 2 * reader.polls
+    assert reader.index == device_index(sim, session)
+    assert np.allclose(screen(reader), full_buffer(sim, session, 8192))
+    reader.stop()
+
+
+@pytest.mark.parametrize("acqmode", [acqmodeScanShift, acqmodeScanScreen])
+def test_late_poll_resumes_at_write_index(session, sim, clock, acqmode):
+    reader = AnalogScan(session, hz=1e6, samples=8192, acqmode=acqmode, settle=0, clock=clock).configure()
+    clock.advance(0.002)
+    reader.poll()
+    # several laps of the buffer go by unseen
+    clock.advance(0.05)
+    reader.poll()
+    assert reader.lost > 0
+    assert reader.index == device_index(sim, session)
+    assert np.allclose(screen(reader), full_buffer(sim, session, 8192))
+    # the next poll only reads the new samples
+    clock.advance(0.001)
+    assert reader.poll() == 1000
+    assert reader.total == 53000
+    reader.stop()
+
+
+def test_digital_lines(session, sim, clock):
+    reader = DigitalScan(session, hz=1e6, samples=16384, width=1024, clock=clock).configure()
+    clock.advance(0.02)
+    reader.poll()
+    data = np.zeros(16384, dtype=np.uint16)
+    sim.FDwfDigitalInStatusData(session.hdwf, as_pointer(data), c_int(2 * 16384))
+    assert np.array_equal(reader.envelope.data[0], data)
+    low, high = reader.lines([0, 13])
+    # the binary counter toggles DIO 0 in every column, DIO 13 every 8192 samples
+    assert np.all(low[0] == 0) and np.all(high[0] == 1)
+    assert np.count_nonzero(low[1] != high[1]) <= 2
+    reader.stop()
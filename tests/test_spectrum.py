@@ -0,0 +1,61 @@
+from dwfconstants import *
+from spectrum import Welch, find_peaks, make_window, spectrum, to_dbv, windows
+import numpy as np
+import pytest
+
+HZ = 1e6
+SIZE = 4096
+BIN = HZ / SIZE
+
+
+def tones(*pairs, offset=0.0, noise=0.0, n=SIZE):
+    t = np.arange(n) / HZ
+    signal = offset + np.random.default_rng(0).normal(0, noise, n)
+    for hz, volts in pairs:
+        signal = signal + volts * np.sin(2 * np.pi * hz * t)
+    return signal
+
+
+@pytest.mark.parametrize("kind,bins,db", [(DwfWindowHann, 0.05, 0.3), (DwfWindowBlackmanHarris, 0.01, 0.05),
+                                          (DwfWindowFlatTop, 0.2, 0.2)])
+@pytest.mark.parametrize("hz", [12345.6, 100003.3, 250000.0])
+def test_peak_between_bins(kind, bins, db, hz):
+    window, _ = windows.get(SIZE, kind)
+    # a large DC offset sits in the skipped bins
+    magnitude, _ = spectrum(tones((hz, 0.5), (hz * 1.7, 0.05), offset=2.0), window)
+    position, level = find_peaks(to_dbv(magnitude), HZ, count=2)
+    assert np.abs(position - [hz, hz * 1.7]).max() < bins * BIN
+    assert np.abs(level - to_dbv(np.array([0.5, 0.05]))).max() < db
+
+
+def test_peak_in_bins():
+    window, _ = windows.get(SIZE, DwfWindowBlackmanHarris)
+    magnitude, _ = spectrum(tones((100.25 * BIN, 1.0)), window)
+    position, level = find_peaks(to_dbv(magnitude))
+    assert position[0] == pytest.approx(100.25, abs=0.01)
+    assert level[0] == pytest.approx(-3.01, abs=0.05)
+
+
+def test_window_normalization():
+    for kind, nebw in ((DwfWindowRectangular, 1.0), (DwfWindowHann, 1.5), (DwfWindowBlackmanHarris, 2.0044)):
+        window, found = make_window(SIZE, kind)
+        assert window.mean() == pytest.approx(1.0)
+        assert found == pytest.approx(nebw, rel=1e-3)
+    # bin centered sine of amplitude A shows as A, for a stack of captures too
+    magnitude, _ = spectrum(np.vstack([tones((64 * BIN, 0.7))] * 3), windows.get(SIZE, DwfWindowHann)[0])
+    assert magnitude.shape == (3, SIZE // 2 + 1)
+    assert magnitude[:, 64] == pytest.approx(0.7)
+    with pytest.raises(ValueError):
+        make_window(16, 99)
+
+
+def test_welch_noise_floor():
+    welch = Welch(1024, HZ)
+    signal = tones((50 * HZ / 1024, 0.1), noise=1e-3, n=64 * 1024)
+    for chunk in np.array_split(signal, 77):
+        welch.update(chunk)
+    assert welch.count == 127
+    assert welch.magnitude[50] == pytest.approx(0.1, rel=0.01)
+    # white noise of variance s**2 averages to 4 * s**2 * NEBW / size per bin
+    floor = np.median(welch.magnitude[100:]) ** 2 * 1024 / 4 / welch.nebw
+    assert floor == pytest.approx(1e-6, rel=0.3)
@@ -0,0 +1,66 @@
+from spidecode import SpiDecoder, spi_decode, synthetic_capture
+import numpy as np
+import pytest
+
+MODES = [(0, 0), (0, 1), (1, 0), (1, 1)]
+
+
+def reference(samples, cpol, cpha, cs=0, clk=1, mosi=2, miso=3, nbits=8):
+    # sample by sample, the way a logic analyzer reads it
+    rising = int(cpol == cpha)
+    last_clk, last_cs = cpol, 1
+    words, bits, frame = [], [], 0
+    for i, value in enumerate(samples.tolist()):
+        c, s = (value >> clk) & 1, (value >> cs) & 1
+        if s and not last_cs:
+            frame += 1
+            bits = []
+        if not s and c != last_clk and c == rising:
+            bits.append(((value >> mosi) & 1, (value >> miso) & 1))
+            if len(bits) == nbits:
+                tx = int("".join(str(b[0]) for b in bits), 2)
+                rx = int("".join(str(b[1]) for b in bits), 2)
+                words.append((i, frame, tx, rx))
+                bits = []
+        last_clk, last_cs = c, s
+    return words
+
+
+@pytest.mark.parametrize("cpol,cpha", MODES)
+def test_random_chunks(cpol, cpha):
+    rng = np.random.default_rng(cpol * 2 + cpha)
+    tx = rng.integers(0, 256, 200)
+    rx = rng.integers(0, 256, 200)
+    samples = synthetic_capture(tx, rx, cpol=cpol, cpha=cpha, frame_words=7)
+    expected = reference(samples, cpol, cpha)
+    assert [w[2] for w in expected] == tx.tolist()
+
+    decoder = SpiDecoder(cs=0, clk=1, mosi=2, miso=3, cpol=cpol, cpha=cpha)
+    cuts = np.sort(rng.choice(np.arange(1, len(samples)), 60, replace=False))
+    frames = np.concatenate([decoder.decode(chunk) for chunk in np.split(samples, cuts)])
+    assert frames.tolist() == expected
+    assert frames["frame"].max() == 200 // 7
+    assert decoder.leftover == 0
+
+
+@pytest.mark.parametrize("cpol,cpha", MODES)
+def test_single_sample_chunks(cpol, cpha):
+    samples = synthetic_capture([0xA5, 0x3C, 0xFF], [0x00, 0x81, 0x7E], cpol=cpol, cpha=cpha, frame_words=2)
+    decoder = SpiDecoder(cs=0, clk=1, mosi=2, miso=3, cpol=cpol, cpha=cpha)
+    frames = np.concatenate([decoder.decode(samples[i:i + 1]) for i in range(len(samples))])
+    assert frames.tolist() == spi_decode(samples, 0, 1, 2, 3, cpol=cpol, cpha=cpha).tolist()
+    assert frames["mosi"].tolist() == [0xA5, 0x3C, 0xFF]
+    assert frames["miso"].tolist() == [0x00, 0x81, 0x7E]
+    assert frames["frame"].tolist() == [0, 0, 1]
+
+
+def test_short_frame_is_dropped():
+    samples = synthetic_capture([0xA5, 0x3C], [0, 0], frame_words=1)
+    # cut the first frame after five clocks, CS rises early
+    clk = np.flatnonzero(np.diff((samples >> 1) & 1) == 1)
+    samples[clk[4] + 2:clk[8]] |= 1
+    decoder = SpiDecoder(cs=0, clk=1, mosi=2, miso=3)
+    frames = decoder.decode(samples)
+    assert frames["mosi"].tolist() == [0x3C]
+    assert frames["frame"].tolist() == [1]
+    assert decoder.leftover == 5
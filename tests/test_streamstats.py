@@ -0,0 +1,68 @@
+from streamstats import StreamStats, StatsLog, buffer_stats, read_log, stats_dtype
+import numpy as np
+import pytest
+
+
+def signal(n, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n) / 1e4
+    return np.vstack((0.5 + np.sin(2 * np.pi * 50 * t) + rng.normal(0, 0.1, n),
+                      rng.normal(-1.0, 0.5, n)))
+
+
+def test_totals_match_numpy():
+    data = signal(100000)
+    stats = StreamStats((0, 1), hz=1e4)
+    rng = np.random.default_rng(1)
+    for block in np.split(data, np.sort(rng.choice(np.arange(1, data.shape[1]), 200, replace=False)), axis=1):
+        stats.update(block)
+    assert stats.count == data.shape[1]
+    assert stats.mean == pytest.approx(data.mean(axis=1))
+    assert stats.variance == pytest.approx(data.var(axis=1))
+    assert stats.acrms == pytest.approx(data.std(axis=1))
+    assert stats.rms == pytest.approx(np.sqrt((data ** 2).mean(axis=1)))
+    assert stats.min.tolist() == data.min(axis=1).tolist()
+    assert stats.max.tolist() == data.max(axis=1).tolist()
+    # within one histogram bin, 10 V over 4096 bins
+    q = [1, 25, 50, 75, 99]
+    assert np.abs(stats.percentile(q) - np.percentile(data, q, axis=1).T).max() < 10 / 4096
+
+
+def test_windows_across_blocks():
+    data = signal(10500)
+    stats = StreamStats((0, 1), hz=1e4, window=1000)
+    rows = np.concatenate([stats.update(block) for block in np.array_split(data, 37, axis=1)])
+    assert len(rows) == 20
+    assert rows["channel"].tolist() == [0, 1] * 10
+    assert rows["time"][::2].tolist() == pytest.approx(np.arange(10) * 0.1)
+    windows = data[:, :10000].reshape(2, 10, 1000)
+    assert rows["mean"].reshape(10, 2).T == pytest.approx(windows.mean(axis=2))
+    assert rows["acrms"].reshape(10, 2).T == pytest.approx(windows.std(axis=2))
+    assert rows["rms"].reshape(10, 2).T == pytest.approx(np.sqrt((windows ** 2).mean(axis=2)))
+    assert rows["max"].reshape(10, 2).T.tolist() == windows.max(axis=2).tolist()
+    # the last 500 samples wait for the next block
+    assert len(stats.update(data[:, :499])) == 0
+    assert len(stats.update(data[:, :1])) == 2
+
+
+def test_buffer_stats():
+    data = signal(8192)
+    rows = buffer_stats(data, channels=(0, 1), time=12.5)
+    assert rows["time"].tolist() == [12.5, 12.5]
+    assert rows["mean"] == pytest.approx(data.mean(axis=1))
+    assert rows["acrms"] == pytest.approx(data.std(axis=1))
+
+
+def test_log_rotation(tmp_path):
+    path = str(tmp_path / "stats.bin")
+    rows = np.zeros(10, dtype=stats_dtype)
+    rows["count"] = np.arange(10)
+    # 10 rows per file, two backups
+    with StatsLog(path, max_bytes=10 * stats_dtype.itemsize, backups=2) as log:
+        for i in range(4):
+            log.append(rows[:5] if i % 2 == 0 else rows[5:])
+            log.append(np.zeros(0, dtype=stats_dtype))
+        log.append(rows[:3])
+    logged = read_log(path)
+    assert logged["count"].tolist() == list(range(10)) * 2 + [0, 1, 2]
+    assert read_log(path, backups=False)["count"].tolist() == [0, 1, 2]
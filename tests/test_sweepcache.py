@@ -0,0 +1,83 @@
+from dwfsim import SimDwf
+from dwfsession import DwfSession
+from impedance import ImpedanceSweep
+from sweepcache import SweepCache, sweep_key, cached_sweep, read_compensation
+import numpy as np
+import os
+import pytest
+
+FAST = dict(start=1e3, stop=1e6, steps=11, max_steps=40, periods=1, start_settle=0.0, poll_interval=0.0)
+
+
+@pytest.fixture
+def realtime():
+    sim = SimDwf()
+    with DwfSession(dwf=sim) as session:
+        yield sim, session
+
+
+def test_hit_and_miss(realtime, tmp_path):
+    sim, session = realtime
+    cache = SweepCache(str(tmp_path))
+    first = cached_sweep(ImpedanceSweep(session, **FAST), cache)
+    assert (cache.hits, cache.misses) == (0, 1)
+    captures = sim.calls["FDwfAnalogImpedanceStatusMeasure"]
+
+    again = cached_sweep(ImpedanceSweep(session, **FAST), cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert np.array_equal(again, first)
+    assert sim.calls["FDwfAnalogImpedanceStatusMeasure"] == captures
+
+    # another grid or amplitude is another entry
+    cached_sweep(ImpedanceSweep(session, **dict(FAST, steps=5)), cache)
+    cached_sweep(ImpedanceSweep(session, amplitude=0.5, **FAST), cache)
+    assert (cache.hits, cache.misses) == (1, 3)
+    assert len(cache.entries()) == 3
+
+
+def test_compensation_change_invalidates(realtime, tmp_path):
+    sim, session = realtime
+    cache = SweepCache(str(tmp_path))
+    cached_sweep(ImpedanceSweep(session, **FAST), cache)
+    # AnalogImpedance_Compensation.py stored a new open/short measurement
+    session.dwf.FDwfAnalogImpedanceCompSet(session.hdwf, 1e6, -50.0, 0.2, 0.01)
+    assert read_compensation(session) == (1e6, -50.0, 0.2, 0.01)
+    cached_sweep(ImpedanceSweep(session, **FAST), cache)
+    assert (cache.hits, cache.misses) == (0, 2)
+    assert len(cache.entries()) == 1
+    cached_sweep(ImpedanceSweep(session, **FAST), cache)
+    assert cache.hits == 1
+
+    # a sweep given its own compensation is keyed by it as well
+    cached_sweep(ImpedanceSweep(session, compensation=(0.0, 0.0, 0.0, 0.0), **FAST), cache)
+    assert cache.misses == 3
+
+
+def test_key_fields():
+    grid = np.geomspace(1e2, 1e6, 21)
+    key = sweep_key("impedance", "SN:1", 8, 1e3, 1.0, grid)
+    assert key == sweep_key("impedance", "SN:1", 8, 1000, 1, list(grid))
+    assert key != sweep_key("impedance", "SN:2", 8, 1e3, 1.0, grid)
+    assert key != sweep_key("network", "SN:1", 8, 1e3, 1.0, grid)
+    assert key != sweep_key("impedance", "SN:1", 0, 1e3, 1.0, grid)
+    assert key != sweep_key("impedance", "SN:1", 8, 1e3, 1.0, grid[:-1])
+    assert sweep_key("impedance", "SN:1", 8, 1e3, 1.0, dict(steps=21, start=1e2)) == \
+        sweep_key("impedance", "SN:1", 8, 1e3, 1.0, dict(start=1e2, steps=21))
+
+
+def test_least_recently_used_evicted(tmp_path):
+    cache = SweepCache(str(tmp_path), max_entries=3)
+    result = np.zeros(10)
+    for i, key in enumerate("abcd"):
+        cache.put(key, result + i)
+        os.utime(cache._path(key), ns=(i * 10**9, i * 10**9))
+        cache.evict()
+    assert sorted(os.path.basename(path) for _, _, path in cache.entries()) == ["b.npz", "c.npz", "d.npz"]
+    # a hit makes b the most recent, e pushes out c
+    assert cache.get("b")[0] == 1
+    cache.put("e", result)
+    assert cache.get("c") is None
+    assert cache.get("b") is not None
+
+    with pytest.raises(ValueError):
+        cached_sweep(ImpedanceSweep(DwfSession(dwf=SimDwf())), cache)
@@ -0,0 +1,66 @@
+from ctypes import *
+from recorder import AnalogRecorder
+from telemetry import LinkMonitor, read_link, link_dtype
+import pytest
+
+
+class Counters:
+    def __init__(self):
+        self.samples = 0
+        self.lost = 0
+        self.corrupted = 0
+
+
+def test_read_link(session, sim, clock):
+    usb = sim.devices[0].usb
+    link = read_link(session)
+    assert link["bytes_to"] == link["bytes_from"] == 0
+    # 64 bytes back for every status, 100 us each
+    sts = c_byte()
+    for i in range(100):
+        sim.FDwfAnalogInStatus(session.hdwf, c_int(1), byref(sts))
+    link = read_link(session)
+    assert link["bytes_from"] == usb["bytes_from"] == 6400
+    assert link["bytes_to"] == 1600
+    assert link["sec_from"] == link["sec_to"] == 1e-4
+    assert link["bps_from"] == pytest.approx(6400 / clock())
+
+
+def test_sample_sums_sources(session):
+    sources = [Counters(), Counters()]
+    monitor = LinkMonitor(session, sources[:1])
+    monitor.add(sources[1])
+    for step in range(6):
+        sources[0].samples += 1000
+        sources[1].samples += 500
+        if step in (2, 3, 5):
+            sources[1].lost += 10
+        sources[0].corrupted += step == 4
+        monitor.sample()
+    rows = monitor.series()
+    assert rows.dtype == link_dtype
+    assert rows["samples"].tolist() == [1500 * i for i in range(1, 7)]
+    assert rows["lost"].tolist() == [0, 0, 10, 20, 20, 30]
+    metrics = monitor.metrics()
+    assert metrics["loss_intervals"] == 3
+    assert metrics["first_loss_time"] == rows["time"][2]
+    assert metrics["corrupted"] == 1
+    assert LinkMonitor(session).metrics() == {}
+
+
+def test_monitor_thread_while_recording(session, sim):
+    # 2 MHz of 2 channels over a 4 MB/s link loses samples
+    sim.bandwidth = 4e6
+    recorder = AnalogRecorder(session, hz=2e6, channels=(0, 1), seconds=0.1)
+    monitor = LinkMonitor(session, [recorder], interval=0.0005, history=100, window=0.01)
+    with monitor, recorder:
+        assert recorder.done.wait(10)
+    monitor.sample()
+    rows = monitor.series()
+    assert 1 <= len(rows) <= 100
+    metrics = monitor.metrics()
+    assert metrics["samples"] == recorder.samples
+    assert metrics["lost"] == recorder.lost > 0
+    assert metrics["bytes_from"] == sim.devices[0].usb["bytes_from"]
+    assert 0 < metrics["peak_bps_from"]
+    assert sim.calls["FDwfAnalogIOChannelNodeSet"] == 1
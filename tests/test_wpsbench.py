@@ -0,0 +1,55 @@
+from wpsbench import METHODS, run_suite, save, compare, device_info
+import json
+
+KEYS = {"buffer", "hz", "hz_actual", "channels", "trigger", "method", "captures", "elapsed",
+        "captures_per_second", "cpu_per_capture_us", "status_per_capture", "latency_ms"}
+
+
+def test_suite_json(session, sim, tmp_path):
+    seen = []
+    results = run_suite(session, buffers=(64, 1024), rates=(1e12,), channels=(1, 2), triggers=("none", "normal"),
+                        seconds=0.01, callback=seen.append)
+    assert len(results) == 2 * 2 * 2 * len(METHODS)
+    assert seen == results
+    path = str(tmp_path / "wps.json")
+    save(path, results, **device_info(session))
+
+    with open(path) as f:
+        saved = json.load(f)
+    assert saved["simulated"] is True
+    assert saved["latency"] == 1e-4
+    assert saved["serial"] == sim.devices[0].serial
+    assert saved["version"] == "3.22.2 sim"
+    assert len(saved["results"]) == len(results)
+    for result in saved["results"]:
+        assert set(result) == KEYS
+        assert set(result["latency_ms"]) == {"p50", "p90", "p99", "max"}
+        # the device clamps the rate to 100 MHz
+        assert result["hz_actual"] == 100e6
+        assert result["captures"] > 0
+        assert result["latency_ms"]["p50"] <= result["latency_ms"]["p99"] <= result["latency_ms"]["max"]
+        # without a trigger a capture is done by the second status, the 1 kHz
+        # test signal makes a normal trigger wait up to 10 statuses of 100 us
+        if result["trigger"] == "none":
+            assert result["status_per_capture"] <= 2
+        else:
+            assert result["status_per_capture"] > 2
+    assert {(r["buffer"], r["channels"], r["trigger"], r["method"]) for r in saved["results"]} == \
+        {(b, c, t, m) for b in (64, 1024) for c in (1, 2) for t in ("none", "normal") for m in METHODS}
+
+
+def test_compare_lists_slower_cases(session, tmp_path):
+    results = run_suite(session, buffers=(64,), rates=(1e12,), channels=(1,), seconds=0.01)
+    old = str(tmp_path / "old.json")
+    new = str(tmp_path / "new.json")
+    save(old, results)
+    assert compare(old, old) == []
+
+    before = [r["captures_per_second"] for r in results]
+    results[0]["captures_per_second"] *= 0.5
+    results[1]["captures_per_second"] *= 0.95
+    results[2]["captures_per_second"] *= 2
+    save(new, results)
+    slower = compare(old, new)
+    assert slower == [((64, 1e12, 1, "none", "StatusData"), before[0], before[0] * 0.5)]
+    assert len(compare(old, new, tolerance=0.01)) == 2
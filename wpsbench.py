@@ -0,0 +1,183 @@
+"""
+   Waveforms per second benchmark
+   AnalogIn_Wps.py for a grid of configurations. Every combination of
+       buffer    samples per capture
+       hz        sample rate, the device clamps it to its maximum
+       channels  number of enabled channels
+       trigger   none, auto or normal (analog edge on channel 1)
+       method    StatusData, StatusData2 or StatusData16
+   is captured for a fixed time and reported as captures per second,
+   host CPU time per capture and percentiles of the capture latency,
+   the time from the end of one read to the end of the next.
+
+   Results are written as JSON. compare() lists the cases that got
+   slower than a previous result file.
+
+   With --sim (or DWF_SIMULATE=1) it runs on dwfsim, --latency sets the
+   simulated USB round trip of every status and data call.
+"""
+
+from ctypes import *
+from dwfconstants import *
+from dwfbuffers import as_pointer
+from dwfsession import DwfSession
+import itertools
+import json
+import numpy as np
+import platform
+import time
+
+TRIGGERS = ("none", "auto", "normal")
+METHODS = ("StatusData", "StatusData2", "StatusData16")
+
+
+def configure(session, buffer, hz, channels, trigger):
+    dwf, hdwf = session.dwf, session.hdwf
+    dwf.FDwfDeviceAutoConfigureSet(hdwf, c_int(0))
+    dwf.FDwfAnalogInFrequencySet(hdwf, c_double(hz))
+    dwf.FDwfAnalogInBufferSizeSet(hdwf, c_int(buffer))
+    for channel in range(max(channels, 2)):
+        dwf.FDwfAnalogInChannelEnableSet(hdwf, c_int(channel), c_int(channel < channels))
+        dwf.FDwfAnalogInChannelRangeSet(hdwf, c_int(channel), c_double(5))
+    dwf.FDwfAnalogInAcquisitionModeSet(hdwf, acqmodeSingle)
+    if trigger == "none":
+        dwf.FDwfAnalogInTriggerSourceSet(hdwf, trigsrcNone)
+    else:
+        dwf.FDwfAnalogInTriggerSourceSet(hdwf, trigsrcDetectorAnalogIn)
+        dwf.FDwfAnalogInTriggerTypeSet(hdwf, trigtypeEdge)
+        dwf.FDwfAnalogInTriggerChannelSet(hdwf, c_int(0))
+        dwf.FDwfAnalogInTriggerLevelSet(hdwf, c_double(0))
+        dwf.FDwfAnalogInTriggerConditionSet(hdwf, DwfTriggerSlopeRise)
+        # auto triggers after the timeout without an edge, normal waits for one
+        dwf.FDwfAnalogInTriggerAutoTimeoutSet(hdwf, c_double(0.1 if trigger == "auto" else 0))
+    dwf.FDwfAnalogInConfigure(hdwf, c_int(1), c_int(0))
+    hzActual = c_double()
+    dwf.FDwfAnalogInFrequencyGet(hdwf, byref(hzActual))
+    return hzActual.value
+
+
+def run_case(session, buffer=64, hz=1e12, channels=1, trigger="none", method="StatusData", seconds=1.0, timeout=5.0):
+    # capture for seconds, returns the result dict of one case
+    dwf, hdwf = session.dwf, session.hdwf
+    hzActual = configure(session, buffer, hz, channels, trigger)
+    raw = method == "StatusData16"
+    data = np.zeros((channels, buffer), dtype=np.int16 if raw else np.float64)
+    pointers = [as_pointer(row, 0, c_short if raw else c_double) for row in data]
+    read = getattr(dwf, "FDwfAnalogIn" + method)
+    sts = c_byte()
+    latencies = []
+    status_calls = 0
+
+    dwf.FDwfAnalogInConfigure(hdwf, c_int(1), c_int(1))
+    cpu = time.process_time()
+    start = last = time.perf_counter()
+    while last - start < seconds:
+        while True:
+            if dwf.FDwfAnalogInStatus(hdwf, c_int(1), byref(sts)) == 0:
+                raise RuntimeError("FDwfAnalogInStatus failed")
+            status_calls += 1
+            if sts.value == DwfStateDone.value:
+                break
+            if time.perf_counter() - last > timeout:
+                raise RuntimeError("No capture within %g s" % timeout)
+        for channel, pointer in enumerate(pointers):
+            if method == "StatusData":
+                read(hdwf, c_int(channel), pointer, c_int(buffer))
+            else:
+                read(hdwf, c_int(channel), pointer, c_int(0), c_int(buffer))
+        now = time.perf_counter()
+        latencies.append(now - last)
+        last = now
+    cpu = time.process_time() - cpu
+    elapsed = last - start
+    dwf.FDwfAnalogInConfigure(hdwf, c_int(0), c_int(0))
+
+    latencies = np.array(latencies) * 1e3
+    count = len(latencies)
+    p50, p90, p99 = np.percentile(latencies, (50, 90, 99))
+    return dict(buffer=buffer, hz=hz, hz_actual=hzActual, channels=channels, trigger=trigger, method=method,
+                captures=count, elapsed=elapsed, captures_per_second=count / elapsed,
+                cpu_per_capture_us=cpu / count * 1e6, status_per_capture=status_calls / count,
+                latency_ms=dict(p50=p50, p90=p90, p99=p99, max=latencies.max()))
+
+
+def run_suite(session, buffers=(64, 1024, 8192), rates=(1e12, 1e6), channels=(1, 2), triggers=("none",),
+              methods=METHODS, seconds=1.0, callback=None):
+    # every combination, callback(result) is called after each case
+    results = []
+    for buffer, hz, nChannels, trigger, method in itertools.product(buffers, rates, channels, triggers, methods):
+        result = run_case(session, buffer, hz, nChannels, trigger, method, seconds)
+        results.append(result)
+        if callback is not None:
+            callback(result)
+    return results
+
+
+def device_info(session):
+    version = create_string_buffer(16)
+    session.dwf.FDwfGetVersion(version)
+    return dict(serial=session.serial, version=version.value.decode(), simulated=type(session.dwf).__name__ == "SimDwf",
+                latency=getattr(session.dwf, "latency", None), host=platform.node(), python=platform.python_version())
+
+
+def save(path, results, **info):
+    with open(path, "w") as f:
+        json.dump(dict(info, created=time.time(), results=results), f, indent=1)
+
+
+def _case(result):
+    return (result["buffer"], result["hz"], result["channels"], result["trigger"], result["method"])
+
+
+def compare(old_path, new_path, tolerance=0.1):
+    # (case, old, new) of the cases whose captures per second dropped by more than tolerance
+    with open(old_path) as f:
+        old = {_case(r): r for r in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = {_case(r): r for r in json.load(f)["results"]}
+    slower = []
+    for case in sorted(old.keys() & new.keys()):
+        before = old[case]["captures_per_second"]
+        after = new[case]["captures_per_second"]
+        if after < before * (1 - tolerance):
+            slower.append((case, before, after))
+    return slower
+
+
+def _report(result):
+    print("%6d samples %10.4g Hz %d ch %-6s %-12s %8.0f/s %7.1f us cpu  latency p50 %.3f p99 %.3f ms" % (
+        result["buffer"], result["hz_actual"], result["channels"], result["trigger"], result["method"],
+        result["captures_per_second"], result["cpu_per_capture_us"],
+        result["latency_ms"]["p50"], result["latency_ms"]["p99"]))
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="AnalogIn captures per second benchmark")
+    parser.add_argument("--sim", action="store_true", help="run on the simulated library")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated round trip in seconds")
+    parser.add_argument("--seconds", type=float, default=1.0, help="duration of each case")
+    parser.add_argument("--buffers", type=int, nargs="+", default=[64, 1024, 8192])
+    parser.add_argument("--rates", type=float, nargs="+", default=[1e12, 1e6])
+    parser.add_argument("--channels", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--triggers", nargs="+", choices=TRIGGERS, default=["none"])
+    parser.add_argument("--methods", nargs="+", choices=METHODS, default=list(METHODS))
+    parser.add_argument("--serial", help="device serial number, first free device by default")
+    parser.add_argument("--out", default="wps.json")
+    parser.add_argument("--compare", help="earlier result file to check for regressions")
+    args = parser.parse_args()
+
+    dwf = None
+    if args.sim:
+        import dwfsim
+        dwf = dwfsim.SimDwf(latency=args.latency)
+    with DwfSession(serial=args.serial, dwf=dwf) as session:
+        if args.latency and not args.sim and hasattr(session.dwf, "latency"):
+            session.dwf.latency = args.latency
+        results = run_suite(session, args.buffers, args.rates, args.channels, args.triggers, args.methods,
+                            args.seconds, callback=_report)
+        save(args.out, results, **device_info(session))
+    print("Results written to " + args.out)
+    if args.compare:
+        for case, before, after in compare(args.compare, args.out):
+            print("slower: %s %.0f -> %.0f captures/s" % (case, before, after))